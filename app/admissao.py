@@ -0,0 +1,237 @@
+"""Controle de admissão: rate limit por cliente e limite de requests simultâneos.
+
+Dois filtros, aplicados por `MiddlewareAdmissao` antes de o request chegar ao
+handler:
+
+- rate limit por cliente (`RATE_LIMIT_RPS`, desligado por padrão): um balde de
+  fichas por cliente, com `RATE_LIMIT_RAJADA` fichas repostas a
+  `RATE_LIMIT_RPS` por segundo. Sem ficha, o request recebe 429 com
+  `Retry-After`. Os baldes ficam em um `BackendLimites`, em memória por padrão;
+- limite de concorrência das rotas que usam o banco (`ADMISSAO_CONCORRENCIA`,
+  por padrão a capacidade do pool menos `OUTBOX_WORKERS`, já que cada worker
+  do outbox ocupa uma conexão do mesmo pool): acima dele o request espera em
+  uma fila de até `ADMISSAO_FILA_MAX` posições por no máximo
+  `ADMISSAO_ESPERA_MS`. Com a fila cheia ou a espera esgotada recebe 503 com
+  `Retry-After`, em vez de esperar até `DB_POOL_TIMEOUT` por uma conexão.
+
+As rotas de health check e `/metrics` não passam por nenhum dos dois. Os limites
+são por processo: com vários workers, cada um tem os seus.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+
+from fastapi.responses import JSONResponse
+
+from . import config, metricas
+
+# Rotas que respondem mesmo com a API sobrecarregada
+ROTAS_LIVRES = ("/health/", "/metrics")
+
+_rejeicoes = metricas.registro.contador(
+    "admission_rejections_total",
+    "Requests recusados pelo controle de admissão",
+    ("motivo",),
+)
+_espera_fila = metricas.registro.histograma(
+    "admission_queue_wait_seconds",
+    "Tempo na fila até o request ser admitido",
+)
+_fila = metricas.registro.medidor(
+    "admission_queue_depth", "Requests esperando uma vaga de concorrência"
+)
+_em_andamento = metricas.registro.medidor(
+    "admission_in_flight", "Requests das rotas com banco em andamento"
+)
+
+
+class BackendLimites:
+    """Interface dos backends do rate limit (em memória por padrão)."""
+
+    def consumir(self, chave: str, taxa: float, rajada: int) -> float:
+        """Tira uma ficha do balde de `chave`. Devolve 0 se havia ficha ou, se
+        não havia, os segundos até a próxima."""
+        raise NotImplementedError
+
+
+class LimitesMemoria(BackendLimites):
+    """Baldes do processo, com despejo LRU acima de `max_clientes`; um cliente
+    despejado volta com o balde cheio."""
+
+    def __init__(self, max_clientes: int = 10000):
+        self.max_clientes = max_clientes
+        self._baldes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consumir(self, chave, taxa, rajada):
+        agora = time.monotonic()
+        with self._lock:
+            fichas, atualizado = self._baldes.pop(chave, (rajada, agora))
+            fichas = min(rajada, fichas + (agora - atualizado) * taxa)
+            espera = 0.0
+            if fichas >= 1:
+                fichas -= 1
+            else:
+                espera = (1 - fichas) / taxa
+            self._baldes[chave] = (fichas, agora)
+            while len(self._baldes) > self.max_clientes:
+                self._baldes.popitem(last=False)
+        return espera
+
+
+class RateLimit:
+    def __init__(self, backend: BackendLimites, taxa: float, rajada: int):
+        self.backend = backend
+        self.taxa = taxa
+        self.rajada = max(rajada, 1)
+
+    @property
+    def ativo(self) -> bool:
+        return self.taxa > 0
+
+    def consumir(self, cliente: str) -> float:
+        return self.backend.consumir(cliente, self.taxa, self.rajada)
+
+
+class LimiteConcorrencia:
+    """Semáforo com fila limitada e espera máxima, para o loop de eventos.
+
+    Cada espera é um future do loop atual; `sair` passa a vaga direto ao
+    primeiro da fila, então quem chega não fura a fila.
+    """
+
+    def __init__(self, limite: int, fila_max: int, espera: float):
+        self.limite = limite
+        self.fila_max = fila_max
+        self.espera = espera
+        self.em_uso = 0
+        self._fila = deque()
+        _fila.adicionar_funcao(lambda: [({}, len(self._fila))])
+        _em_andamento.adicionar_funcao(lambda: [({}, self.em_uso)])
+
+    @property
+    def ativo(self) -> bool:
+        return self.limite > 0
+
+    async def entrar(self):
+        """Ocupa uma vaga; devolve o motivo da recusa, ou None se admitido."""
+        if self.em_uso < self.limite and not self._fila:
+            self.em_uso += 1
+            return None
+        if len(self._fila) >= self.fila_max:
+            return "fila_cheia"
+
+        vez = asyncio.get_running_loop().create_future()
+        self._fila.append(vez)
+        inicio = time.perf_counter()
+        try:
+            await asyncio.wait_for(vez, self.espera)
+        except asyncio.TimeoutError:
+            self._desistir(vez)
+            return "espera_esgotada"
+        except BaseException:
+            # Request cancelado na fila; se a vaga já era dele, passa adiante
+            if vez.done() and not vez.cancelled():
+                self.sair()
+            else:
+                self._desistir(vez)
+            raise
+        _espera_fila.observar(time.perf_counter() - inicio)
+        return None
+
+    def _desistir(self, vez):
+        # Um `sair` concorrente pode já ter tirado da fila o future cancelado
+        try:
+            self._fila.remove(vez)
+        except ValueError:
+            pass
+
+    def sair(self):
+        # A vaga vai ao próximo da fila sem ser liberada
+        while self._fila:
+            vez = self._fila.popleft()
+            if not vez.done():
+                vez.set_result(None)
+                return
+        self.em_uso -= 1
+
+
+rate_limit = RateLimit(
+    LimitesMemoria(config.RATE_LIMIT_MAX_CLIENTES),
+    taxa=config.RATE_LIMIT_RPS,
+    rajada=config.RATE_LIMIT_RAJADA,
+)
+
+concorrencia = LimiteConcorrencia(
+    config.ADMISSAO_CONCORRENCIA,
+    fila_max=config.ADMISSAO_FILA_MAX,
+    espera=config.ADMISSAO_ESPERA_MS / 1000,
+)
+
+
+def cliente(scope) -> str:
+    """Identificação do cliente para o rate limit: o primeiro endereço do
+    cabeçalho `RATE_LIMIT_CABECALHO_CLIENTE` (atrás de um proxy), ou o IP da
+    conexão."""
+    if config.RATE_LIMIT_CABECALHO_CLIENTE:
+        nome = config.RATE_LIMIT_CABECALHO_CLIENTE.lower().encode()
+        for chave, valor in scope.get("headers", ()):
+            if chave == nome:
+                return valor.decode("latin-1").split(",")[0].strip()
+    endereco = scope.get("client")
+    return endereco[0] if endereco else "desconhecido"
+
+
+def _recusa(status: int, detalhe: str, espera: float) -> JSONResponse:
+    return JSONResponse(
+        {"detail": detalhe},
+        status_code=status,
+        headers={"Retry-After": str(max(1, math.ceil(espera)))},
+    )
+
+
+class MiddlewareAdmissao:
+    """Middleware ASGI que aplica o rate limit e o limite de concorrência.
+
+    `prefixos_banco` são os prefixos das rotas que usam o banco; só elas ocupam
+    vagas do limite de concorrência.
+    """
+
+    def __init__(self, app, prefixos_banco=()):
+        self.app = app
+        self.prefixos_banco = tuple(prefixos_banco)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(ROTAS_LIVRES):
+            await self.app(scope, receive, send)
+            return
+
+        if rate_limit.ativo:
+            espera = rate_limit.consumir(cliente(scope))
+            if espera:
+                _rejeicoes.incrementar(motivo="rate_limit")
+                resposta = _recusa(
+                    429, "Limite de requisições excedido; tente novamente", espera
+                )
+                await resposta(scope, receive, send)
+                return
+
+        if not concorrencia.ativo or not scope["path"].startswith(self.prefixos_banco):
+            await self.app(scope, receive, send)
+            return
+
+        motivo = await concorrencia.entrar()
+        if motivo is not None:
+            _rejeicoes.incrementar(motivo=motivo)
+            resposta = _recusa(
+                503, "Serviço sobrecarregado; tente novamente", concorrencia.espera
+            )
+            await resposta(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            concorrencia.sair()
@@ -0,0 +1,108 @@
+from sqlalchemy import Float, cast, delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from . import models
+
+
+def _media(usuario_id):
+    agregado = models.AvaliacaoAgregado
+    return (
+        select(cast(agregado.soma, Float) / agregado.quantidade)
+        .where(agregado.avaliado_id == usuario_id)
+        .scalar_subquery()
+    )
+
+
+def _atualizar_medias(db: Session, avaliado_ids):
+    # Um UPDATE por subtipo; linhas de quem não é daquele subtipo não são afetadas
+    for modelo in (models.Freelancer, models.Organizador):
+        db.execute(
+            update(modelo)
+            .where(modelo.id.in_(avaliado_ids))
+            .values(avaliacao_media=_media(modelo.id))
+            .execution_options(synchronize_session=False)
+        )
+
+
+def registrar_notas(db: Session, notas):
+    """Soma as notas, dadas como pares (avaliado_id, nota), aos agregados dos
+    avaliados e recalcula as médias em tempo constante por avaliado.
+
+    Os agregados de todos os avaliados são somados em um único INSERT ... ON
+    CONFLICT e as médias recalculadas juntas, em um UPDATE por subtipo. Não faz
+    commit.
+    """
+    totais = {}
+    for avaliado_id, nota in notas:
+        quantidade, soma = totais.get((avaliado_id,), (0, 0))
+        totais[(avaliado_id,)] = (quantidade + 1, soma + nota)
+    if not totais:
+        return
+
+    somar(db, models.AvaliacaoAgregado, totais, colunas=("quantidade", "soma"))
+    _atualizar_medias(db, [avaliado_id for (avaliado_id,) in totais])
+
+
+def _insert(db: Session):
+    # INSERT com ON CONFLICT, do dialeto da sessão (Postgres ou SQLite)
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
+
+def somar(db: Session, modelo, variacoes, colunas=("quantidade",)):
+    """Soma as variações {chave: delta} às `colunas` de `modelo` com um único
+    INSERT ... ON CONFLICT DO UPDATE de várias linhas.
+
+    Cada chave é a tupla da chave primária de `modelo`, na ordem das colunas, e
+    cada delta um número, ou uma tupla na ordem de `colunas` quando há mais de
+    uma; chaves sem linha são criadas com o delta. Não faz commit.
+    """
+    chaves = [coluna.key for coluna in modelo.__table__.primary_key]
+    # Em ordem de chave: transações concorrentes travam as linhas na mesma
+    # ordem e não entram em deadlock
+    linhas = []
+    for chave, delta in sorted(variacoes.items()):
+        deltas = delta if isinstance(delta, tuple) else (delta,)
+        if any(deltas):
+            linhas.append({**dict(zip(chaves, chave)), **dict(zip(colunas, deltas))})
+    if not linhas:
+        return
+    statement = _insert(db)(modelo).values(linhas)
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=chaves,
+            set_={
+                coluna: getattr(modelo, coluna) + statement.excluded[coluna]
+                for coluna in colunas
+            },
+        )
+    )
+
+
+def reconciliar_agregados(db: Session):
+    """Reconstrói todos os agregados a partir da tabela de avaliações."""
+    agregado = models.AvaliacaoAgregado
+    avaliacao = models.Avaliacao
+
+    db.execute(delete(agregado).execution_options(synchronize_session=False))
+    db.execute(
+        insert(agregado).from_select(
+            ["avaliado_id", "quantidade", "soma"],
+            select(
+                avaliacao.avaliado_id,
+                func.count(avaliacao.nota),
+                func.sum(avaliacao.nota),
+            )
+            .where(avaliacao.nota.is_not(None))
+            .group_by(avaliacao.avaliado_id),
+        )
+    )
+
+    for modelo in (models.Freelancer, models.Organizador):
+        db.execute(
+            update(modelo)
+            .values(avaliacao_media=func.coalesce(_media(modelo.id), 0.0))
+            .execution_options(synchronize_session=False)
+        )
@@ -0,0 +1,208 @@
+import re
+import threading
+
+from sqlalchemy import Float, and_, case, cast, event, func, literal, select
+from sqlalchemy.orm import Session, object_session
+
+from .database import SessionLocal
+
+
+def _pk(coluna):
+    return coluna.class_.__mapper__.primary_key[0]
+
+
+class BuscaTrigram:
+    """Busca no Postgres com pg_trgm.
+
+    O ILIKE com curinga à esquerda usa os índices GIN `gin_trgm_ops` criados
+    junto com o schema, e a relevância é a `similarity` do próprio pg_trgm.
+    """
+
+    def condicao(self, db: Session, coluna, termo: str):
+        return coluna.ilike(f"%{termo}%")
+
+    def relevancia(self, db: Session, coluna, termo: str):
+        # similarity() devolve real (float4); em float8 o valor que vai no
+        # cursor volta idêntico na comparação do keyset, e os empates não
+        # repetem nem pulam linhas
+        return cast(func.similarity(coluna, termo), Float(precision=53))
+
+
+def ngramas(texto: str, n: int = 3, completar: bool = True):
+    """Conjunto de n-gramas das palavras do texto, no mesmo formato do pg_trgm.
+
+    Com `completar` cada palavra recebe dois espaços antes e um depois, o que
+    dá peso ao início das palavras; sem ele, os n-gramas servem para buscar
+    substrings.
+    """
+    resultado = set()
+    for palavra in re.findall(r"\w+", (texto or "").lower()):
+        if completar:
+            palavra = " " * (n - 1) + palavra + " "
+        for i in range(len(palavra) - n + 1):
+            resultado.add(palavra[i : i + n])
+    return resultado
+
+
+def similaridade(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class _IndiceNgram:
+    def __init__(self, coluna, n: int):
+        self.coluna = coluna
+        self.n = n
+        self.construido = False
+        self._postings = {}
+        self._documentos = {}
+
+    def construir(self, db: Session):
+        self._postings.clear()
+        self._documentos.clear()
+        for pk, texto in db.execute(select(_pk(self.coluna), self.coluna)):
+            self.indexar(pk, texto)
+        self.construido = True
+
+    def indexar(self, pk, texto):
+        self.remover(pk)
+        documento = ngramas(texto, self.n, completar=False)
+        self._documentos[pk] = (documento, ngramas(texto, self.n))
+        for ngrama in documento:
+            self._postings.setdefault(ngrama, set()).add(pk)
+
+    def remover(self, pk):
+        anterior = self._documentos.pop(pk, None)
+        if anterior:
+            for ngrama in anterior[0]:
+                self._postings.get(ngrama, set()).discard(pk)
+
+    def candidatos(self, termo: str):
+        # Termos menores que n não têm n-gramas e não restringem a busca
+        consulta = ngramas(termo, self.n, completar=False)
+        if not consulta:
+            return None
+        listas = sorted(
+            (self._postings.get(ngrama, set()) for ngrama in consulta), key=len
+        )
+        return set.intersection(*listas)
+
+    def pontuar(self, termo: str, pks):
+        consulta = ngramas(termo, self.n)
+        return {pk: similaridade(consulta, self._documentos[pk][1]) for pk in pks}
+
+
+class BuscaNgram:
+    """Índice de n-gramas em memória para bancos sem pg_trgm (SQLite nos testes).
+
+    O índice é montado na primeira busca e mantido pelos eventos do ORM; ele só
+    reduz os candidatos, o ILIKE continua decidindo o que casa.
+
+    As alterações ficam guardadas na sessão e só chegam ao índice no commit das
+    sessões do `SessionLocal`; um rollback as descarta. Uma escrita desfeita
+    num savepoint faz o índice ser reconstruído depois do commit.
+    """
+
+    def __init__(self, n: int = 3):
+        self.n = n
+        self._indices = {}
+        self._lock = threading.RLock()
+        self._sessoes_registradas = False
+
+    def _indice(self, db: Session, coluna):
+        chave = (coluna.class_, coluna.key)
+        with self._lock:
+            indice = self._indices.get(chave)
+            if indice is None:
+                indice = self._indices[chave] = _IndiceNgram(coluna, self.n)
+                self._registrar_eventos(indice)
+            if not indice.construido:
+                indice.construir(db)
+            return indice
+
+    def _pendentes(self, sessao: Session) -> dict:
+        return sessao.info.setdefault(
+            "busca_ngram", {"indexar": [], "invalidar": set()}
+        )
+
+    def _registrar_eventos(self, indice):
+        modelo = indice.coluna.class_
+        pk = _pk(indice.coluna).key
+        chave = indice.coluna.key
+
+        def ao_gravar(mapper, connection, alvo):
+            sessao = object_session(alvo)
+            if sessao is not None:
+                self._pendentes(sessao)["indexar"].append(
+                    (indice, getattr(alvo, pk), getattr(alvo, chave))
+                )
+
+        def ao_executar(estado):
+            # INSERTs e UPDATEs em massa não passam pelos eventos de flush:
+            # o índice é reconstruído na primeira busca depois do commit
+            alteracao = estado.is_insert or estado.is_update
+            if alteracao and estado.bind_mapper is modelo.__mapper__:
+                self._pendentes(estado.session)["invalidar"].add(indice)
+
+        event.listen(modelo, "after_insert", ao_gravar)
+        event.listen(modelo, "after_update", ao_gravar)
+        event.listen(SessionLocal, "do_orm_execute", ao_executar)
+        self._registrar_sessoes()
+
+    def _registrar_sessoes(self):
+        if self._sessoes_registradas:
+            return
+        self._sessoes_registradas = True
+
+        def ao_confirmar(sessao):
+            pendentes = sessao.info.pop("busca_ngram", None)
+            if not pendentes:
+                return
+            with self._lock:
+                for indice, pk, texto in pendentes["indexar"]:
+                    indice.indexar(pk, texto)
+                for indice in pendentes["invalidar"]:
+                    indice.construido = False
+
+        def ao_desfazer(sessao):
+            sessao.info.pop("busca_ngram", None)
+
+        def ao_desfazer_savepoint(sessao, transacao):
+            # O buffer não separa o que foi gravado antes e dentro do
+            # savepoint: os índices envolvidos são reconstruídos depois do
+            # commit
+            if transacao.nested and "busca_ngram" in sessao.info:
+                pendentes = sessao.info["busca_ngram"]
+                pendentes["invalidar"].update(i for i, _, _ in pendentes["indexar"])
+                pendentes["indexar"].clear()
+
+        event.listen(SessionLocal, "after_commit", ao_confirmar)
+        event.listen(SessionLocal, "after_rollback", ao_desfazer)
+        event.listen(SessionLocal, "after_soft_rollback", ao_desfazer_savepoint)
+
+    def condicao(self, db: Session, coluna, termo: str):
+        ilike = coluna.ilike(f"%{termo}%")
+        candidatos = self._indice(db, coluna).candidatos(termo)
+        if candidatos is None:
+            return ilike
+        return and_(_pk(coluna).in_(candidatos), ilike)
+
+    def relevancia(self, db: Session, coluna, termo: str):
+        indice = self._indice(db, coluna)
+        candidatos = indice.candidatos(termo)
+        pontos = indice.pontuar(termo, candidatos) if candidatos else {}
+        if not pontos:
+            return literal(0.0, Float)
+        return case(pontos, value=_pk(coluna), else_=0.0)
+
+
+_trigram = BuscaTrigram()
+_ngram = BuscaNgram()
+
+
+def backend(db: Session):
+    """Escolhe o backend de busca pelo dialeto da conexão da sessão."""
+    if db.get_bind().dialect.name == "postgresql":
+        return _trigram
+    return _ngram
@@ -0,0 +1,153 @@
+"""Cache read-through das respostas de listagem.
+
+As chaves são formadas pelo namespace (ex.: "freelancers"), pela geração atual
+do namespace e pelos parâmetros normalizados da consulta. Invalidar um namespace
+só incrementa a geração: as entradas antigas deixam de ser encontradas e saem
+pelo LRU ou pelo TTL.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import config, metricas
+
+_acertos = metricas.registro.contador(
+    "cache_hits_total", "Consultas respondidas pelo cache", ("namespace",)
+)
+_faltas = metricas.registro.contador(
+    "cache_misses_total", "Consultas que precisaram ir ao banco", ("namespace",)
+)
+_invalidacoes = metricas.registro.contador(
+    "cache_invalidations_total", "Invalidações de namespace", ("namespace",)
+)
+_taxa_acerto = metricas.registro.medidor(
+    "cache_hit_ratio", "Fração das consultas respondidas pelo cache", ("namespace",)
+)
+
+
+class BackendCache:
+    """Interface dos backends de cache (em memória por padrão)."""
+
+    def obter(self, chave: str):
+        raise NotImplementedError
+
+    def gravar(self, chave: str, valor, ttl: float):
+        raise NotImplementedError
+
+    def geracao(self, namespace: str) -> int:
+        raise NotImplementedError
+
+    def incrementar_geracao(self, namespace: str):
+        raise NotImplementedError
+
+
+class CacheMemoria(BackendCache):
+    """Cache do processo com TTL por entrada e despejo LRU."""
+
+    def __init__(self, max_entradas: int = 1024):
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()
+        self._geracoes = {}
+        self._lock = threading.Lock()
+
+    def obter(self, chave):
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                return None
+            valor, expira_em = entrada
+            if expira_em < time.monotonic():
+                del self._entradas[chave]
+                return None
+            self._entradas.move_to_end(chave)
+            return valor
+
+    def gravar(self, chave, valor, ttl):
+        with self._lock:
+            self._entradas[chave] = (valor, time.monotonic() + ttl)
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def geracao(self, namespace):
+        return self._geracoes.get(namespace, 0)
+
+    def incrementar_geracao(self, namespace):
+        with self._lock:
+            self._geracoes[namespace] = self._geracoes.get(namespace, 0) + 1
+
+
+def _normalizar(valor):
+    if hasattr(valor, "isoformat"):
+        return valor.isoformat()
+    return valor
+
+
+class Cache:
+    def __init__(self, backend: BackendCache, ttl: float, ativo: bool = True):
+        self.backend = backend
+        self.ttl = ttl
+        self.ativo = ativo
+        self._namespaces = set()
+        _taxa_acerto.adicionar_funcao(self._taxas)
+
+    def chave(self, namespace: str, params: dict) -> str:
+        # Parâmetros ausentes não mudam o resultado e ficam fora da chave
+        partes = sorted(
+            f"{nome}={_normalizar(valor)}"
+            for nome, valor in params.items()
+            if valor is not None
+        )
+        geracao = self.backend.geracao(namespace)
+        return f"{namespace}:{geracao}:" + "&".join(partes)
+
+    def obter_ou_calcular(
+        self, namespace: str, params: dict, calcular, renovar: bool = False
+    ):
+        """Devolve o valor em cache ou chama `calcular()` e guarda o resultado.
+
+        Com `renovar`, o valor em cache é ignorado e substituído pelo calculado.
+        Exceções de `calcular` (como os 404 das listagens) não são guardadas.
+        """
+        if not self.ativo:
+            return calcular()
+
+        self._namespaces.add(namespace)
+        chave = self.chave(namespace, params)
+        valor = None if renovar else self.backend.obter(chave)
+        if valor is not None:
+            _acertos.incrementar(namespace=namespace)
+            return valor
+
+        _faltas.incrementar(namespace=namespace)
+        valor = calcular()
+        self.backend.gravar(chave, valor, self.ttl)
+        return valor
+
+    def invalidar(self, *namespaces: str):
+        for namespace in namespaces:
+            self.backend.incrementar_geracao(namespace)
+            _invalidacoes.incrementar(namespace=namespace)
+
+    def invalidar_apos_commit(self, db: Session, *namespaces: str):
+        """Invalida os namespaces quando a transação da sessão for confirmada."""
+        event.listen(
+            db, "after_commit", lambda sessao: self.invalidar(*namespaces), once=True
+        )
+
+    def _taxas(self):
+        for namespace in sorted(self._namespaces):
+            acertos = _acertos.valor(namespace=namespace)
+            total = acertos + _faltas.valor(namespace=namespace)
+            yield {"namespace": namespace}, acertos / total if total else 0.0
+
+
+respostas = Cache(
+    CacheMemoria(config.CACHE_MAX_ENTRADAS),
+    ttl=config.CACHE_TTL_SEGUNDOS,
+    ativo=config.CACHE_ATIVO,
+)
@@ -0,0 +1,88 @@
+"""Ranking de freelancers candidatos a um evento.
+
+A pontuação combina a relevância textual da especialidade (e da profissão) com o
+termo buscado e a avaliação média. Freelancers com proposta aceita na data do
+evento ficam de fora, consultando o índice de ocupação (`OcupacaoFreelancer`)
+por chave primária em vez das propostas.
+
+Com termo, só os candidatos do índice de busca são pontuados; sem termo, o
+top-k sai do índice (avaliacao_media, id) de freelancers.
+"""
+
+from sqlalchemy import Float, case, desc, exists, func, literal, or_, select
+from sqlalchemy.orm import Session
+
+from . import busca, models
+
+PESO_RELEVANCIA = 0.6
+PESO_AVALIACAO = 0.3
+PESO_PROFISSAO = 0.1
+
+NOTA_MAXIMA = 5
+
+
+def ranquear(db: Session, evento: models.Evento, termo, limite: int):
+    freelancer = models.Freelancer
+    ocupacao = models.OcupacaoFreelancer
+
+    ocupado = exists().where(
+        ocupacao.freelancer_id == freelancer.id,
+        ocupacao.data == evento.data_evento,
+        ocupacao.quantidade > 0,
+    )
+    avaliacao = func.coalesce(freelancer.avaliacao_media, 0.0) / NOTA_MAXIMA
+
+    query = (
+        db.query(
+            freelancer.id,
+            models.Usuario.nome,
+            models.Usuario.email,
+            models.Usuario.telefone,
+            models.Usuario.documento,
+            freelancer.especialidade,
+            freelancer.portfolio,
+            freelancer.avaliacao_media,
+            models.Profissao.nome.label("profissao"),
+        )
+        .join(models.Usuario, models.Usuario.id == freelancer.id)
+        .outerjoin(models.Profissao, models.Profissao.id == freelancer.profissao_id)
+        .filter(~ocupado)
+    )
+
+    if not termo:
+        pontuacao = PESO_AVALIACAO * avaliacao
+        return (
+            query.add_columns(pontuacao.label("pontuacao"))
+            .filter(freelancer.avaliacao_media.is_not(None))
+            .order_by(desc(freelancer.avaliacao_media), desc(freelancer.id))
+            .limit(limite)
+            .all()
+        )
+
+    backend = busca.backend(db)
+    coluna = freelancer.especialidade
+    profissoes = select(models.Profissao.id).where(
+        models.Profissao.nome.ilike(f"%{termo}%")
+    )
+    relevancia = backend.relevancia(db, coluna, termo)
+    profissao = case(
+        (freelancer.profissao_id.in_(profissoes), literal(1.0, Float)), else_=0.0
+    )
+    pontuacao = (
+        PESO_RELEVANCIA * relevancia
+        + PESO_AVALIACAO * avaliacao
+        + PESO_PROFISSAO * profissao
+    ).label("pontuacao")
+
+    return (
+        query.add_columns(pontuacao)
+        .filter(
+            or_(
+                backend.condicao(db, coluna, termo),
+                freelancer.profissao_id.in_(profissoes),
+            )
+        )
+        .order_by(desc(pontuacao), freelancer.id)
+        .limit(limite)
+        .all()
+    )
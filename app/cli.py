@@ -0,0 +1,141 @@
+import argparse
+from datetime import date
+
+from . import (
+    agregados,
+    disponibilidade,
+    estatisticas,
+    migracoes,
+    outbox,
+    particionamento,
+)
+from .database import SessionLocal, get_engine
+
+
+def migrar(args):
+    aplicadas = migracoes.aplicar(get_engine(), saida=print)
+    print(f"{len(aplicadas)} migração(ões) aplicada(s)")
+
+
+def status_migracoes(args):
+    for versao, nome, _ in migracoes.pendentes(get_engine()):
+        print(f"Pendente: {nome}")
+
+
+def reconciliar_avaliacoes(args):
+    db = SessionLocal()
+    try:
+        # Notas ainda no outbox entram antes, para não serem contadas de novo
+        outbox.aplicar_pendentes(db)
+        agregados.reconciliar_agregados(db)
+        db.commit()
+    finally:
+        db.close()
+    print("Agregados de avaliação reconstruídos")
+
+
+def reconciliar_disponibilidade(args):
+    db = SessionLocal()
+    try:
+        disponibilidade.reconciliar(db)
+        db.commit()
+    finally:
+        db.close()
+    print("Índice de disponibilidade dos freelancers reconstruído")
+
+
+def reconciliar_estatisticas(args):
+    db = SessionLocal()
+    try:
+        outbox.aplicar_pendentes(db)
+        estatisticas.reconciliar(db)
+        db.commit()
+    finally:
+        db.close()
+    print("Estatísticas dos dashboards reconstruídas")
+
+
+def processar_outbox(args):
+    aplicados = outbox.drenar()
+    print(f"{aplicados} evento(s) do outbox aplicado(s)")
+
+
+def particionar_eventos(args):
+    # A conversão remove as chaves estrangeiras que apontam para eventos; a
+    # flag confirma que o schema fica sem elas
+    if not args.sem_fk_eventos:
+        raise SystemExit(
+            "O particionamento remove a chave estrangeira "
+            "propostas_servico.evento_id; passe --sem-fk-eventos para confirmar"
+        )
+    engine = get_engine()
+    # Migrações de índice usam CONCURRENTLY, que a tabela particionada não aceita
+    if migracoes.pendentes(engine):
+        raise SystemExit("Aplique as migrações pendentes antes de particionar")
+    with engine.begin() as conn:
+        criadas = particionamento.particionar(conn, args.meses_futuros)
+    for nome in criadas:
+        print(f"Partição criada: {nome}")
+    print(f"{len(criadas)} partição(ões) criada(s)")
+
+
+def particoes_eventos(args):
+    with get_engine().connect() as conn:
+        for nome in particionamento.particoes_lidas(conn, args.de, args.ate):
+            print(nome)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    subparsers.add_parser(
+        "migrar", help="Aplica as migrações pendentes do schema"
+    ).set_defaults(func=migrar)
+    subparsers.add_parser(
+        "migracoes-pendentes", help="Lista as migrações ainda não aplicadas"
+    ).set_defaults(func=status_migracoes)
+    subparsers.add_parser(
+        "reconciliar-avaliacoes",
+        help="Reconstrói contagem, soma e média de avaliações a partir da tabela avaliacoes",
+    ).set_defaults(func=reconciliar_avaliacoes)
+    subparsers.add_parser(
+        "reconciliar-disponibilidade",
+        help="Reconstrói o índice de ocupação dos freelancers a partir das propostas aceitas",
+    ).set_defaults(func=reconciliar_disponibilidade)
+    subparsers.add_parser(
+        "reconciliar-estatisticas",
+        help="Reconstrói as estatísticas dos dashboards de organizadores e freelancers",
+    ).set_defaults(func=reconciliar_estatisticas)
+
+    subparsers.add_parser(
+        "processar-outbox",
+        help="Aplica os eventos pendentes do outbox (para OUTBOX_WORKERS=0)",
+    ).set_defaults(func=processar_outbox)
+
+    particionar = subparsers.add_parser(
+        "particionar-eventos",
+        help="Particiona eventos por mês de data_evento (Postgres) e cria as "
+        "partições dos próximos meses; rode de novo periodicamente",
+    )
+    particionar.add_argument("--meses-futuros", type=int, default=12)
+    particionar.add_argument(
+        "--sem-fk-eventos",
+        action="store_true",
+        help="Confirma a remoção das chaves estrangeiras que apontam para eventos",
+    )
+    particionar.set_defaults(func=particionar_eventos)
+    particoes = subparsers.add_parser(
+        "particoes-eventos",
+        help="Lista, pelo EXPLAIN, as partições lidas por uma consulta de período",
+    )
+    particoes.add_argument("--de", type=date.fromisoformat, required=True)
+    particoes.add_argument("--ate", type=date.fromisoformat, required=True)
+    particoes.set_defaults(func=particoes_eventos)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""GET condicional (ETag/Last-Modified) das listagens.
+
+O validador de uma listagem é um agregado sobre o escopo da consulta (os
+filtros, sem paginação): o total de linhas e o maior `atualizado_em` das
+tabelas envolvidas. Ele é calculado antes da página, então um `If-None-Match`
+que bate é respondido com 304 sem buscar nem serializar as linhas.
+
+Nas tabelas cujos filtros usam colunas que mudam (a busca por especialidade ou
+por nome, o período dos eventos), o carimbo é o da tabela inteira: uma linha
+que sai do escopo numa atualização também muda o ETag e o Last-Modified. As
+listagens com cache guardam o validador com a página, e um acerto no cache
+não consulta o banco.
+"""
+
+import hashlib
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.orm import Query
+
+from . import cache, replicas
+
+
+class Validador:
+    def __init__(self, etag=None, ultima_modificacao=None):
+        self.etag = etag
+        self.ultima_modificacao = ultima_modificacao
+
+    def cabecalhos(self) -> dict:
+        if self.etag is None:
+            return {}
+        # no-cache: o cliente pode guardar a resposta, mas revalida a cada uso
+        cabecalhos = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if self.ultima_modificacao is not None:
+            cabecalhos["Last-Modified"] = format_datetime(
+                self.ultima_modificacao.replace(tzinfo=timezone.utc), usegmt=True
+            )
+        return cabecalhos
+
+    def nao_modificado(self, request: Request) -> bool:
+        if self.etag is None:
+            return False
+
+        # If-Modified-Since só vale quando o cliente não mandou If-None-Match
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            etags = {etag.strip() for etag in if_none_match.split(",")}
+            if "*" in etags:
+                return True
+            # Comparação fraca: W/"x" e "x" são equivalentes
+            return _sem_prefixo_fraco(self.etag) in {
+                _sem_prefixo_fraco(etag) for etag in etags
+            }
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and self.ultima_modificacao is not None:
+            try:
+                data = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            if data.tzinfo is None:
+                data = data.replace(tzinfo=timezone.utc)
+            ultima = self.ultima_modificacao.replace(tzinfo=timezone.utc, microsecond=0)
+            return ultima <= data
+        return False
+
+    def resposta_nao_modificada(self) -> Response:
+        return Response(status_code=304, headers=self.cabecalhos())
+
+
+def _sem_prefixo_fraco(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def validador(
+    escopo: Query, namespace: str, params: dict, colunas=(), tabelas=()
+) -> Validador:
+    """Validador da listagem `namespace` sobre a consulta `escopo`.
+
+    `colunas` são carimbos agregados sobre o escopo e `tabelas`, carimbos
+    agregados sobre a tabela inteira (um índice em `atualizado_em` deixa o max
+    barato). `params` são os parâmetros da requisição, cursor e limite
+    inclusos, já que cada página tem o seu ETag. Escopo vazio não tem validador.
+    """
+    linha = (
+        escopo.with_entities(
+            func.count(),
+            *(func.max(coluna) for coluna in colunas),
+            *(
+                select(func.max(coluna)).correlate(None).scalar_subquery()
+                for coluna in tabelas
+            ),
+        )
+        .order_by(None)
+        .one()
+    )
+    total, carimbos = linha[0], [c for c in linha[1:] if c is not None]
+    if not total:
+        return Validador()
+
+    partes = [namespace, str(total), *(c.isoformat() for c in carimbos)]
+    partes += sorted(
+        f"{nome}={valor}" for nome, valor in params.items() if valor is not None
+    )
+    resumo = hashlib.sha1("|".join(partes).encode()).hexdigest()[:20]
+    return Validador(f'W/"{resumo}"', max(carimbos, default=None))
+
+
+class _NaoModificado(Exception):
+    # Interrompe o cálculo da página; exceções não são guardadas no cache
+    def __init__(self, validador: Validador):
+        self.validador = validador
+
+
+def listagem(request: Request, validar, listar, namespace=None, params=None):
+    """Resposta de uma listagem com GET condicional.
+
+    `validar()` devolve o `Validador` do escopo e `listar()` o corpo da página.
+    Com `namespace`, a página fica no cache de respostas junto com o validador
+    calculado antes dela. O validador pode ser mais antigo que a página, nunca
+    mais novo: na dúvida o cliente busca a página de novo.
+
+    O cache pode ter sido preenchido por uma leitura em réplica atrasada: um
+    cliente que escreveu há pouco (e lê do primário) não usa a página em cache,
+    e a que ele calcula a substitui.
+    """
+
+    def calcular():
+        validador = validar()
+        if validador.nao_modificado(request):
+            raise _NaoModificado(validador)
+        return listar(), validador
+
+    try:
+        if namespace is None:
+            conteudo, validador = calcular()
+        else:
+            conteudo, validador = cache.respostas.obter_ou_calcular(
+                namespace,
+                params,
+                calcular,
+                renovar=replicas.escreveu_recentemente(request),
+            )
+    except _NaoModificado as nao_modificado:
+        return nao_modificado.validador.resposta_nao_modificada()
+
+    if validador.nao_modificado(request):
+        return validador.resposta_nao_modificada()
+    return Response(
+        conteudo, media_type="application/json", headers=validador.cabecalhos()
+    )
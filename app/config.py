@@ -0,0 +1,100 @@
+import os
+
+# Configuração lida das variáveis de ambiente (ver docker-compose.yml)
+
+
+def _bool(nome: str, padrao: bool = False) -> bool:
+    valor = os.getenv(nome)
+    if valor is None:
+        return padrao
+    return valor.strip().lower() in ("1", "true", "sim", "yes", "on")
+
+
+def _int(nome: str, padrao: int) -> int:
+    valor = os.getenv(nome)
+    return int(valor) if valor else padrao
+
+
+DATABASE_URL = os.getenv(
+    "DATABASE_URL", "postgresql://postgres:postgres@db:5432/conecta"
+)
+
+# Modo assíncrono: troca a sessão dos handlers por uma AsyncSession
+DATABASE_ASYNC = _bool("DATABASE_ASYNC")
+
+# Pool de conexões; em deploys com vários workers o total no banco é
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+DB_POOL_SIZE = _int("DB_POOL_SIZE", 5)
+DB_MAX_OVERFLOW = _int("DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT = _int("DB_POOL_TIMEOUT", 30)
+DB_POOL_RECYCLE = _int("DB_POOL_RECYCLE", 1800)
+DB_POOL_PRE_PING = _bool("DB_POOL_PRE_PING", True)
+
+# Conexões abertas na inicialização para o pool chegar aquecido ao primeiro request
+DB_POOL_WARM = _int("DB_POOL_WARM", DB_POOL_SIZE)
+
+# Aplica as migrações pendentes na inicialização; por padrão isso fica a cargo
+# de `python -m app.cli migrar`, rodado uma vez por deploy
+DB_MIGRATE_ON_STARTUP = _bool("DB_MIGRATE_ON_STARTUP")
+
+# Tempo máximo de cada statement no Postgres, em milissegundos (0 desativa)
+DB_STATEMENT_TIMEOUT_MS = _int("DB_STATEMENT_TIMEOUT_MS", 0)
+
+# Statements mais lentos que isso são logados com o texto SQL (0 desativa)
+DB_SLOW_QUERY_MS = _int("DB_SLOW_QUERY_MS", 200)
+
+# Atrás do PgBouncer o pool fica com ele: a aplicação usa NullPool
+DB_PGBOUNCER = _bool("DB_PGBOUNCER")
+
+# Cache das listagens de freelancers e eventos (em memória, por processo)
+CACHE_ATIVO = _bool("CACHE_ATIVO", True)
+CACHE_TTL_SEGUNDOS = _int("CACHE_TTL_SEGUNDOS", 30)
+CACHE_MAX_ENTRADAS = _int("CACHE_MAX_ENTRADAS", 1024)
+
+# Réplicas de leitura (URLs separadas por vírgula); vazio manda tudo ao primário
+DATABASE_REPLICA_URLS = [
+    url.strip()
+    for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+
+# Intervalo entre as verificações de saúde das réplicas, em segundos
+DB_REPLICA_HEALTH_INTERVAL = _int("DB_REPLICA_HEALTH_INTERVAL", 5)
+
+# Por quantos segundos depois de uma escrita as leituras do mesmo cliente vão ao
+# primário, para ele ver a própria escrita apesar do atraso de replicação
+DB_READ_YOUR_WRITES_SECONDS = _int("DB_READ_YOUR_WRITES_SECONDS", 5)
+
+# Workers do outbox no processo da API (0 desliga; os eventos podem então ser
+# processados com `python -m app.cli processar-outbox`)
+OUTBOX_WORKERS = _int("OUTBOX_WORKERS", 2)
+# Eventos reivindicados e aplicados por transação
+OUTBOX_LOTE = _int("OUTBOX_LOTE", 500)
+# Intervalo entre as buscas de um worker sem fila: limita o atraso dos efeitos e
+# deixa os eventos de uma rajada se juntarem em um lote
+OUTBOX_INTERVALO_MS = _int("OUTBOX_INTERVALO_MS", 200)
+# Tentativas de um evento antes de ele ficar parado na tabela para análise
+OUTBOX_MAX_TENTATIVAS = _int("OUTBOX_MAX_TENTATIVAS", 5)
+
+# Rate limit por cliente (balde de fichas): requests por segundo e rajada
+# permitida; 0 desliga. Atrás de um proxy, o cliente vem do cabeçalho indicado
+# em RATE_LIMIT_CABECALHO_CLIENTE (ex.: X-Forwarded-For)
+RATE_LIMIT_RPS = float(os.getenv("RATE_LIMIT_RPS") or 0)
+RATE_LIMIT_RAJADA = _int("RATE_LIMIT_RAJADA", 20)
+RATE_LIMIT_MAX_CLIENTES = _int("RATE_LIMIT_MAX_CLIENTES", 10000)
+RATE_LIMIT_CABECALHO_CLIENTE = os.getenv("RATE_LIMIT_CABECALHO_CLIENTE", "")
+
+# Requests simultâneos nas rotas com banco, por processo; por padrão a capacidade
+# do pool menos as conexões dos workers do outbox, para ninguém esperar
+# DB_POOL_TIMEOUT por uma conexão (0 desliga; sem pool definido, com PgBouncer
+# ou overflow ilimitado, o padrão é desligado)
+_CAPACIDADE_POOL = (
+    0 if DB_PGBOUNCER or DB_MAX_OVERFLOW < 0 else DB_POOL_SIZE + DB_MAX_OVERFLOW
+)
+ADMISSAO_CONCORRENCIA = _int(
+    "ADMISSAO_CONCORRENCIA",
+    max(_CAPACIDADE_POOL - OUTBOX_WORKERS, 1) if _CAPACIDADE_POOL else 0,
+)
+# Requests que podem esperar uma vaga e por quanto tempo; além disso, 503
+ADMISSAO_FILA_MAX = _int("ADMISSAO_FILA_MAX", 2 * ADMISSAO_CONCORRENCIA)
+ADMISSAO_ESPERA_MS = _int("ADMISSAO_ESPERA_MS", 500)
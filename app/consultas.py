@@ -0,0 +1,51 @@
+"""Consultas só com as colunas dos schemas de resposta, usadas pelas listagens,
+pelas buscas por ids e pelas expansões de objetos relacionados."""
+
+from sqlalchemy import exists, select
+from sqlalchemy.orm import Session
+
+from . import models
+
+
+def existe(db: Session, modelo, id) -> bool:
+    """Se há uma linha de `modelo` com `id`, por um SELECT EXISTS, sem carregar
+    a linha. Uma instância já carregada na sessão dispensa a consulta."""
+    if db.identity_map.get(db.identity_key(modelo, id)) is not None:
+        return True
+    return db.scalar(select(exists().where(modelo.id == id)))
+
+
+def eventos(db: Session):
+    return db.query(
+        models.Evento.id,
+        models.Evento.organizador_id,
+        models.Evento.nome,
+        models.Evento.data_evento,
+        models.Evento.local,
+        models.Evento.descricao,
+    )
+
+
+def freelancers(db: Session):
+    # Freelancer e Usuario em uma única consulta, só com as colunas da resposta
+    return db.query(
+        models.Freelancer.id,
+        models.Usuario.nome,
+        models.Usuario.email,
+        models.Usuario.telefone,
+        models.Usuario.documento,
+        models.Freelancer.especialidade,
+        models.Freelancer.portfolio,
+        models.Freelancer.avaliacao_media,
+    ).join(models.Usuario, models.Usuario.id == models.Freelancer.id)
+
+
+def usuarios(db: Session):
+    return db.query(
+        models.Usuario.id,
+        models.Usuario.nome,
+        models.Usuario.email,
+        models.Usuario.telefone,
+        models.Usuario.documento,
+        models.Usuario.tipo,
+    )
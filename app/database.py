@@ -1,20 +1,434 @@
-from sqlalchemy import create_engine
+import functools
+import inspect
+import logging
+import threading
+import time
+
+from fastapi import Depends, Request, params
+from fastapi.routing import APIRoute
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+from . import config, instrumentacao, metricas
+
+logger = logging.getLogger(__name__)
 
 # Configuração do banco de dados
-SQLALCHEMY_DATABASE_URL = "postgresql://postgres:postgres@db:5432/conecta"
+SQLALCHEMY_DATABASE_URL = config.DATABASE_URL
+
+# Modo assíncrono: DATABASE_ASYNC=1 troca a sessão dos handlers por uma AsyncSession
+ASYNC_MODE = config.DATABASE_ASYNC
+
+# Drivers assíncronos equivalentes aos drivers síncronos
+_DRIVERS_ASYNC = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+# Métricas do pool de conexões
+_espera_checkout = metricas.registro.histograma(
+    "db_pool_checkout_wait_seconds",
+    "Tempo de espera para obter uma conexão do pool",
+    ("engine",),
+)
+_timeouts_checkout = metricas.registro.contador(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts que estouraram DB_POOL_TIMEOUT",
+    ("engine",),
+)
+_conexoes_em_uso = metricas.registro.medidor(
+    "db_pool_checked_out", "Conexões do pool em uso", ("engine",)
+)
+_saturacao = metricas.registro.medidor(
+    "db_pool_saturation",
+    "Fração da capacidade do pool (pool_size + max_overflow) em uso",
+    ("engine",),
+)
+
+_duracao_query = metricas.registro.histograma(
+    "db_query_duration_seconds", "Duração de cada statement SQL", ("engine",)
+)
+_queries_lentas = metricas.registro.contador(
+    "db_slow_queries_total",
+    "Statements mais lentos que DB_SLOW_QUERY_MS",
+    ("engine",),
+)
+
+
+class _PoolMedido:
+    """Mede quanto tempo cada checkout espera por uma conexão livre."""
+
+    nome_engine = "primary"
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            _timeouts_checkout.incrementar(engine=self.nome_engine)
+            raise
+        finally:
+            _espera_checkout.observar(
+                time.perf_counter() - inicio, engine=self.nome_engine
+            )
+
+
+def _classe_pool(base, nome: str):
+    return type(f"{base.__name__}Medido", (_PoolMedido, base), {"nome_engine": nome})
+
+
+def _registrar_metricas_pool(nome: str, engine_sync):
+    # max_overflow negativo significa overflow ilimitado: sem saturação definida
+    capacidade = 0
+    if config.DB_MAX_OVERFLOW >= 0:
+        capacidade = config.DB_POOL_SIZE + config.DB_MAX_OVERFLOW
+
+    # O pool é lido a cada coleta porque engine.dispose() o substitui
+    def em_uso():
+        yield {"engine": nome}, engine_sync.pool.checkedout()
+
+    def saturacao():
+        em_uso = engine_sync.pool.checkedout()
+        yield {"engine": nome}, em_uso / capacidade if capacidade else 0.0
+
+    _conexoes_em_uso.adicionar_funcao(em_uso)
+    _saturacao.adicionar_funcao(saturacao)
+
+
+def _registrar_eventos_sql(nome: str, engine_sync):
+    limite_lenta = config.DB_SLOW_QUERY_MS / 1000
+
+    @event.listens_for(engine_sync, "before_cursor_execute")
+    def antes(conn, cursor, statement, parameters, context, executemany):
+        # O contexto é de cada execução: um statement que falha não deixa resto
+        context._inicio_query = time.perf_counter()
+
+    @event.listens_for(engine_sync, "after_cursor_execute")
+    def depois(conn, cursor, statement, parameters, context, executemany):
+        duracao = time.perf_counter() - context._inicio_query
+        _duracao_query.observar(duracao, engine=nome)
+        instrumentacao.registrar_query(duracao)
+        if limite_lenta and duracao >= limite_lenta:
+            _queries_lentas.incrementar(engine=nome)
+            # Só o texto do statement: os parâmetros podem ter dados pessoais
+            logger.warning(
+                "Query lenta (%.1f ms, engine %s): %s", duracao * 1000, nome, statement
+            )
+
+    @event.listens_for(engine_sync, "commit")
+    def commit(conn):
+        instrumentacao.registrar_commit()
+
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def url_async(url: str):
+    url = make_url(url)
+    return url.set(drivername=_DRIVERS_ASYNC.get(url.drivername, url.drivername))
+
+
+def criar_engine(url: str, nome: str = "primary", assincrono: bool = False):
+    """Cria a engine com as configurações de pool lidas do ambiente."""
+    url = url_async(url) if assincrono else make_url(url)
+    backend = url.get_backend_name()
+    opcoes = {"pool_pre_ping": config.DB_POOL_PRE_PING}
+    connect_args = {}
+
+    if config.DB_PGBOUNCER:
+        # O PgBouncer já faz o pool; o asyncpg não pode usar prepared statements
+        # nomeados com pool_mode=transaction
+        opcoes["poolclass"] = NullPool
+        if assincrono and backend == "postgresql":
+            connect_args["statement_cache_size"] = 0
+    elif backend != "sqlite" or url.database not in (None, "", ":memory:"):
+        base = AsyncAdaptedQueuePool if assincrono else QueuePool
+        opcoes.update(
+            poolclass=_classe_pool(base, nome),
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            pool_timeout=config.DB_POOL_TIMEOUT,
+            pool_recycle=config.DB_POOL_RECYCLE,
+        )
+
+    if backend == "sqlite" and not assincrono:
+        # Os handlers síncronos rodam no threadpool
+        connect_args["check_same_thread"] = False
+
+    if config.DB_STATEMENT_TIMEOUT_MS and backend == "postgresql":
+        if assincrono:
+            connect_args["server_settings"] = {
+                "statement_timeout": str(config.DB_STATEMENT_TIMEOUT_MS)
+            }
+        else:
+            connect_args["options"] = (
+                f"-c statement_timeout={config.DB_STATEMENT_TIMEOUT_MS}"
+            )
+
+    if connect_args:
+        opcoes["connect_args"] = connect_args
+
+    if assincrono:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        nova_engine = create_async_engine(url, **opcoes)
+        engine_sync = nova_engine.sync_engine
+    else:
+        nova_engine = engine_sync = create_engine(url, **opcoes)
+
+    if isinstance(engine_sync.pool, _PoolMedido):
+        _registrar_metricas_pool(nome, engine_sync)
+    _registrar_eventos_sql(nome, engine_sync)
+
+    return nova_engine
+
+
+class _SessaoPreguicosa(Session):
+    """Sessão que só cria a engine quando precisa de uma conexão."""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.bind is None:
+            return get_engine()
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+SessionLocal = sessionmaker(class_=_SessaoPreguicosa, autocommit=False, autoflush=False)
 
 Base = declarative_base()
 
+# As engines são criadas no primeiro uso: importar a aplicação não abre conexões
+_engine = None
+_async_engine = None
+_async_sessionmaker = None
+_lock_engines = threading.Lock()
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _lock_engines:
+            if _engine is None:
+                _engine = criar_engine(SQLALCHEMY_DATABASE_URL)
+    return _engine
+
+
+def get_async_engine():
+    global _async_engine, _async_sessionmaker
+    if _async_engine is None:
+        with _lock_engines:
+            if _async_engine is None:
+                from sqlalchemy.ext.asyncio import async_sessionmaker
+
+                _async_engine = criar_engine(
+                    SQLALCHEMY_DATABASE_URL, nome="primary_async", assincrono=True
+                )
+                # As sessões assíncronas usam a classe do SessionLocal por
+                # baixo e recebem os mesmos eventos de sessão
+                _async_sessionmaker = async_sessionmaker(
+                    _async_engine,
+                    autoflush=False,
+                    sync_session_class=SessionLocal.class_,
+                )
+    return _async_engine
+
+
+def AsyncSessionLocal(**opcoes):
+    get_async_engine()
+    return _async_sessionmaker(**opcoes)
+
+
+async def fechar_engines():
+    """Fecha as conexões ociosas das engines já criadas, no fim do lifespan.
 
-# Dependency para obter a sessão do DB
+    Com o aiosqlite a conexão é uma thread: uma conexão que fica aberta no pool
+    impede o processo de terminar.
+    """
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    if _engine is not None:
+        _engine.dispose()
+
+
+def __getattr__(nome):
+    # Compatibilidade com `from .database import engine`
+    if nome == "engine":
+        return get_engine()
+    if nome == "async_engine":
+        return get_async_engine() if ASYNC_MODE else None
+    raise AttributeError(nome)
+
+
+def aquecer_pool(conexoes: int = None):
+    """Abre `conexoes` conexões ao mesmo tempo e as devolve ao pool."""
+    conexoes = config.DB_POOL_WARM if conexoes is None else conexoes
+    abertas = []
+    try:
+        for _ in range(conexoes):
+            conexao = get_engine().connect()
+            abertas.append(conexao)
+            conexao.execute(text("SELECT 1"))
+    finally:
+        for conexao in abertas:
+            conexao.close()
+
+
+async def aquecer_pool_async(conexoes: int = None):
+    conexoes = config.DB_POOL_WARM if conexoes is None else conexoes
+    abertas = []
+    try:
+        for _ in range(conexoes):
+            conexao = await get_async_engine().connect()
+            abertas.append(conexao)
+            await conexao.execute(text("SELECT 1"))
+    finally:
+        for conexao in abertas:
+            await conexao.close()
+
+
+def estado_pool():
+    """Situação do pool principal para o endpoint de readiness."""
+    engine_ativa = (
+        _async_engine.sync_engine if ASYNC_MODE and _async_engine else _engine
+    )
+    if engine_ativa is None:
+        return {"engine": False, "aquecido": False}
+
+    pool = engine_ativa.pool
+    if not isinstance(pool, QueuePool):
+        # NullPool/StaticPool não mantêm conexões ociosas para aquecer
+        return {"engine": True, "aquecido": True}
+
+    ociosas = pool.checkedin()
+    return {
+        "engine": True,
+        "aquecido": ociosas + pool.checkedout()
+        >= min(config.DB_POOL_WARM, pool.size()),
+        "conexoes_ociosas": ociosas,
+        "conexoes_em_uso": pool.checkedout(),
+    }
+
+
+# Dependency para obter a sessão do DB. A transação é da rota: `DbRoute` faz o
+# commit quando o handler termina sem erro (ver `_unidade_de_trabalho`), e o que
+# não foi confirmado é desfeito ao fechar a sessão. Os objetos não expiram no
+# commit, então a resposta é montada sem buscá-los de novo.
 def get_db():
-    db = SessionLocal()
+    db = SessionLocal(expire_on_commit=False)
     try:
         yield db
     finally:
         db.close()
+
+
+# Dependency para obter a sessão assíncrona do DB
+async def get_async_db():
+    async with AsyncSessionLocal(expire_on_commit=False) as db:
+        yield db
+
+
+# Dependency para os handlers só de leitura: sessão em uma réplica, se houver
+def get_read_db(request: Request):
+    from . import replicas
+
+    db = SessionLocal(bind=replicas.engine_leitura(request))
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request):
+    from . import replicas
+
+    # Com a réplica, a engine do primário (e a fábrica de sessões) pode ainda
+    # não existir
+    engine = replicas.engine_leitura(request, assincrono=True)
+    async with AsyncSessionLocal(bind=engine) as db:
+        yield db
+
+
+# Dependências síncronas e suas equivalentes no modo assíncrono
+_DEPENDENCIAS_ASYNC = {get_db: get_async_db, get_read_db: get_async_read_db}
+
+
+def _parametro_sessao(endpoint, dependencias):
+    """Nome do parâmetro do handler que recebe uma das `dependencias`, ou None."""
+    sessoes = [
+        nome
+        for nome, parametro in inspect.signature(endpoint).parameters.items()
+        if isinstance(parametro.default, params.Depends)
+        and parametro.default.dependency in dependencias
+    ]
+    if len(sessoes) > 1:
+        raise TypeError(f"{endpoint.__name__} usa mais de uma sessão do banco")
+    return sessoes[0] if sessoes else None
+
+
+def _unidade_de_trabalho(endpoint):
+    """Envolve um handler que usa `get_db` em uma transação: um commit quando
+    ele termina sem erro, rollback se ele levanta uma exceção.
+
+    O commit fica aqui, e não na saída de `get_db`, porque nesta versão do
+    FastAPI a saída das dependências com yield só roda depois de a resposta ser
+    enviada: um commit que falhasse ali já teria respondido sucesso.
+    """
+    nome = _parametro_sessao(endpoint, {get_db})
+    if nome is None:
+        return endpoint
+
+    @functools.wraps(endpoint)
+    def handler(**kwargs):
+        db = kwargs[nome]
+        try:
+            resultado = endpoint(**kwargs)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return resultado
+
+    return handler
+
+
+def _endpoint_async(endpoint):
+    """Converte um handler síncrono em `async def` sobre uma AsyncSession.
+
+    O corpo do handler roda via `AsyncSession.run_sync`: o código ORM continua
+    o mesmo, mas o I/O com o banco é feito pelo driver assíncrono sem ocupar
+    uma thread do threadpool.
+    """
+    assinatura = inspect.signature(endpoint)
+    nome = _parametro_sessao(endpoint, _DEPENDENCIAS_ASYNC)
+    if nome is None:
+        return endpoint
+
+    @functools.wraps(endpoint)
+    async def handler(**kwargs):
+        db = kwargs.pop(nome)
+        return await db.run_sync(lambda sessao: endpoint(**kwargs, **{nome: sessao}))
+
+    parametros = [
+        parametro.replace(
+            default=Depends(_DEPENDENCIAS_ASYNC[parametro.default.dependency])
+        )
+        if nome_parametro == nome
+        else parametro
+        for nome_parametro, parametro in assinatura.parameters.items()
+    ]
+    handler.__signature__ = assinatura.replace(parameters=parametros)
+    return handler
+
+
+class DbRoute(APIRoute):
+    """Rota dos routers que usam o banco: um commit por request nos handlers com
+    `get_db` (ver `_unidade_de_trabalho`) e, no modo assíncrono, ver
+    `_endpoint_async`."""
+
+    def __init__(self, path, endpoint, **kwargs):
+        endpoint = _unidade_de_trabalho(endpoint)
+        if ASYNC_MODE:
+            endpoint = _endpoint_async(endpoint)
+        super().__init__(path, endpoint, **kwargs)
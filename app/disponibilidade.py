@@ -0,0 +1,32 @@
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from . import agregados, models
+
+ACEITA = "Aceita"
+
+
+def ajustar(db: Session, variacoes):
+    """Aplica as variações {(freelancer_id, data): delta} ao índice de ocupação,
+    com um único statement.
+
+    Não faz commit: entra na mesma transação da escrita das propostas.
+    """
+    agregados.somar(db, models.OcupacaoFreelancer, variacoes)
+
+
+def reconciliar(db):
+    """Reconstrói o índice de ocupação a partir das propostas aceitas."""
+    ocupacao = models.OcupacaoFreelancer
+    proposta = models.PropostaServico
+
+    db.execute(delete(ocupacao).execution_options(synchronize_session=False))
+    db.execute(
+        insert(ocupacao).from_select(
+            ["freelancer_id", "data", "quantidade"],
+            select(proposta.freelancer_id, models.Evento.data_evento, func.count())
+            .join(models.Evento, models.Evento.id == proposta.evento_id)
+            .where(proposta.status == ACEITA)
+            .group_by(proposta.freelancer_id, models.Evento.data_evento),
+        )
+    )
@@ -0,0 +1,175 @@
+"""Estatísticas dos dashboards de organizadores e freelancers.
+
+Os números ficam pré-agregados em `EstatisticaUsuario`, uma linha por (usuário,
+métrica, chave), e são atualizados na mesma transação das escritas (as notas,
+pelos workers do outbox):
+
+- propostas por status: do freelancer e do organizador dono do evento;
+- eventos por mês: eventos criados (organizador) ou com proposta aceita
+  (freelancer);
+- notas recebidas, de 1 a 5.
+
+Ler as estatísticas de um usuário é uma busca pelo prefixo da chave primária.
+"""
+
+from collections import Counter, defaultdict
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from . import agregados, disponibilidade, models, schemas
+
+PROPOSTAS_STATUS = "propostas_status"
+EVENTOS_MES = "eventos_mes"
+NOTAS = "notas"
+
+
+def _mes(data) -> str:
+    return data.strftime("%Y-%m")
+
+
+def _aplicar(db: Session, variacoes: Counter):
+    # Todas as variações do request em um único statement
+    agregados.somar(db, models.EstatisticaUsuario, variacoes)
+
+
+def dados_eventos(db: Session, evento_ids) -> dict:
+    """{id: (data_evento, organizador_id)} dos eventos, com uma única consulta."""
+    evento_ids = set(evento_ids)
+    if not evento_ids:
+        return {}
+    linhas = db.execute(
+        select(
+            models.Evento.id, models.Evento.data_evento, models.Evento.organizador_id
+        ).where(models.Evento.id.in_(evento_ids))
+    )
+    return {id: (data, organizador_id) for id, data, organizador_id in linhas}
+
+
+def registrar_propostas(db: Session, transicoes):
+    """Atualiza estatísticas e o índice de disponibilidade para as propostas
+    criadas ou alteradas.
+
+    Cada transição é (freelancer_id, organizador_id, data_evento, status
+    anterior, status novo), com status anterior None para propostas novas.
+    """
+    variacoes = Counter()
+    ocupacao = Counter()
+    for freelancer_id, organizador_id, data, anterior, novo in transicoes:
+        if anterior == novo:
+            continue
+        for usuario_id in (freelancer_id, organizador_id):
+            if anterior is not None:
+                variacoes[(usuario_id, PROPOSTAS_STATUS, anterior)] -= 1
+            variacoes[(usuario_id, PROPOSTAS_STATUS, novo)] += 1
+
+        aceita = (novo == disponibilidade.ACEITA) - (anterior == disponibilidade.ACEITA)
+        if aceita:
+            variacoes[(freelancer_id, EVENTOS_MES, _mes(data))] += aceita
+            ocupacao[(freelancer_id, data)] += aceita
+
+    _aplicar(db, variacoes)
+    disponibilidade.ajustar(db, ocupacao)
+
+
+def registrar_eventos(db: Session, eventos):
+    """Conta os eventos criados, dados como pares (organizador_id, data_evento)."""
+    _aplicar(
+        db,
+        Counter(
+            (organizador_id, EVENTOS_MES, _mes(data))
+            for organizador_id, data in eventos
+        ),
+    )
+
+
+def registrar_notas(db: Session, notas):
+    """Conta as notas recebidas, dadas como pares (avaliado_id, nota)."""
+    _aplicar(
+        db,
+        Counter(
+            (avaliado_id, NOTAS, str(nota))
+            for avaliado_id, nota in notas
+            if nota is not None
+        ),
+    )
+
+
+def obter(db: Session, usuario_id: int) -> schemas.EstatisticasResponse:
+    estatistica = models.EstatisticaUsuario
+    valores = defaultdict(dict)
+    for metrica, chave, quantidade in db.execute(
+        select(estatistica.metrica, estatistica.chave, estatistica.quantidade).where(
+            estatistica.usuario_id == usuario_id
+        )
+    ):
+        if quantidade:
+            valores[metrica][chave] = quantidade
+
+    por_status = valores[PROPOSTAS_STATUS]
+    total = sum(por_status.values())
+    return schemas.EstatisticasResponse(
+        usuario_id=usuario_id,
+        total_propostas=total,
+        propostas_por_status=por_status,
+        taxa_aceitacao=(
+            por_status.get(disponibilidade.ACEITA, 0) / total if total else None
+        ),
+        eventos_por_mes=dict(sorted(valores[EVENTOS_MES].items())),
+        distribuicao_notas={
+            nota: valores[NOTAS].get(str(nota), 0) for nota in range(1, 6)
+        },
+    )
+
+
+def reconciliar(db):
+    """Reconstrói todas as estatísticas a partir de eventos, propostas e avaliações."""
+    evento = models.Evento
+    proposta = models.PropostaServico
+    avaliacao = models.Avaliacao
+
+    variacoes = Counter()
+    consultas = [
+        select(proposta.freelancer_id, proposta.status, func.count()).group_by(
+            proposta.freelancer_id, proposta.status
+        ),
+        select(evento.organizador_id, proposta.status, func.count())
+        .join(evento, evento.id == proposta.evento_id)
+        .group_by(evento.organizador_id, proposta.status),
+    ]
+    for consulta in consultas:
+        for usuario_id, status, quantidade in db.execute(consulta):
+            variacoes[(usuario_id, PROPOSTAS_STATUS, status)] += quantidade
+
+    # Agrupado por dia no banco e por mês aqui, sem depender do dialeto
+    consultas = [
+        select(evento.organizador_id, evento.data_evento, func.count()).group_by(
+            evento.organizador_id, evento.data_evento
+        ),
+        select(proposta.freelancer_id, evento.data_evento, func.count())
+        .join(evento, evento.id == proposta.evento_id)
+        .where(proposta.status == disponibilidade.ACEITA)
+        .group_by(proposta.freelancer_id, evento.data_evento),
+    ]
+    for consulta in consultas:
+        for usuario_id, data, quantidade in db.execute(consulta):
+            variacoes[(usuario_id, EVENTOS_MES, _mes(data))] += quantidade
+
+    for usuario_id, nota, quantidade in db.execute(
+        select(avaliacao.avaliado_id, avaliacao.nota, func.count())
+        .where(avaliacao.nota.is_not(None))
+        .group_by(avaliacao.avaliado_id, avaliacao.nota)
+    ):
+        variacoes[(usuario_id, NOTAS, str(nota))] += quantidade
+
+    db.execute(
+        delete(models.EstatisticaUsuario).execution_options(synchronize_session=False)
+    )
+    if variacoes:
+        db.execute(
+            insert(models.EstatisticaUsuario),
+            [
+                dict(usuario_id=usuario_id, metrica=metrica, chave=chave, quantidade=n)
+                for (usuario_id, metrica, chave), n in variacoes.items()
+            ],
+        )
@@ -0,0 +1,99 @@
+"""Exportação em streaming (NDJSON ou CSV) de consultas grandes.
+
+As linhas vêm do banco em lotes por um cursor do lado do servidor (`yield_per`,
+que ativa `stream_results`) e cada lote é serializado e enviado antes do próximo
+ser buscado: a memória fica constante qualquer que seja o tamanho da exportação.
+
+A exportação usa uma sessão síncrona própria, fora da sessão do request, e segura
+uma conexão do pool (de uma réplica, quando configuradas) enquanto o cliente
+estiver lendo.
+"""
+
+import csv
+import io
+import json
+from enum import Enum
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from . import replicas
+from .database import SessionLocal
+
+# Linhas buscadas por FETCH do cursor e enviadas por pedaço da resposta
+TAMANHO_LOTE = 1000
+
+
+class Formato(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+_TIPOS_MIDIA = {
+    Formato.ndjson: "application/x-ndjson",
+    Formato.csv: "text/csv; charset=utf-8",
+}
+
+
+def _valor_json(valor):
+    if hasattr(valor, "isoformat"):
+        return valor.isoformat()
+    raise TypeError(f"Valor não serializável: {valor!r}")
+
+
+def _ndjson(colunas, lotes):
+    for lote in lotes:
+        yield "".join(
+            json.dumps(
+                dict(zip(colunas, linha)), default=_valor_json, ensure_ascii=False
+            )
+            + "\n"
+            for linha in lote
+        )
+
+
+def _csv(colunas, lotes):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(colunas)
+    for lote in lotes:
+        escritor.writerows(lote)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Sem linhas, o cabeçalho ainda precisa sair
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def exportar(statement, formato: Formato, nome_arquivo: str) -> StreamingResponse:
+    """Resposta em streaming com as linhas de `statement` (um `select` de colunas)."""
+    # Exportações toleram o atraso de replicação: vão para uma réplica, se houver
+    db = SessionLocal(bind=replicas.engine_leitura())
+    try:
+        resultado = db.execute(statement.execution_options(yield_per=TAMANHO_LOTE))
+    except Exception:
+        db.close()
+        raise
+    colunas = list(resultado.keys())
+    lotes = resultado.partitions()
+
+    gerar = _ndjson if formato is Formato.ndjson else _csv
+    return StreamingResponse(
+        gerar(colunas, lotes),
+        media_type=_TIPOS_MIDIA[formato],
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="{nome_arquivo}.{formato.value}"'
+            )
+        },
+        # Roda também quando o cliente desconecta no meio: fecha o cursor e
+        # devolve a conexão ao pool
+        background=BackgroundTask(db.close),
+    )
+
+
+def validar_periodo(de, ate):
+    if de and ate and de > ate:
+        raise HTTPException(status_code=400, detail="'de' deve ser anterior a 'ate'")
@@ -0,0 +1,122 @@
+"""Instrumentação por request: latência por rota, queries e tempo de banco.
+
+O middleware abre uma `Medicao` em um contextvar; os eventos de SQL registrados
+em `database.criar_engine` somam nela cada statement executado e cada commit. O contextvar é
+copiado para o threadpool dos handlers síncronos e para o `run_sync` do modo
+assíncrono, e a `Medicao` é mutável, então as somas feitas lá chegam ao
+middleware.
+"""
+
+import time
+from contextvars import ContextVar
+
+from . import metricas
+
+_latencia = metricas.registro.histograma(
+    "http_request_duration_seconds",
+    "Latência dos requests por rota",
+    ("method", "route", "status"),
+)
+_queries_request = metricas.registro.histograma(
+    "db_queries_per_request",
+    "Statements SQL executados por request",
+    ("method", "route"),
+    buckets=(0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 50, 100),
+)
+_tempo_banco_request = metricas.registro.histograma(
+    "db_time_per_request_seconds",
+    "Tempo gasto no banco por request",
+    ("method", "route"),
+)
+
+# Rotas não encontradas ficam num rótulo só, para não criar uma série por URL
+ROTA_DESCONHECIDA = "desconhecida"
+
+
+class Medicao:
+    __slots__ = ("queries", "commits", "tempo_banco")
+
+    def __init__(self):
+        self.queries = 0
+        self.commits = 0
+        self.tempo_banco = 0.0
+
+
+_medicao_atual: ContextVar = ContextVar("medicao_atual", default=None)
+
+
+def medicao_atual():
+    return _medicao_atual.get()
+
+
+def registrar_query(duracao: float):
+    """Soma um statement à medição do request atual, se houver uma."""
+    medicao = _medicao_atual.get()
+    if medicao is not None:
+        medicao.queries += 1
+        medicao.tempo_banco += duracao
+
+
+def registrar_commit():
+    medicao = _medicao_atual.get()
+    if medicao is not None:
+        medicao.commits += 1
+
+
+def rota(scope) -> str:
+    # O FastAPI grava a rota encontrada no scope; o template evita a cardinalidade
+    # dos parâmetros de path
+    encontrada = scope.get("route")
+    return getattr(encontrada, "path", None) or ROTA_DESCONHECIDA
+
+
+def _server_timing(medicao: Medicao, total: float) -> bytes:
+    return (
+        f"db;dur={medicao.tempo_banco * 1000:.1f};"
+        f'desc="{medicao.queries} queries, {medicao.commits} commits", '
+        f"app;dur={total * 1000:.1f}"
+    ).encode()
+
+
+class MiddlewareInstrumentacao:
+    """Middleware ASGI que mede cada request HTTP e devolve `Server-Timing`."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        medicao = Medicao()
+        token = _medicao_atual.set(medicao)
+        inicio = time.perf_counter()
+        status = 500
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+                total = time.perf_counter() - inicio
+                cabecalhos = list(mensagem.get("headers", []))
+                cabecalhos.append((b"server-timing", _server_timing(medicao, total)))
+                mensagem = {**mensagem, "headers": cabecalhos}
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _medicao_atual.reset(token)
+            metodo = scope["method"]
+            nome_rota = rota(scope)
+            _latencia.observar(
+                time.perf_counter() - inicio,
+                method=metodo,
+                route=nome_rota,
+                status=status,
+            )
+            _queries_request.observar(medicao.queries, method=metodo, route=nome_rota)
+            _tempo_banco_request.observar(
+                medicao.tempo_banco, method=metodo, route=nome_rota
+            )
@@ -0,0 +1,62 @@
+from contextlib import contextmanager
+
+from fastapi import HTTPException
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import schemas
+
+
+def ids_existentes(db: Session, coluna, valores):
+    """Quais dos `valores` existem em `coluna`, com uma única consulta IN."""
+    valores = set(valores)
+    if not valores:
+        return set()
+    return set(db.scalars(select(coluna).where(coluna.in_(valores))))
+
+
+@contextmanager
+def _conflito_em_409(db: Session):
+    # Uma corrida com outra escrita (ex.: mesmo email verificado livre antes do
+    # INSERT) invalida o lote inteiro
+    try:
+        yield
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail="Conflito com outra escrita ao inserir o lote; tente novamente",
+        )
+
+
+def inserir(db: Session, modelo, linhas, retornar_ids: bool = True):
+    """INSERT de várias linhas em um único statement (multi-row VALUES).
+
+    Com `retornar_ids`, devolve os ids gerados na mesma ordem de `linhas`. Uma
+    violação de constraint vira 409, como em `gravar`.
+    """
+    if not linhas:
+        return []
+    with _conflito_em_409(db):
+        if not retornar_ids:
+            db.execute(insert(modelo), linhas)
+            return []
+        statement = insert(modelo).returning(modelo.id, sort_by_parameter_order=True)
+        return list(db.scalars(statement, linhas))
+
+
+def gravar(db: Session):
+    """Envia as escritas pendentes do lote (flush); o commit é feito pela rota."""
+    with _conflito_em_409(db):
+        db.flush()
+
+
+def resultado(total: int, ids: dict, erros: dict) -> schemas.ResultadoLote:
+    return schemas.ResultadoLote(
+        inseridos=len(ids),
+        resultados=[
+            schemas.ResultadoItemLote(indice=i, id=ids.get(i), erro=erros.get(i))
+            for i in range(total)
+        ],
+    )
@@ -1,17 +1,80 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse
+
+from . import (
+    admissao,
+    config,
+    database,
+    instrumentacao,
+    metricas,
+    migracoes,
+    outbox,
+    replicas,
+)
+from .routers import (
+    freelancers,
+    organizadores,
+    eventos,
+    propostas,
+    avaliacoes,
+    usuarios,
+)
+
+logger = logging.getLogger(__name__)
 
-from . import models
-from .database import engine
-from .routers import freelancers, organizadores, eventos, propostas, avaliacoes
 
-# Criar tabelas
-models.Base.metadata.create_all(bind=engine)
+async def _aquecer_pool():
+    try:
+        if database.ASYNC_MODE:
+            await database.aquecer_pool_async()
+        else:
+            await run_in_threadpool(database.aquecer_pool)
+    except Exception:
+        # O readiness continua reportando o pool frio; o app segue servindo
+        logger.exception("Falha ao aquecer o pool de conexões")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nada de banco no import: migrações só se pedidas e o pool aquece em segundo plano
+    if config.DB_MIGRATE_ON_STARTUP:
+        await run_in_threadpool(migracoes.aplicar, database.get_engine())
+    aquecimento = asyncio.create_task(_aquecer_pool())
+    monitoramento = None
+    if replicas.ativas():
+        monitoramento = asyncio.create_task(replicas.monitorar())
+    outbox.iniciar()
+    yield
+    await run_in_threadpool(outbox.parar)
+    aquecimento.cancel()
+    if monitoramento is not None:
+        monitoramento.cancel()
+    await replicas.fechar()
+    await database.fechar_engines()
+
 
 app = FastAPI(
     title="API Conecta",
     description="API para a plataforma Conecta de freelancers e organizadores de eventos",
     version="1.0.0",
+    lifespan=lifespan,
+    # orjson serializa as respostas dos demais endpoints bem mais rápido que o json
+    default_response_class=ORJSONResponse,
+)
+
+routers = (freelancers, organizadores, eventos, propostas, avaliacoes, usuarios)
+
+# Rate limit por cliente e fila de concorrência das rotas com banco; dentro do
+# CORS, para as respostas 429/503 levarem os cabeçalhos dele
+app.add_middleware(
+    admissao.MiddlewareAdmissao,
+    prefixos_banco=[modulo.router.prefix for modulo in routers],
 )
 
 # Configurar CORS
@@ -21,16 +84,41 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Para o navegador expor o Server-Timing em requests de outra origem
+    expose_headers=["Server-Timing"],
 )
 
+# Leituras do cliente vão ao primário logo depois de uma escrita dele
+app.add_middleware(replicas.MiddlewareLeiturasAposEscrita)
+
+# Latência por rota, queries e tempo de banco de cada request
+app.add_middleware(instrumentacao.MiddlewareInstrumentacao)
+
 # Incluir routers
-app.include_router(freelancers.router)
-app.include_router(organizadores.router)
-app.include_router(eventos.router)
-app.include_router(propostas.router)
-app.include_router(avaliacoes.router)
+for modulo in routers:
+    app.include_router(modulo.router)
 
 
 @app.get("/")
 def read_root():
     return {"message": "Bem-vindo à API Conecta"}
+
+
+@app.get("/health/live", include_in_schema=False)
+def health_live():
+    return {"status": "ok"}
+
+
+@app.get("/health/ready", include_in_schema=False)
+def health_ready():
+    estado = database.estado_pool()
+    if not estado["aquecido"]:
+        return JSONResponse({"status": "aquecendo", **estado}, status_code=503)
+    return {"status": "pronto", **estado}
+
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return PlainTextResponse(
+        metricas.registro.renderizar(), media_type="text/plain; version=0.0.4"
+    )
@@ -0,0 +1,166 @@
+import math
+import threading
+from abc import ABC, abstractmethod
+
+# Registro de métricas exposto em /metrics no formato texto do Prometheus
+
+BUCKETS_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _formatar_rotulos(nomes, valores, extra=None):
+    pares = list(zip(nomes, valores))
+    if extra:
+        pares.append(extra)
+    if not pares:
+        return ""
+    conteudo = ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares)
+    return "{" + conteudo + "}"
+
+
+def _formatar_valor(valor):
+    if valor == math.inf:
+        return "+Inf"
+    return repr(float(valor))
+
+
+class _Metrica(ABC):
+    tipo = ""
+
+    def __init__(self, nome: str, ajuda: str, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._lock = threading.Lock()
+
+    def _chave(self, rotulos):
+        return tuple(str(rotulos.get(nome, "")) for nome in self.rotulos)
+
+    @abstractmethod
+    def amostras(self):
+        """Gera (sufixo, nomes dos rótulos, valores dos rótulos, rótulo extra,
+        valor) para cada linha da métrica."""
+
+    def renderizar(self):
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+        for sufixo, nomes, valores, extra, valor in self.amostras():
+            linhas.append(
+                f"{self.nome}{sufixo}{_formatar_rotulos(nomes, valores, extra)} "
+                f"{_formatar_valor(valor)}"
+            )
+        return "\n".join(linhas)
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        super().__init__(nome, ajuda, rotulos)
+        self._valores = {}
+
+    def incrementar(self, valor: float = 1, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def valor(self, **rotulos):
+        return self._valores.get(self._chave(rotulos), 0)
+
+    def amostras(self):
+        with self._lock:
+            itens = list(self._valores.items())
+        for chave, valor in itens:
+            yield "", self.rotulos, chave, None, valor
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nome, ajuda, rotulos=(), buckets=BUCKETS_PADRAO):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series = {}
+
+    def observar(self, valor: float, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [[0] * len(self.buckets), 0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[0][i] += 1
+                    break
+            serie[1] += valor
+            serie[2] += 1
+
+    def amostras(self):
+        with self._lock:
+            itens = [
+                (chave, list(s[0]), s[1], s[2]) for chave, s in self._series.items()
+            ]
+        for chave, contagens, soma, total in itens:
+            acumulado = 0
+            for limite, contagem in zip(self.buckets, contagens):
+                acumulado += contagem
+                yield (
+                    "_bucket",
+                    self.rotulos,
+                    chave,
+                    ("le", _formatar_valor(limite)),
+                    acumulado,
+                )
+            yield "_sum", self.rotulos, chave, None, soma
+            yield "_count", self.rotulos, chave, None, total
+
+
+class Medidor(_Metrica):
+    """Gauge calculado na hora da coleta por `funcao`, que devolve pares
+    (dicionário de rótulos, valor)."""
+
+    tipo = "gauge"
+
+    def __init__(self, nome, ajuda, rotulos=(), funcao=None):
+        super().__init__(nome, ajuda, rotulos)
+        self._funcoes = [funcao] if funcao else []
+
+    def adicionar_funcao(self, funcao):
+        self._funcoes.append(funcao)
+
+    def amostras(self):
+        for funcao in list(self._funcoes):
+            for rotulos, valor in funcao():
+                yield "", self.rotulos, self._chave(rotulos), None, valor
+
+
+class Registro:
+    def __init__(self):
+        self._metricas = {}
+        self._lock = threading.Lock()
+
+    def _obter(self, classe, nome, ajuda, rotulos, **kwargs):
+        with self._lock:
+            metrica = self._metricas.get(nome)
+            if metrica is None:
+                metrica = self._metricas[nome] = classe(nome, ajuda, rotulos, **kwargs)
+            return metrica
+
+    def contador(self, nome, ajuda, rotulos=()) -> Contador:
+        return self._obter(Contador, nome, ajuda, rotulos)
+
+    def histograma(self, nome, ajuda, rotulos=(), buckets=BUCKETS_PADRAO) -> Histograma:
+        return self._obter(Histograma, nome, ajuda, rotulos, buckets=buckets)
+
+    def medidor(self, nome, ajuda, rotulos=()) -> Medidor:
+        return self._obter(Medidor, nome, ajuda, rotulos)
+
+    def renderizar(self) -> str:
+        with self._lock:
+            metricas = list(self._metricas.values())
+        return "\n".join(m.renderizar() for m in metricas) + "\n"
+
+
+registro = Registro()
@@ -0,0 +1,173 @@
+"""Migrações versionadas do schema.
+
+Cada módulo `vNNNN_nome.py` deste pacote define `upgrade(conn)` e é aplicado uma
+única vez, em ordem, com a versão registrada na tabela `schema_versao`.
+Migrações com `TRANSACIONAL = False` rodam em autocommit, o que permite
+`CREATE INDEX CONCURRENTLY` no Postgres sem bloquear escritas.
+"""
+
+import importlib
+import pkgutil
+import re
+from datetime import datetime
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    insert,
+    inspect,
+    select,
+    text,
+)
+
+_metadata = MetaData()
+
+schema_versao = Table(
+    "schema_versao",
+    _metadata,
+    Column("versao", Integer, primary_key=True),
+    Column("nome", String(255), nullable=False),
+    Column("aplicada_em", DateTime, nullable=False),
+)
+
+# Chave do advisory lock que impede dois processos de migrarem ao mesmo tempo
+_CHAVE_LOCK = 7_240_001
+
+
+def migracoes():
+    """Lista (versão, nome, módulo) de todas as migrações, em ordem."""
+    resultado = []
+    for info in pkgutil.iter_modules(__path__):
+        encontrado = re.match(r"v(\d+)_(\w+)$", info.name)
+        if encontrado:
+            modulo = importlib.import_module(f"{__name__}.{info.name}")
+            resultado.append((int(encontrado.group(1)), info.name, modulo))
+    return sorted(resultado, key=lambda migracao: migracao[0])
+
+
+def versoes_aplicadas(engine):
+    with engine.begin() as conn:
+        _metadata.create_all(conn)
+        return set(conn.scalars(select(schema_versao.c.versao)))
+
+
+def pendentes(engine):
+    aplicadas = versoes_aplicadas(engine)
+    return [m for m in migracoes() if m[0] not in aplicadas]
+
+
+def aplicar(engine, saida=None):
+    """Aplica as migrações pendentes e devolve a lista das que foram aplicadas."""
+    aplicadas = []
+    with engine.connect() as lock:
+        postgres = engine.dialect.name == "postgresql"
+        if postgres:
+            lock.execute(
+                text("SELECT pg_advisory_lock(:chave)"), {"chave": _CHAVE_LOCK}
+            )
+            lock.commit()
+        try:
+            for versao, nome, modulo in pendentes(engine):
+                if saida:
+                    saida(f"Aplicando {nome}")
+                if getattr(modulo, "TRANSACIONAL", True):
+                    with engine.begin() as conn:
+                        modulo.upgrade(conn)
+                        _registrar(conn, versao, nome)
+                else:
+                    with engine.connect() as conn:
+                        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+                        modulo.upgrade(conn)
+                    with engine.begin() as conn:
+                        _registrar(conn, versao, nome)
+                aplicadas.append(nome)
+        finally:
+            if postgres:
+                lock.execute(
+                    text("SELECT pg_advisory_unlock(:chave)"), {"chave": _CHAVE_LOCK}
+                )
+                lock.commit()
+    return aplicadas
+
+
+def _registrar(conn, versao, nome):
+    conn.execute(
+        insert(schema_versao).values(
+            versao=versao, nome=nome, aplicada_em=datetime.utcnow()
+        )
+    )
+
+
+def criar_indice(conn, nome, tabela, colunas, using=None, opclass=None):
+    """Cria o índice se ainda não existir; no Postgres, com CONCURRENTLY.
+
+    Um CREATE INDEX CONCURRENTLY interrompido deixa o índice inválido, então ele
+    é removido e recriado. Tabelas particionadas não aceitam CONCURRENTLY: o
+    índice é criado com a tabela travada para escrita. `conn` precisa estar em
+    autocommit no Postgres.
+    """
+    expressao = ", ".join(
+        f"{coluna} {opclass}" if opclass else coluna for coluna in colunas
+    )
+    if conn.dialect.name != "postgresql":
+        conn.execute(
+            text(f"CREATE INDEX IF NOT EXISTS {nome} ON {tabela} ({expressao})")
+        )
+        return
+
+    invalido = conn.scalar(
+        text(
+            "SELECT NOT i.indisvalid FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :nome"
+        ),
+        {"nome": nome},
+    )
+    if invalido:
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {nome}"))
+    particionada = conn.scalar(
+        text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:tabela)"),
+        {"tabela": tabela},
+    )
+    concorrente = "" if particionada else " CONCURRENTLY"
+    metodo = f" USING {using}" if using else ""
+    conn.execute(
+        text(
+            f"CREATE INDEX{concorrente} IF NOT EXISTS {nome} "
+            f"ON {tabela}{metodo} ({expressao})"
+        )
+    )
+
+
+def adicionar_coluna(conn, tabela, coluna, tipo, valor_inicial=None):
+    """Adiciona a coluna se ainda não existir, preenchendo as linhas atuais.
+
+    No Postgres o `valor_inicial` entra como DEFAULT temporário (sem reescrever a
+    tabela); nos demais bancos as linhas são preenchidas com um UPDATE.
+    """
+    if coluna in {c["name"] for c in inspect(conn).get_columns(tabela)}:
+        return
+    if valor_inicial is None:
+        conn.execute(text(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {tipo}"))
+    elif conn.dialect.name == "postgresql":
+        conn.execute(
+            text(
+                f"ALTER TABLE {tabela} ADD COLUMN {coluna} {tipo} "
+                f"DEFAULT {valor_inicial}"
+            )
+        )
+        conn.execute(text(f"ALTER TABLE {tabela} ALTER COLUMN {coluna} DROP DEFAULT"))
+    else:
+        conn.execute(text(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {tipo}"))
+        conn.execute(text(f"UPDATE {tabela} SET {coluna} = {valor_inicial}"))
+
+
+def remover_indice(conn, nome):
+    """Remove o índice, se existir; no Postgres, com CONCURRENTLY (autocommit)."""
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {nome}"))
+    else:
+        conn.execute(text(f"DROP INDEX IF EXISTS {nome}"))
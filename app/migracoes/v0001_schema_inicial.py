@@ -0,0 +1,96 @@
+from sqlalchemy import (
+    CheckConstraint,
+    Column,
+    Date,
+    Float,
+    ForeignKey,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+)
+
+# Schema anterior às migrações, congelado aqui: as tabelas e colunas que vieram
+# depois são criadas pelas migrações seguintes, que também preenchem as tabelas
+# de resumo a partir dos dados que já existem
+_metadata = MetaData()
+
+Table(
+    "usuarios",
+    _metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("nome", String(255), nullable=False),
+    Column("email", String(255), nullable=False, unique=True),
+    Column("senha", String(255), nullable=False),
+    Column("telefone", String(50)),
+    Column("documento", String(50)),
+    Column("tipo", String(50), nullable=False),
+    Column("data_cadastro", Date, nullable=False),
+    CheckConstraint("tipo IN ('Freelancer', 'Organizador')"),
+)
+
+Table(
+    "profissoes",
+    _metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("nome", String(255), nullable=False),
+    Column("descricao", Text),
+)
+
+Table(
+    "freelancers",
+    _metadata,
+    Column("id", Integer, ForeignKey("usuarios.id"), primary_key=True),
+    Column("especialidade", String(255)),
+    Column("portfolio", String(255)),
+    Column("avaliacao_media", Float),
+    Column("profissao_id", Integer, ForeignKey("profissoes.id")),
+)
+
+Table(
+    "organizadores",
+    _metadata,
+    Column("id", Integer, ForeignKey("usuarios.id"), primary_key=True),
+    Column("empresa_evento", String(255)),
+    Column("avaliacao_media", Float),
+)
+
+Table(
+    "eventos",
+    _metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("organizador_id", Integer, ForeignKey("organizadores.id"), nullable=False),
+    Column("nome", String(255), nullable=False),
+    Column("data_evento", Date, nullable=False),
+    Column("local", String(255)),
+    Column("descricao", Text),
+)
+
+Table(
+    "propostas_servico",
+    _metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("evento_id", Integer, ForeignKey("eventos.id"), nullable=False),
+    Column("freelancer_id", Integer, ForeignKey("freelancers.id"), nullable=False),
+    Column("data_proposta", Date, nullable=False),
+    Column("status", String(50), nullable=False),
+    CheckConstraint("status IN ('Pendente', 'Aceita', 'Recusada', 'Cancelada')"),
+)
+
+Table(
+    "avaliacoes",
+    _metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("avaliador_id", Integer, ForeignKey("usuarios.id"), nullable=False),
+    Column("avaliado_id", Integer, ForeignKey("usuarios.id"), nullable=False),
+    Column("nota", Integer),
+    Column("comentario", Text),
+    Column("data_avaliacao", Date, nullable=False),
+    CheckConstraint("nota BETWEEN 1 AND 5"),
+)
+
+
+def upgrade(conn):
+    # Bancos criados antes das migrações já têm essas tabelas e não mudam aqui
+    _metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,37 @@
+from . import criar_indice
+
+# Índices criados sem bloquear escritas nas tabelas
+TRANSACIONAL = False
+
+
+def upgrade(conn):
+    criar_indice(
+        conn,
+        "ix_propostas_servico_freelancer_id",
+        "propostas_servico",
+        ["freelancer_id"],
+    )
+    criar_indice(
+        conn, "ix_propostas_servico_evento_id", "propostas_servico", ["evento_id"]
+    )
+    criar_indice(
+        conn,
+        "ix_avaliacoes_avaliado_id_data_avaliacao",
+        "avaliacoes",
+        ["avaliado_id", "data_avaliacao"],
+    )
+    criar_indice(conn, "ix_eventos_organizador_id", "eventos", ["organizador_id"])
+    criar_indice(conn, "ix_eventos_data_evento", "eventos", ["data_evento"])
+
+    if conn.dialect.name == "postgresql":
+        # Índices de busca textual de bancos criados antes do pg_trgm
+        conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for tabela, coluna in (("freelancers", "especialidade"), ("eventos", "nome")):
+            criar_indice(
+                conn,
+                f"ix_{tabela}_{coluna}_trgm",
+                tabela,
+                [coluna],
+                using="gin",
+                opclass="gin_trgm_ops",
+            )
@@ -0,0 +1,11 @@
+from . import adicionar_coluna
+
+
+def upgrade(conn):
+    # Carimbo da última escrita (UTC), usado nos validadores ETag/Last-Modified
+    if conn.dialect.name == "postgresql":
+        agora = "(now() AT TIME ZONE 'utc')"
+    else:
+        agora = "CURRENT_TIMESTAMP"
+    for tabela in ("usuarios", "freelancers", "eventos", "propostas_servico"):
+        adicionar_coluna(conn, tabela, "atualizado_em", "TIMESTAMP", agora)
@@ -0,0 +1,62 @@
+from sqlalchemy import Column, Date, ForeignKey, Integer, MetaData, String, Table
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from . import criar_indice
+
+# Índices criados sem bloquear escritas nas tabelas
+TRANSACIONAL = False
+
+_metadata = MetaData()
+
+# Só as colunas usadas aqui das tabelas que já existem
+Table("freelancers", _metadata, Column("id", Integer, primary_key=True))
+eventos = Table(
+    "eventos",
+    _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("data_evento", Date),
+)
+propostas = Table(
+    "propostas_servico",
+    _metadata,
+    Column("evento_id", Integer),
+    Column("freelancer_id", Integer),
+    Column("status", String(50)),
+)
+
+ocupacoes = Table(
+    "ocupacoes_freelancer",
+    _metadata,
+    Column("freelancer_id", Integer, ForeignKey("freelancers.id"), primary_key=True),
+    Column("data", Date, primary_key=True),
+    Column("quantidade", Integer, nullable=False),
+)
+
+
+def upgrade(conn):
+    ocupacoes.create(conn, checkfirst=True)
+
+    # Popula o índice de disponibilidade com as propostas já aceitas, mesmo que
+    # a tabela já existisse. Um único statement, atômico também em autocommit;
+    # linhas já gravadas pelas escritas ficam como estão
+    insert = postgresql.insert if conn.dialect.name == "postgresql" else sqlite.insert
+    conn.execute(
+        insert(ocupacoes)
+        .from_select(
+            ["freelancer_id", "data", "quantidade"],
+            select(propostas.c.freelancer_id, eventos.c.data_evento, func.count())
+            .join(eventos, eventos.c.id == propostas.c.evento_id)
+            .where(propostas.c.status == "Aceita")
+            .group_by(propostas.c.freelancer_id, eventos.c.data_evento),
+        )
+        .on_conflict_do_nothing()
+    )
+
+    criar_indice(
+        conn,
+        "ix_freelancers_avaliacao_media_id",
+        "freelancers",
+        ["avaliacao_media", "id"],
+    )
+    criar_indice(conn, "ix_freelancers_profissao_id", "freelancers", ["profissao_id"])
@@ -0,0 +1,104 @@
+from collections import Counter
+
+from sqlalchemy import (
+    Column,
+    Date,
+    ForeignKey,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    delete,
+    func,
+    insert,
+    select,
+)
+
+_metadata = MetaData()
+
+# Só as colunas usadas aqui das tabelas que já existem
+Table("usuarios", _metadata, Column("id", Integer, primary_key=True))
+eventos = Table(
+    "eventos",
+    _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("organizador_id", Integer),
+    Column("data_evento", Date),
+)
+propostas = Table(
+    "propostas_servico",
+    _metadata,
+    Column("evento_id", Integer),
+    Column("freelancer_id", Integer),
+    Column("status", String(50)),
+)
+avaliacoes = Table(
+    "avaliacoes",
+    _metadata,
+    Column("avaliado_id", Integer),
+    Column("nota", Integer),
+)
+
+estatisticas_usuario = Table(
+    "estatisticas_usuario",
+    _metadata,
+    Column("usuario_id", Integer, ForeignKey("usuarios.id"), primary_key=True),
+    Column("metrica", String(50), primary_key=True),
+    Column("chave", String(50), primary_key=True),
+    Column("quantidade", Integer, nullable=False),
+)
+
+
+def reconstruir(conn):
+    """Reconstrói as estatísticas a partir de eventos, propostas e avaliações
+    (também usada pela v0009)."""
+    variacoes = Counter()
+    consultas = [
+        select(propostas.c.freelancer_id, propostas.c.status, func.count()).group_by(
+            propostas.c.freelancer_id, propostas.c.status
+        ),
+        select(eventos.c.organizador_id, propostas.c.status, func.count())
+        .join(eventos, eventos.c.id == propostas.c.evento_id)
+        .group_by(eventos.c.organizador_id, propostas.c.status),
+    ]
+    for consulta in consultas:
+        for usuario_id, status, quantidade in conn.execute(consulta):
+            variacoes[(usuario_id, "propostas_status", status)] += quantidade
+
+    # Agrupado por dia no banco e por mês aqui, sem depender do dialeto
+    consultas = [
+        select(eventos.c.organizador_id, eventos.c.data_evento, func.count()).group_by(
+            eventos.c.organizador_id, eventos.c.data_evento
+        ),
+        select(propostas.c.freelancer_id, eventos.c.data_evento, func.count())
+        .join(eventos, eventos.c.id == propostas.c.evento_id)
+        .where(propostas.c.status == "Aceita")
+        .group_by(propostas.c.freelancer_id, eventos.c.data_evento),
+    ]
+    for consulta in consultas:
+        for usuario_id, data, quantidade in conn.execute(consulta):
+            variacoes[(usuario_id, "eventos_mes", data.strftime("%Y-%m"))] += quantidade
+
+    for usuario_id, nota, quantidade in conn.execute(
+        select(avaliacoes.c.avaliado_id, avaliacoes.c.nota, func.count())
+        .where(avaliacoes.c.nota.is_not(None))
+        .group_by(avaliacoes.c.avaliado_id, avaliacoes.c.nota)
+    ):
+        variacoes[(usuario_id, "notas", str(nota))] += quantidade
+
+    conn.execute(delete(estatisticas_usuario))
+    if variacoes:
+        conn.execute(
+            insert(estatisticas_usuario),
+            [
+                dict(usuario_id=usuario_id, metrica=metrica, chave=chave, quantidade=n)
+                for (usuario_id, metrica, chave), n in variacoes.items()
+            ],
+        )
+
+
+def upgrade(conn):
+    estatisticas_usuario.create(conn, checkfirst=True)
+    # Popula as estatísticas com os dados que já existem, mesmo que a tabela já
+    # existisse; a reconstrução é atômica na transação da migração
+    reconstruir(conn)
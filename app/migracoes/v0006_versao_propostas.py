@@ -0,0 +1,6 @@
+from . import adicionar_coluna
+
+
+def upgrade(conn):
+    # Versão da proposta para o controle de concorrência otimista das transições
+    adicionar_coluna(conn, "propostas_servico", "versao", "INTEGER", "1")
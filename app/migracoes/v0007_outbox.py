@@ -0,0 +1,30 @@
+from sqlalchemy import (
+    JSON,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+)
+
+_metadata = MetaData()
+
+outbox_eventos = Table(
+    "outbox_eventos",
+    _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("tipo", String(50), nullable=False),
+    Column("payload", JSON, nullable=False),
+    Column("criado_em", DateTime, nullable=False),
+    Column("tentativas", Integer, nullable=False),
+    Column("disponivel_em", DateTime, nullable=False),
+    Column("erro", Text),
+    Index("ix_outbox_eventos_disponivel_em", "disponivel_em"),
+)
+
+
+def upgrade(conn):
+    outbox_eventos.create(conn, checkfirst=True)
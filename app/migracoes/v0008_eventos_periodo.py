@@ -0,0 +1,11 @@
+from . import criar_indice, remover_indice
+
+# Índices criados sem bloquear escritas nas tabelas
+TRANSACIONAL = False
+
+
+def upgrade(conn):
+    # Filtros por período (de/ate) com a paginação por (data_evento, id) lendo
+    # o índice em ordem; o índice só de data_evento fica redundante
+    criar_indice(conn, "ix_eventos_data_evento_id", "eventos", ["data_evento", "id"])
+    remover_indice(conn, "ix_eventos_data_evento")
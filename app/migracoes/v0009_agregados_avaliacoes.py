@@ -0,0 +1,133 @@
+from sqlalchemy import (
+    Column,
+    Date,
+    Float,
+    ForeignKey,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    cast,
+    delete,
+    func,
+    insert,
+    select,
+    text,
+    update,
+)
+
+from .v0005_estatisticas_usuario import reconstruir as reconstruir_estatisticas
+
+_metadata = MetaData()
+
+# Só as colunas usadas aqui das tabelas que já existem
+Table("usuarios", _metadata, Column("id", Integer, primary_key=True))
+freelancers = Table(
+    "freelancers",
+    _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("avaliacao_media", Float),
+)
+organizadores = Table(
+    "organizadores",
+    _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("avaliacao_media", Float),
+)
+eventos = Table(
+    "eventos",
+    _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("data_evento", Date),
+)
+propostas = Table(
+    "propostas_servico",
+    _metadata,
+    Column("evento_id", Integer),
+    Column("freelancer_id", Integer),
+    Column("status", String(50)),
+)
+avaliacoes = Table(
+    "avaliacoes",
+    _metadata,
+    Column("avaliado_id", Integer),
+    Column("nota", Integer),
+)
+outbox_eventos = Table(
+    "outbox_eventos",
+    _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("tipo", String(50)),
+)
+ocupacoes = Table(
+    "ocupacoes_freelancer",
+    _metadata,
+    Column("freelancer_id", Integer),
+    Column("data", Date),
+    Column("quantidade", Integer),
+)
+
+avaliacoes_agregados = Table(
+    "avaliacoes_agregados",
+    _metadata,
+    Column("avaliado_id", Integer, ForeignKey("usuarios.id"), primary_key=True),
+    Column("quantidade", Integer, nullable=False),
+    Column("soma", Integer, nullable=False),
+)
+
+
+def _reconstruir_agregados(conn):
+    conn.execute(delete(avaliacoes_agregados))
+    conn.execute(
+        insert(avaliacoes_agregados).from_select(
+            ["avaliado_id", "quantidade", "soma"],
+            select(
+                avaliacoes.c.avaliado_id,
+                func.count(avaliacoes.c.nota),
+                func.sum(avaliacoes.c.nota),
+            )
+            .where(avaliacoes.c.nota.is_not(None))
+            .group_by(avaliacoes.c.avaliado_id),
+        )
+    )
+    for tabela in (freelancers, organizadores):
+        media = (
+            select(
+                cast(avaliacoes_agregados.c.soma, Float)
+                / avaliacoes_agregados.c.quantidade
+            )
+            .where(avaliacoes_agregados.c.avaliado_id == tabela.c.id)
+            .scalar_subquery()
+        )
+        conn.execute(update(tabela).values(avaliacao_media=func.coalesce(media, 0.0)))
+
+
+def _reconstruir_ocupacoes(conn):
+    conn.execute(delete(ocupacoes))
+    conn.execute(
+        insert(ocupacoes).from_select(
+            ["freelancer_id", "data", "quantidade"],
+            select(propostas.c.freelancer_id, eventos.c.data_evento, func.count())
+            .join(eventos, eventos.c.id == propostas.c.evento_id)
+            .where(propostas.c.status == "Aceita")
+            .group_by(propostas.c.freelancer_id, eventos.c.data_evento),
+        )
+    )
+
+
+def upgrade(conn):
+    avaliacoes_agregados.create(conn, checkfirst=True)
+
+    # Até a v0001 ser congelada, ela criava as tabelas de resumo antes das
+    # migrações que as preenchem, e bancos vindos do schema inicial ficaram com
+    # elas vazias. Todas são reconstruídas das tabelas de origem, o que já
+    # inclui as notas ainda no outbox: esses eventos são descartados, com a
+    # tabela travada no Postgres para os workers não os aplicarem de novo
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("LOCK TABLE outbox_eventos IN SHARE ROW EXCLUSIVE MODE"))
+    conn.execute(
+        delete(outbox_eventos).where(outbox_eventos.c.tipo == "nota_registrada")
+    )
+    _reconstruir_agregados(conn)
+    _reconstruir_ocupacoes(conn)
+    reconstruir_estatisticas(conn)
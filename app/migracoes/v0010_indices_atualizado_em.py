@@ -0,0 +1,11 @@
+from . import criar_indice
+
+# Índices criados sem bloquear escritas nas tabelas
+TRANSACIONAL = False
+
+
+def upgrade(conn):
+    # max(atualizado_em) da tabela inteira nos validadores das listagens de
+    # freelancers e eventos, sem percorrer a tabela
+    for tabela in ("freelancers", "eventos"):
+        criar_indice(conn, f"ix_{tabela}_atualizado_em", tabela, ["atualizado_em"])
@@ -1,5 +1,9 @@
+from datetime import datetime
+
 from sqlalchemy import (
+    DDL,
     Column,
+    DateTime,
     Integer,
     String,
     Float,
@@ -7,11 +11,36 @@ from sqlalchemy import (
     Date,
     ForeignKey,
     CheckConstraint,
+    Index,
+    JSON,
+    event,
 )
 from sqlalchemy.orm import relationship
 from .database import Base
 
 
+# Extensão de trigramas usada pelos índices de busca textual no Postgres
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+
+def _atualizado_em():
+    # Momento da última escrita (UTC), base dos validadores ETag/Last-Modified
+    return Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+def _indice_trigram(tabela, coluna):
+    return Index(
+        f"ix_{tabela}_{coluna}_trgm",
+        coluna,
+        postgresql_using="gin",
+        postgresql_ops={coluna: "gin_trgm_ops"},
+    ).ddl_if(dialect="postgresql")
+
+
 class Usuario(Base):
     __tablename__ = "usuarios"
 
@@ -23,6 +52,7 @@ class Usuario(Base):
     documento = Column(String(50))  # CPF ou CNPJ
     tipo = Column(String(50), nullable=False)
     data_cadastro = Column(Date, nullable=False)
+    atualizado_em = _atualizado_em()
 
     __table_args__ = (CheckConstraint("tipo IN ('Freelancer', 'Organizador')"),)
 
@@ -50,6 +80,16 @@ class Freelancer(Base):
     portfolio = Column(String(255))
     avaliacao_media = Column(Float)
     profissao_id = Column(Integer, ForeignKey("profissoes.id"))
+    atualizado_em = _atualizado_em()
+
+    __table_args__ = (
+        _indice_trigram("freelancers", "especialidade"),
+        # Top-k por avaliação em GET /eventos/{id}/candidatos sem ordenar a tabela
+        Index("ix_freelancers_avaliacao_media_id", "avaliacao_media", "id"),
+        Index("ix_freelancers_profissao_id", "profissao_id"),
+        # max(atualizado_em) da tabela inteira, no validador da listagem
+        Index("ix_freelancers_atualizado_em", "atualizado_em"),
+    )
 
     # Relações
     usuario = relationship("Usuario", back_populates="freelancer")
@@ -73,11 +113,22 @@ class Evento(Base):
     __tablename__ = "eventos"
 
     id = Column(Integer, primary_key=True, index=True)
-    organizador_id = Column(Integer, ForeignKey("organizadores.id"), nullable=False)
+    organizador_id = Column(
+        Integer, ForeignKey("organizadores.id"), nullable=False, index=True
+    )
     nome = Column(String(255), nullable=False)
     data_evento = Column(Date, nullable=False)
     local = Column(String(255))
     descricao = Column(Text)
+    atualizado_em = _atualizado_em()
+
+    __table_args__ = (
+        _indice_trigram("eventos", "nome"),
+        # Períodos (de/ate) paginados na ordem da listagem
+        Index("ix_eventos_data_evento_id", "data_evento", "id"),
+        # max(atualizado_em) da tabela inteira, no validador da listagem
+        Index("ix_eventos_atualizado_em", "atualizado_em"),
+    )
 
     # Relações
     organizador = relationship("Organizador", back_populates="eventos")
@@ -88,10 +139,15 @@ class PropostaServico(Base):
     __tablename__ = "propostas_servico"
 
     id = Column(Integer, primary_key=True, index=True)
-    evento_id = Column(Integer, ForeignKey("eventos.id"), nullable=False)
-    freelancer_id = Column(Integer, ForeignKey("freelancers.id"), nullable=False)
+    evento_id = Column(Integer, ForeignKey("eventos.id"), nullable=False, index=True)
+    freelancer_id = Column(
+        Integer, ForeignKey("freelancers.id"), nullable=False, index=True
+    )
     data_proposta = Column(Date, nullable=False)
     status = Column(String(50), nullable=False)
+    # Incrementada a cada transição de status (concorrência otimista)
+    versao = Column(Integer, nullable=False, default=1)
+    atualizado_em = _atualizado_em()
 
     __table_args__ = (
         CheckConstraint("status IN ('Pendente', 'Aceita', 'Recusada', 'Cancelada')"),
@@ -112,8 +168,61 @@ class Avaliacao(Base):
     comentario = Column(Text)
     data_avaliacao = Column(Date, nullable=False)
 
-    __table_args__ = (CheckConstraint("nota BETWEEN 1 AND 5"),)
+    __table_args__ = (
+        CheckConstraint("nota BETWEEN 1 AND 5"),
+        # Cobre também os filtros só por avaliado_id
+        Index(
+            "ix_avaliacoes_avaliado_id_data_avaliacao", "avaliado_id", "data_avaliacao"
+        ),
+    )
 
     # Relações
     avaliador = relationship("Usuario", foreign_keys=[avaliador_id])
     avaliado = relationship("Usuario", foreign_keys=[avaliado_id])
+
+
+class AvaliacaoAgregado(Base):
+    __tablename__ = "avaliacoes_agregados"
+
+    # Contagem e soma das notas de cada avaliado, mantidas junto com os inserts
+    avaliado_id = Column(Integer, ForeignKey("usuarios.id"), primary_key=True)
+    quantidade = Column(Integer, nullable=False, default=0)
+    soma = Column(Integer, nullable=False, default=0)
+
+
+class OcupacaoFreelancer(Base):
+    __tablename__ = "ocupacoes_freelancer"
+
+    # Propostas aceitas de cada freelancer por data de evento: o índice de
+    # disponibilidade do ranking de candidatos, mantido junto com as propostas
+    freelancer_id = Column(Integer, ForeignKey("freelancers.id"), primary_key=True)
+    data = Column(Date, primary_key=True)
+    quantidade = Column(Integer, nullable=False, default=0)
+
+
+class EstatisticaUsuario(Base):
+    __tablename__ = "estatisticas_usuario"
+
+    # Contadores dos dashboards (propostas por status, eventos por mês, notas
+    # recebidas), mantidos pelas escritas de eventos, propostas e avaliações
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"), primary_key=True)
+    metrica = Column(String(50), primary_key=True)
+    chave = Column(String(50), primary_key=True)
+    quantidade = Column(Integer, nullable=False, default=0)
+
+
+class EventoOutbox(Base):
+    __tablename__ = "outbox_eventos"
+
+    # Efeitos colaterais das escritas (agregados de avaliação, estatísticas),
+    # gravados na mesma transação e aplicados em lote pelos workers do outbox
+    id = Column(Integer, primary_key=True)
+    tipo = Column(String(50), nullable=False)
+    payload = Column(JSON, nullable=False)
+    criado_em = Column(DateTime, nullable=False, default=datetime.utcnow)
+    tentativas = Column(Integer, nullable=False, default=0)
+    # Com falha, o evento só volta a ser processado depois do backoff
+    disponivel_em = Column(DateTime, nullable=False, default=datetime.utcnow)
+    erro = Column(Text)
+
+    __table_args__ = (Index("ix_outbox_eventos_disponivel_em", "disponivel_em"),)
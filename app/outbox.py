@@ -0,0 +1,293 @@
+"""Outbox transacional: efeitos colaterais das escritas aplicados em segundo plano.
+
+O handler grava a linha principal e um `EventoOutbox` na mesma transação e já
+responde. Os workers (threads do próprio processo, sem broker externo)
+reivindicam os eventos pendentes em lotes e aplicam os efeitos do lote inteiro
+de uma vez, por exemplo os agregados de avaliação de todos os avaliados do
+lote, na mesma transação que apaga os eventos.
+
+Reivindicar é um `DELETE ... RETURNING`; no Postgres a subconsulta usa `FOR
+UPDATE SKIP LOCKED`, e workers concorrentes pegam lotes diferentes sem esperar
+uns pelos outros. Se o lote falhar, a transação é desfeita (os eventos voltam
+para a tabela) e cada evento é tentado sozinho, para um evento com problema não
+travar os demais. O que falhar sozinho volta com backoff exponencial, até
+`OUTBOX_MAX_TENTATIVAS`; depois disso fica na tabela, com o erro, para análise.
+"""
+
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.orm import Session
+
+from . import agregados, cache, config, estatisticas, metricas, models
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+NOTA_REGISTRADA = "nota_registrada"
+
+# Espera máxima entre tentativas de um evento que falhou, em segundos
+_BACKOFF_MAXIMO = 300
+
+_processados = metricas.registro.contador(
+    "outbox_events_processed_total", "Eventos do outbox aplicados", ("tipo",)
+)
+_falhas = metricas.registro.contador(
+    "outbox_event_failures_total",
+    "Tentativas de aplicar um evento do outbox que falharam",
+    ("tipo",),
+)
+_abandonados = metricas.registro.contador(
+    "outbox_events_abandoned_total",
+    "Eventos que esgotaram OUTBOX_MAX_TENTATIVAS",
+    ("tipo",),
+)
+_atraso = metricas.registro.histograma(
+    "outbox_event_lag_seconds",
+    "Tempo entre a gravação do evento e a aplicação dos seus efeitos",
+    ("tipo",),
+)
+_tamanho_lote = metricas.registro.histograma(
+    "outbox_batch_size",
+    "Eventos aplicados por transação",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+
+_pendentes = metricas.registro.medidor(
+    "outbox_pending_events", "Eventos do outbox ainda por aplicar"
+)
+_idade_pendente = metricas.registro.medidor(
+    "outbox_oldest_pending_age_seconds",
+    "Idade do evento mais antigo do outbox ainda por aplicar",
+)
+
+
+def _fila_pendente():
+    # Consultada na coleta: com os workers parados ou falhando, o atraso
+    # aparece mesmo sem nenhum evento aplicado. Os abandonados ficam de fora
+    evento = models.EventoOutbox
+    db = SessionLocal()
+    try:
+        return db.execute(
+            select(func.count(), func.min(evento.criado_em)).where(
+                evento.tentativas < config.OUTBOX_MAX_TENTATIVAS
+            )
+        ).one()
+    except Exception:
+        logger.warning("Falha ao consultar a fila do outbox", exc_info=True)
+        return None
+    finally:
+        db.close()
+
+
+def _medir_pendentes():
+    fila = _fila_pendente()
+    if fila is not None:
+        yield {}, fila[0]
+
+
+def _medir_idade():
+    fila = _fila_pendente()
+    if fila is not None:
+        mais_antigo = fila[1]
+        idade = (datetime.utcnow() - mais_antigo).total_seconds() if mais_antigo else 0
+        yield {}, max(idade, 0.0)
+
+
+_pendentes.adicionar_funcao(_medir_pendentes)
+_idade_pendente.adicionar_funcao(_medir_idade)
+
+_parar = threading.Event()
+_threads = []
+
+
+def publicar(db: Session, tipo: str, payload: dict):
+    """Grava o evento na transação da sessão. Não faz commit."""
+    db.add(models.EventoOutbox(tipo=tipo, payload=payload))
+
+
+def _aplicar_notas(db: Session, payloads):
+    notas = [(payload["avaliado_id"], payload["nota"]) for payload in payloads]
+    agregados.registrar_notas(db, notas)
+    estatisticas.registrar_notas(db, notas)
+    # A avaliação média aparece na listagem de freelancers
+    cache.respostas.invalidar_apos_commit(db, "freelancers")
+
+
+# Tipo de evento -> função que aplica os payloads de um lote daquele tipo
+_PROCESSADORES = {NOTA_REGISTRADA: _aplicar_notas}
+
+
+def _reivindicar(db: Session, limite=None, ids=None, todos=False):
+    evento = models.EventoOutbox
+    pendentes = select(evento.id).order_by(evento.id).with_for_update(skip_locked=True)
+    if not todos:
+        pendentes = pendentes.where(
+            evento.disponivel_em <= datetime.utcnow(),
+            evento.tentativas < config.OUTBOX_MAX_TENTATIVAS,
+        )
+    if ids is not None:
+        pendentes = pendentes.where(evento.id.in_(ids))
+    if limite is not None:
+        pendentes = pendentes.limit(limite)
+    return db.execute(
+        delete(evento)
+        .where(evento.id.in_(pendentes))
+        .returning(
+            evento.id, evento.tipo, evento.payload, evento.criado_em, evento.tentativas
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+
+
+def _aplicar(db: Session, eventos):
+    por_tipo = defaultdict(list)
+    for evento in eventos:
+        por_tipo[evento.tipo].append(evento.payload)
+    for tipo, payloads in por_tipo.items():
+        _PROCESSADORES[tipo](db, payloads)
+
+
+def _registrar_aplicados(eventos):
+    agora = datetime.utcnow()
+    _tamanho_lote.observar(len(eventos))
+    for evento in eventos:
+        _processados.incrementar(tipo=evento.tipo)
+        _atraso.observar((agora - evento.criado_em).total_seconds(), tipo=evento.tipo)
+
+
+def _registrar_falha(evento, erro: Exception):
+    tentativas = evento.tentativas + 1
+    espera = min(2**tentativas, _BACKOFF_MAXIMO)
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(models.EventoOutbox)
+            .where(models.EventoOutbox.id == evento.id)
+            .values(
+                tentativas=tentativas,
+                disponivel_em=datetime.utcnow() + timedelta(seconds=espera),
+                erro=repr(erro)[:1000],
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+    _falhas.incrementar(tipo=evento.tipo)
+    if tentativas >= config.OUTBOX_MAX_TENTATIVAS:
+        _abandonados.incrementar(tipo=evento.tipo)
+        logger.error(
+            "Evento %s do outbox (%s) abandonado após %d tentativas: %r",
+            evento.id,
+            evento.tipo,
+            tentativas,
+            erro,
+        )
+
+
+def _processar_individualmente(ids) -> int:
+    aplicados = 0
+    for id in ids:
+        db = SessionLocal()
+        try:
+            eventos = _reivindicar(db, ids=[id])
+            if not eventos:
+                # Outro worker já o pegou
+                db.rollback()
+                continue
+            try:
+                _aplicar(db, eventos)
+                db.commit()
+            except Exception as erro:
+                db.rollback()
+                _registrar_falha(eventos[0], erro)
+                continue
+        finally:
+            db.close()
+        _registrar_aplicados(eventos)
+        aplicados += 1
+    return aplicados
+
+
+def processar_lote(limite: int = None) -> int:
+    """Reivindica e aplica um lote de eventos; devolve quantos foram aplicados."""
+    db = SessionLocal()
+    try:
+        eventos = _reivindicar(db, limite or config.OUTBOX_LOTE)
+        if not eventos:
+            db.rollback()
+            return 0
+        try:
+            _aplicar(db, eventos)
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.warning(
+                "Lote de %d eventos do outbox falhou; aplicando um a um",
+                len(eventos),
+                exc_info=True,
+            )
+            return _processar_individualmente([evento.id for evento in eventos])
+    finally:
+        db.close()
+    _registrar_aplicados(eventos)
+    return len(eventos)
+
+
+def drenar() -> int:
+    """Processa os eventos disponíveis até a fila esvaziar."""
+    total = 0
+    while True:
+        aplicados = processar_lote()
+        total += aplicados
+        if not aplicados:
+            return total
+
+
+def aplicar_pendentes(db: Session):
+    """Aplica, na transação de `db`, todos os eventos ainda na tabela.
+
+    Usado pelas reconciliações antes de reconstruir os agregados: sem isso, os
+    eventos de avaliações já contadas seriam aplicados de novo pelos workers.
+    No Postgres a tabela fica travada para escrita até o commit. Não faz commit.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE outbox_eventos IN SHARE ROW EXCLUSIVE MODE"))
+    eventos = _reivindicar(db, todos=True)
+    _aplicar(db, eventos)
+    return len(eventos)
+
+
+def _trabalhar():
+    while not _parar.is_set():
+        try:
+            aplicados = processar_lote()
+        except Exception:
+            logger.exception("Falha no worker do outbox")
+            aplicados = 0
+        # Com lote cheio ainda há fila: segue sem esperar. Senão espera o
+        # intervalo, e os eventos desse meio tempo vão juntos no próximo lote
+        if aplicados < config.OUTBOX_LOTE:
+            _parar.wait(config.OUTBOX_INTERVALO_MS / 1000)
+
+
+def iniciar(workers: int = None):
+    """Inicia os workers do outbox em threads do processo."""
+    workers = config.OUTBOX_WORKERS if workers is None else workers
+    _parar.clear()
+    for i in range(workers):
+        thread = threading.Thread(target=_trabalhar, name=f"outbox-{i}", daemon=True)
+        thread.start()
+        _threads.append(thread)
+
+
+def parar(timeout: float = 5):
+    _parar.set()
+    for thread in _threads:
+        thread.join(timeout)
+    _threads.clear()
@@ -0,0 +1,149 @@
+import base64
+import binascii
+import json
+from datetime import date
+
+import orjson
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, tuple_
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+
+# Limites de tamanho de página aceitos pelos endpoints de listagem
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 200
+
+
+def _direcao(coluna):
+    # Colunas podem vir envolvidas em desc(); devolve a expressão e se é decrescente
+    if isinstance(coluna, UnaryExpression) and coluna.modifier is operators.desc_op:
+        return coluna.element, True
+    return coluna, False
+
+
+def _condicao_keyset(colunas, valores):
+    expressoes = [_direcao(c) for c in colunas]
+    if not any(decrescente for _, decrescente in expressoes):
+        if len(colunas) == 1:
+            return colunas[0] > valores[0]
+        return tuple_(*colunas) > tuple_(*valores)
+
+    # Com direções mistas, (a, b) > (x, y) é expandido termo a termo
+    condicoes = []
+    for i, ((expressao, decrescente), valor) in enumerate(zip(expressoes, valores)):
+        anteriores = [e == v for (e, _), v in zip(expressoes[:i], valores[:i])]
+        passo = expressao < valor if decrescente else expressao > valor
+        condicoes.append(and_(*anteriores, passo))
+    return or_(*condicoes)
+
+
+def codificar_cursor(valores):
+    dados = [v.isoformat() if isinstance(v, date) else v for v in valores]
+    return base64.urlsafe_b64encode(json.dumps(dados).encode()).decode().rstrip("=")
+
+
+def _coagir(coluna, valor):
+    # Cada valor do cursor precisa ser do tipo da sua coluna, para um cursor
+    # forjado não chegar ao banco. Só colunas float (a relevância da busca)
+    # aceitam números não inteiros, NaN incluso
+    try:
+        tipo = _direcao(coluna)[0].type.python_type
+    except NotImplementedError:
+        return valor
+    if issubclass(tipo, date):
+        return tipo.fromisoformat(valor)
+    if isinstance(valor, bool) and tipo is not bool:
+        raise ValueError
+    if tipo is float and isinstance(valor, int):
+        return float(valor)
+    if not isinstance(valor, tipo):
+        raise ValueError
+    return valor
+
+
+def decodificar_cursor(cursor: str, colunas):
+    try:
+        preenchimento = "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + preenchimento))
+        if not isinstance(valores, list) or len(valores) != len(colunas):
+            raise ValueError
+        return [_coagir(coluna, valor) for coluna, valor in zip(colunas, valores)]
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def paginar(query, colunas, cursor: str = None, limite: int = LIMITE_PADRAO):
+    """Aplica paginação keyset sobre `colunas`, que devem formar uma ordem única.
+
+    Colunas envolvidas em `desc()` são percorridas em ordem decrescente.
+    Retorna os itens da página e o cursor opaco da próxima, ou None na última.
+    """
+    if cursor:
+        valores = decodificar_cursor(cursor, colunas)
+        query = query.filter(_condicao_keyset(colunas, valores))
+
+    # Busca um item a mais para saber se existe próxima página
+    itens = query.order_by(*colunas).limit(limite + 1).all()
+
+    next_cursor = None
+    if len(itens) > limite:
+        itens = itens[:limite]
+        next_cursor = codificar_cursor(
+            [getattr(itens[-1], _direcao(c)[0].key) for c in colunas]
+        )
+
+    return itens, next_cursor
+
+
+def colunas_schema(modelo, schema_item):
+    """Colunas de `modelo` com os nomes dos campos do schema, na mesma ordem."""
+    return [getattr(modelo, campo) for campo in schema_item.model_fields]
+
+
+def ler_ids(texto):
+    """Ids de um parâmetro `ids=1,2,3`, sem repetição e em ordem; None sem ele."""
+    if texto is None:
+        return None
+    try:
+        ids = sorted({int(parte) for parte in texto.split(",") if parte.strip()})
+    except ValueError:
+        ids = None
+    if not ids:
+        raise HTTPException(
+            status_code=400,
+            detail="'ids' deve ser uma lista de inteiros separados por vírgula",
+        )
+    if len(ids) > LIMITE_MAXIMO:
+        raise HTTPException(
+            status_code=400, detail=f"No máximo {LIMITE_MAXIMO} ids por requisição"
+        )
+    return ids
+
+
+def itens_json(schema_item, linhas):
+    """Dicts com os campos de `schema_item`, na ordem do schema, das linhas SQL.
+
+    As linhas já vêm com os tipos das colunas do schema, então não passam por
+    validação do Pydantic; colunas extras, como a relevância da busca, ficam de
+    fora.
+    """
+    if not linhas:
+        return []
+    campos = tuple(schema_item.model_fields)
+    # Posição de cada campo na linha, calculada uma vez por página
+    posicoes = [linhas[0]._fields.index(campo) for campo in campos]
+    pares = list(zip(campos, posicoes))
+    return [{campo: linha[i] for campo, i in pares} for linha in linhas]
+
+
+def pagina_json(schema_item, itens, next_cursor, relacionados=None) -> bytes:
+    """Serializa uma página de linhas SQL direto em JSON com orjson.
+
+    `relacionados` embute objetos já buscados em cada item: {campo: (campo do
+    id no item, {id: dict do objeto})}.
+    """
+    itens = itens_json(schema_item, itens)
+    for campo, (campo_id, objetos) in (relacionados or {}).items():
+        for item in itens:
+            item[campo] = objetos.get(item[campo_id])
+    return orjson.dumps({"items": itens, "next_cursor": next_cursor})
@@ -0,0 +1,203 @@
+"""Particionamento mensal da tabela `eventos` por `data_evento` (só Postgres).
+
+Opcional, ativado com `python -m app.cli particionar-eventos --sem-fk-eventos`
+(a flag é obrigatória, ver as limitações abaixo): a tabela vira uma
+tabela particionada por RANGE, com uma partição por mês (`eventos_pAAAA_MM`) e a
+partição padrão `eventos_padrao` para datas fora das partições criadas. Uma
+consulta por período (`de`/`ate`) lê só as partições dos meses do período, o
+que `particoes_lidas` confere pelo EXPLAIN.
+
+O comando também cria as partições dos meses seguintes e deve rodar
+periodicamente (por exemplo, uma vez por mês); eventos que já estavam na
+partição padrão passam para a partição nova do seu mês.
+
+Limitações do Postgres para tabelas particionadas:
+
+- a chave primária passa a ser (id, data_evento); `id` continua vindo da mesma
+  sequência;
+- as chaves estrangeiras que apontam para `eventos` (propostas_servico.evento_id)
+  são removidas, já que precisariam incluir data_evento; os handlers continuam
+  verificando se o evento existe antes de gravar propostas, mas um evento
+  removido por fora da API entre a verificação e o INSERT não é mais
+  detectado: `lote.inserir` deixa de responder 409 (IntegrityError) e a
+  proposta fica órfã;
+- uma busca por id consulta o índice de cada partição;
+- índices novos não podem ser criados com CONCURRENTLY na tabela particionada.
+"""
+
+from datetime import date
+
+from sqlalchemy import text
+
+from . import models
+
+TABELA = "eventos"
+PARTICAO_PADRAO = "eventos_padrao"
+
+
+def _mes_seguinte(mes: date) -> date:
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def _somar_meses(mes: date, meses: int) -> date:
+    for _ in range(meses):
+        mes = _mes_seguinte(mes)
+    return mes
+
+
+def nome_particao(mes: date) -> str:
+    return f"{TABELA}_p{mes:%Y_%m}"
+
+
+def _exigir_postgres(conn):
+    if conn.dialect.name != "postgresql":
+        raise RuntimeError("O particionamento de eventos só é suportado no Postgres")
+
+
+def particionada(conn) -> bool:
+    return bool(
+        conn.scalar(
+            text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:tabela)"),
+            {"tabela": TABELA},
+        )
+    )
+
+
+def _criar_particao(conn, mes: date):
+    nome = nome_particao(mes)
+    limites = {"inicio": mes, "fim": _mes_seguinte(mes)}
+    conn.execute(
+        text(
+            f"CREATE TABLE {nome} "
+            f"(LIKE {TABELA} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+    )
+    # Eventos do mês que tinham caído na partição padrão vão para a nova; sem
+    # isso o ATTACH falha
+    conn.execute(
+        text(
+            f"WITH movidos AS (DELETE FROM {PARTICAO_PADRAO} "
+            "WHERE data_evento >= :inicio AND data_evento < :fim RETURNING *) "
+            f"INSERT INTO {nome} SELECT * FROM movidos"
+        ),
+        limites,
+    )
+    conn.execute(
+        text(
+            f"ALTER TABLE {TABELA} ATTACH PARTITION {nome} "
+            f"FOR VALUES FROM ('{limites['inicio']}') TO ('{limites['fim']}')"
+        )
+    )
+
+
+def garantir_particoes(conn, meses_futuros: int = 12, inicio: date = None):
+    """Cria as partições mensais que faltam de `inicio` (por padrão o mês do
+    evento mais antigo) até `meses_futuros` meses à frente. Devolve os nomes das
+    partições criadas."""
+    _exigir_postgres(conn)
+    atual = date.today().replace(day=1)
+    if inicio is None:
+        inicio = conn.scalar(
+            text(f"SELECT date_trunc('month', min(data_evento))::date FROM {TABELA}")
+        )
+    mes = min(inicio or atual, atual)
+    fim = _somar_meses(atual, meses_futuros)
+
+    criadas = []
+    while mes <= fim:
+        nome = nome_particao(mes)
+        if conn.scalar(text("SELECT to_regclass(:nome)"), {"nome": nome}) is None:
+            _criar_particao(conn, mes)
+            criadas.append(nome)
+        mes = _mes_seguinte(mes)
+    return criadas
+
+
+def _converter(conn):
+    antiga = f"{TABELA}_antiga"
+    conn.execute(text(f"LOCK TABLE {TABELA} IN ACCESS EXCLUSIVE MODE"))
+
+    referencias = conn.execute(
+        text(
+            "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+            "WHERE contype = 'f' AND confrelid = to_regclass(:tabela)"
+        ),
+        {"tabela": TABELA},
+    ).all()
+    for tabela, restricao in referencias:
+        conn.execute(text(f"ALTER TABLE {tabela} DROP CONSTRAINT {restricao}"))
+
+    sequencia = conn.scalar(
+        text("SELECT pg_get_serial_sequence(:tabela, 'id')"), {"tabela": TABELA}
+    )
+    inicio = conn.scalar(
+        text(f"SELECT date_trunc('month', min(data_evento))::date FROM {TABELA}")
+    )
+
+    conn.execute(text(f"ALTER TABLE {TABELA} RENAME TO {antiga}"))
+    conn.execute(
+        text(
+            f"CREATE TABLE {TABELA} "
+            f"(LIKE {antiga} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            "PARTITION BY RANGE (data_evento)"
+        )
+    )
+    if sequencia:
+        # Sem isso a sequência do id seria apagada junto com a tabela antiga
+        conn.execute(text(f"ALTER SEQUENCE {sequencia} OWNED BY {TABELA}.id"))
+    conn.execute(text(f"CREATE TABLE {PARTICAO_PADRAO} PARTITION OF {TABELA} DEFAULT"))
+    garantir_particoes(conn, inicio=inicio)
+
+    conn.execute(text(f"INSERT INTO {TABELA} SELECT * FROM {antiga}"))
+    conn.execute(text(f"DROP TABLE {antiga}"))
+
+    # Chave primária e índices depois da carga, propagados para cada partição
+    conn.execute(
+        text(
+            f"ALTER TABLE {TABELA} ADD CONSTRAINT {TABELA}_pkey "
+            "PRIMARY KEY (id, data_evento)"
+        )
+    )
+    conn.execute(
+        text(
+            f"ALTER TABLE {TABELA} ADD FOREIGN KEY (organizador_id) "
+            "REFERENCES organizadores (id)"
+        )
+    )
+    for indice in models.Evento.__table__.indexes:
+        indice.create(conn)
+
+
+def particionar(conn, meses_futuros: int = 12):
+    """Converte `eventos` em tabela particionada por mês, se ainda não for, e
+    cria as partições até `meses_futuros` meses à frente.
+
+    Roda na transação de `conn`, com a tabela travada durante a conversão.
+    """
+    _exigir_postgres(conn)
+    criadas = []
+    if not particionada(conn):
+        _converter(conn)
+        criadas.append(PARTICAO_PADRAO)
+    return criadas + garantir_particoes(conn, meses_futuros)
+
+
+def _relacoes(plano):
+    if "Relation Name" in plano:
+        yield plano["Relation Name"]
+    for filho in plano.get("Plans", ()):
+        yield from _relacoes(filho)
+
+
+def particoes_lidas(conn, de: date, ate: date):
+    """Partições que o Postgres lê para os eventos entre `de` e `ate`, pelo
+    plano do EXPLAIN da consulta por período."""
+    _exigir_postgres(conn)
+    plano = conn.scalar(
+        text(
+            f"EXPLAIN (FORMAT JSON) SELECT id FROM {TABELA} "
+            "WHERE data_evento >= :de AND data_evento <= :ate"
+        ),
+        {"de": de, "ate": ate},
+    )
+    return sorted(set(_relacoes(plano[0]["Plan"])))
@@ -0,0 +1,207 @@
+"""Roteamento das leituras para réplicas do banco.
+
+Os handlers só de leitura pedem a sessão com `get_read_db`, que a abre em uma
+réplica escolhida em rodízio entre as saudáveis (`DATABASE_REPLICA_URLS`). Sem
+réplicas configuradas, ou com todas fora do ar, a leitura vai ao primário.
+
+Uma réplica sai do rodízio quando uma conexão com ela falha e volta quando a
+verificação periódica (`monitorar`, iniciada no lifespan) consegue executar um
+`SELECT 1`.
+
+Depois de uma escrita bem-sucedida a resposta leva o cookie `COOKIE_ESCRITA`:
+enquanto ele vale (`DB_READ_YOUR_WRITES_SECONDS`) as leituras daquele cliente
+vão ao primário, então ele vê a própria escrita mesmo com a réplica atrasada.
+"""
+
+import asyncio
+import itertools
+import logging
+import threading
+import time
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event, text
+
+from . import config, metricas
+from .database import ASYNC_MODE, criar_engine, get_async_engine, get_engine
+
+logger = logging.getLogger(__name__)
+
+COOKIE_ESCRITA = "conecta_escrita"
+
+_METODOS_ESCRITA = {"POST", "PUT", "PATCH", "DELETE"}
+
+_sessoes_leitura = metricas.registro.contador(
+    "db_read_sessions_total",
+    "Sessões de leitura abertas, por engine de destino",
+    ("engine",),
+)
+_replica_saudavel = metricas.registro.medidor(
+    "db_replica_healthy", "1 se a réplica está no rodízio de leituras", ("replica",)
+)
+
+
+class Replica:
+    def __init__(self, nome: str, url: str):
+        self.nome = nome
+        self.url = url
+        self.saudavel = True
+        # Engines criadas no primeiro uso, uma por modo (síncrono e assíncrono)
+        self._engines = {}
+        self._lock = threading.Lock()
+
+    def engine(self, assincrono: bool = False):
+        engine = self._engines.get(assincrono)
+        if engine is None:
+            with self._lock:
+                engine = self._engines.get(assincrono)
+                if engine is None:
+                    nome = f"{self.nome}_async" if assincrono else self.nome
+                    engine = criar_engine(self.url, nome=nome, assincrono=assincrono)
+                    engine_sync = engine.sync_engine if assincrono else engine
+                    event.listen(engine_sync, "handle_error", self._ao_falhar)
+                    self._engines[assincrono] = engine
+        return engine
+
+    def _ao_falhar(self, contexto):
+        # Conexão perdida ou recusada (sem conexão no contexto): fora do rodízio
+        # até a próxima verificação
+        if contexto.is_disconnect or contexto.connection is None:
+            self._marcar(False)
+
+    def _marcar(self, saudavel: bool):
+        if saudavel != self.saudavel:
+            if saudavel:
+                logger.info("Réplica %s de volta ao rodízio de leituras", self.nome)
+            else:
+                logger.warning("Réplica %s fora do rodízio de leituras", self.nome)
+        self.saudavel = saudavel
+
+    def verificar(self):
+        try:
+            with self.engine().connect() as conexao:
+                conexao.execute(text("SELECT 1"))
+        except Exception:
+            self._marcar(False)
+        else:
+            self._marcar(True)
+
+    async def fechar(self):
+        for assincrono, engine in list(self._engines.items()):
+            if assincrono:
+                await engine.dispose()
+            else:
+                engine.dispose()
+
+    async def verificar_async(self):
+        try:
+            async with self.engine(assincrono=True).connect() as conexao:
+                await conexao.execute(text("SELECT 1"))
+        except Exception:
+            self._marcar(False)
+        else:
+            self._marcar(True)
+
+
+_replicas = [
+    Replica(f"replica{i}", url)
+    for i, url in enumerate(config.DATABASE_REPLICA_URLS, start=1)
+]
+_rodizio = itertools.count()
+
+
+def _estado_replicas():
+    for replica in _replicas:
+        yield {"replica": replica.nome}, 1.0 if replica.saudavel else 0.0
+
+
+_replica_saudavel.adicionar_funcao(_estado_replicas)
+
+
+def escolher():
+    """Próxima réplica saudável do rodízio, ou None para ler do primário."""
+    if not _replicas:
+        return None
+    inicio = next(_rodizio)
+    for i in range(len(_replicas)):
+        replica = _replicas[(inicio + i) % len(_replicas)]
+        if replica.saudavel:
+            return replica
+    return None
+
+
+def escreveu_recentemente(request: Request) -> bool:
+    valor = request.cookies.get(COOKIE_ESCRITA)
+    if not valor:
+        return False
+    try:
+        momento = float(valor)
+    except ValueError:
+        return False
+    return time.time() - momento < config.DB_READ_YOUR_WRITES_SECONDS
+
+
+def engine_leitura(request: Request = None, assincrono: bool = False):
+    """Engine para uma sessão só de leitura do `request` (ou sem request, como
+    nas exportações)."""
+    replica = None
+    if request is None or not escreveu_recentemente(request):
+        replica = escolher()
+    if replica is None:
+        _sessoes_leitura.incrementar(engine="primary")
+        return get_async_engine() if assincrono else get_engine()
+    _sessoes_leitura.incrementar(engine=replica.nome)
+    return replica.engine(assincrono)
+
+
+async def monitorar():
+    """Verifica as réplicas a cada `DB_REPLICA_HEALTH_INTERVAL` segundos."""
+    while True:
+        for replica in _replicas:
+            if ASYNC_MODE:
+                await replica.verificar_async()
+            else:
+                await run_in_threadpool(replica.verificar)
+        await asyncio.sleep(config.DB_REPLICA_HEALTH_INTERVAL)
+
+
+def ativas() -> bool:
+    return bool(_replicas)
+
+
+async def fechar():
+    """Fecha as conexões das engines das réplicas, no fim do lifespan."""
+    for replica in _replicas:
+        await replica.fechar()
+
+
+class MiddlewareLeiturasAposEscrita:
+    """Middleware ASGI que marca com `COOKIE_ESCRITA` as respostas das escritas
+    bem-sucedidas, para as próximas leituras do cliente irem ao primário."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in _METODOS_ESCRITA
+            or not _replicas
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start" and mensagem["status"] < 400:
+                cookie = (
+                    f"{COOKIE_ESCRITA}={time.time():.3f}; "
+                    f"Max-Age={config.DB_READ_YOUR_WRITES_SECONDS}; Path=/; "
+                    "HttpOnly; SameSite=Lax"
+                )
+                cabecalhos = list(mensagem.get("headers", []))
+                cabecalhos.append((b"set-cookie", cookie.encode()))
+                mensagem = {**mensagem, "headers": cabecalhos}
+            await send(mensagem)
+
+        await self.app(scope, receive, enviar)
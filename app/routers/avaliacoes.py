@@ -1,35 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import or_, select
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Optional
+from datetime import date
 
-from .. import models, schemas
-from ..database import get_db
+from .. import consultas, exportacao, lote, models, outbox, schemas
+from ..paginacao import (
+    LIMITE_MAXIMO,
+    LIMITE_PADRAO,
+    colunas_schema,
+    pagina_json,
+    paginar,
+)
+from ..database import DbRoute, get_db, get_read_db
 
 router = APIRouter(
     prefix="/avaliacoes",
     tags=["Avaliação"],
     responses={404: {"description": "Not found"}},
+    route_class=DbRoute,
 )
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
 def create_avaliacao(avaliacao: schemas.AvaliacaoCreate, db: Session = Depends(get_db)):
-    # Verificar se avaliador existe
-    avaliador = (
-        db.query(models.Usuario)
-        .filter(models.Usuario.id == avaliacao.avaliador_id)
-        .first()
+    # Verificar avaliador e avaliado com uma única consulta
+    usuarios = lote.ids_existentes(
+        db, models.Usuario.id, (avaliacao.avaliador_id, avaliacao.avaliado_id)
     )
-    if not avaliador:
+    if avaliacao.avaliador_id not in usuarios:
         raise HTTPException(status_code=404, detail="Avaliador não encontrado")
-
-    # Verificar se avaliado existe
-    avaliado = (
-        db.query(models.Usuario)
-        .filter(models.Usuario.id == avaliacao.avaliado_id)
-        .first()
-    )
-    if not avaliado:
+    if avaliacao.avaliado_id not in usuarios:
         raise HTTPException(status_code=404, detail="Avaliado não encontrado")
 
     # Criar avaliação
@@ -41,59 +43,75 @@ def create_avaliacao(avaliacao: schemas.AvaliacaoCreate, db: Session = Depends(g
         data_avaliacao=avaliacao.data_avaliacao,
     )
     db.add(new_avaliacao)
-    db.commit()
-
-    # Atualizar avaliação média
-    # Para freelancer
-    freelancer = (
-        db.query(models.Freelancer)
-        .filter(models.Freelancer.id == avaliacao.avaliado_id)
-        .first()
-    )
-    if freelancer:
-        avaliacoes = (
-            db.query(models.Avaliacao)
-            .filter(models.Avaliacao.avaliado_id == avaliacao.avaliado_id)
-            .all()
-        )
-        soma = sum(a.nota for a in avaliacoes)
-        freelancer.avaliacao_media = soma / len(avaliacoes)
-        db.commit()
-
-    # Para organizador
-    organizador = (
-        db.query(models.Organizador)
-        .filter(models.Organizador.id == avaliacao.avaliado_id)
-        .first()
+
+    # Agregado, avaliação média e estatísticas ficam para os workers do outbox:
+    # o request só confirma a avaliação e o evento
+    outbox.publicar(
+        db,
+        outbox.NOTA_REGISTRADA,
+        {"avaliado_id": avaliacao.avaliado_id, "nota": avaliacao.nota},
     )
-    if organizador:
-        avaliacoes = (
-            db.query(models.Avaliacao)
-            .filter(models.Avaliacao.avaliado_id == avaliacao.avaliado_id)
-            .all()
-        )
-        soma = sum(a.nota for a in avaliacoes)
-        organizador.avaliacao_media = soma / len(avaliacoes)
-        db.commit()
 
     return {"message": "Avaliação registrada com sucesso"}
 
 
-@router.get("/", response_model=List[schemas.AvaliacaoResponse])
-def get_avaliacoes_by_user(userId: int, db: Session = Depends(get_db)):
+@router.get("/", response_model=schemas.Pagina[schemas.AvaliacaoResponse])
+def get_avaliacoes_by_user(
+    userId: int,
+    cursor: Optional[str] = None,
+    limite: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    db: Session = Depends(get_read_db),
+):
     # Verificar se usuário existe
-    usuario = db.query(models.Usuario).filter(models.Usuario.id == userId).first()
-    if not usuario:
+    if not consultas.existe(db, models.Usuario, userId):
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
 
-    # Buscar avaliações
-    avaliacoes = (
-        db.query(models.Avaliacao).filter(models.Avaliacao.avaliado_id == userId).all()
-    )
+    # Buscar avaliações, só com as colunas da resposta
+    query = db.query(
+        *colunas_schema(models.Avaliacao, schemas.AvaliacaoResponse)
+    ).filter(models.Avaliacao.avaliado_id == userId)
+    avaliacoes, next_cursor = paginar(query, [models.Avaliacao.id], cursor, limite)
 
-    if not avaliacoes:
+    if not avaliacoes and not cursor:
         raise HTTPException(
             status_code=404, detail="Nenhuma avaliação encontrada para este usuário"
         )
 
-    return avaliacoes
+    return Response(
+        pagina_json(schemas.AvaliacaoResponse, avaliacoes, next_cursor),
+        media_type="application/json",
+    )
+
+
+@router.get("/exportar", response_class=StreamingResponse)
+def export_avaliacoes(
+    formato: exportacao.Formato = exportacao.Formato.ndjson,
+    de: Optional[date] = None,
+    ate: Optional[date] = None,
+    organizador_id: Optional[int] = None,
+):
+    exportacao.validar_periodo(de, ate)
+
+    avaliacao = models.Avaliacao
+    statement = select(
+        avaliacao.id,
+        avaliacao.avaliador_id,
+        avaliacao.avaliado_id,
+        avaliacao.nota,
+        avaliacao.comentario,
+        avaliacao.data_avaliacao,
+    ).order_by(avaliacao.id)
+    if de:
+        statement = statement.where(avaliacao.data_avaliacao >= de)
+    if ate:
+        statement = statement.where(avaliacao.data_avaliacao <= ate)
+    if organizador_id is not None:
+        # Avaliações feitas pelo organizador ou sobre ele
+        statement = statement.where(
+            or_(
+                avaliacao.avaliador_id == organizador_id,
+                avaliacao.avaliado_id == organizador_id,
+            )
+        )
+
+    return exportacao.exportar(statement, formato, "avaliacoes")
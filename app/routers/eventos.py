@@ -1,38 +1,150 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    status,
+)
+from sqlalchemy import desc
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import date
 
-from .. import models, schemas
-from ..database import get_db
+from .. import (
+    busca,
+    cache,
+    candidatos,
+    condicional,
+    consultas,
+    estatisticas,
+    exportacao,
+    lote,
+    models,
+    schemas,
+)
+from ..paginacao import (
+    LIMITE_MAXIMO,
+    LIMITE_PADRAO,
+    ler_ids,
+    pagina_json,
+    paginar,
+)
+from ..database import DbRoute, get_db, get_read_db
 
 router = APIRouter(
     prefix="/eventos",
     tags=["Evento"],
     responses={404: {"description": "Not found"}},
+    route_class=DbRoute,
 )
 
 
-@router.get("/", response_model=List[schemas.EventoResponse])
+def _escopo_eventos(
+    db: Session, nome, data_evento, de=None, ate=None, local=None, ids=None
+):
+    query = consultas.eventos(db)
+    if ids:
+        query = query.filter(models.Evento.id.in_(ids))
+    if nome:
+        query = query.filter(busca.backend(db).condicao(db, models.Evento.nome, nome))
+    if data_evento:
+        query = query.filter(models.Evento.data_evento == data_evento)
+    # Período fechado; com a tabela particionada por mês, só as partições do
+    # período são lidas
+    if de:
+        query = query.filter(models.Evento.data_evento >= de)
+    if ate:
+        query = query.filter(models.Evento.data_evento <= ate)
+    if local:
+        query = query.filter(models.Evento.local.ilike(f"%{local}%"))
+    return query
+
+
+def _listar_eventos(
+    db: Session, nome, data_evento, de, ate, local, ids, cursor, limite
+):
+    query = _escopo_eventos(db, nome, data_evento, de, ate, local, ids)
+    ordem = [models.Evento.data_evento, models.Evento.id]
+
+    if nome:
+        relevancia = busca.backend(db).relevancia(db, models.Evento.nome, nome)
+        relevancia = relevancia.label("relevancia")
+        query = query.add_columns(relevancia)
+        ordem = [desc(relevancia), *ordem]
+
+    eventos, next_cursor = paginar(query, ordem, cursor, limite)
+
+    if not eventos and not cursor:
+        raise HTTPException(status_code=404, detail="Nenhum evento encontrado")
+
+    return pagina_json(schemas.EventoResponse, eventos, next_cursor)
+
+
+@router.get("/", response_model=schemas.Pagina[schemas.EventoResponse])
 def get_eventos(
+    request: Request,
     nome: Optional[str] = None,
     data_evento: Optional[date] = None,
-    db: Session = Depends(get_db),
+    de: Optional[date] = None,
+    ate: Optional[date] = None,
+    local: Optional[str] = None,
+    ids: Optional[str] = Query(None, description="Ids separados por vírgula"),
+    cursor: Optional[str] = None,
+    limite: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    db: Session = Depends(get_read_db),
 ):
-    query = db.query(models.Evento)
+    exportacao.validar_periodo(de, ate)
+    ids = ler_ids(ids)
 
-    if nome:
-        query = query.filter(models.Evento.nome.ilike(f"%{nome}%"))
+    # A busca não diferencia maiúsculas: o termo normalizado serve de chave do cache
+    nome = (nome or "").strip().lower() or None
+    local = (local or "").strip().lower() or None
+    params = {
+        "nome": nome,
+        "data_evento": data_evento,
+        "de": de,
+        "ate": ate,
+        "local": local,
+        "ids": ",".join(map(str, ids)) if ids else None,
+        "cursor": cursor,
+        "limite": limite,
+    }
 
-    if data_evento:
-        query = query.filter(models.Evento.data_evento == data_evento)
+    # Cliente com a versão atual da página recebe 304, sem buscar as linhas; com
+    # a página em cache, sem nenhuma consulta. Nome, local e data mudam: o
+    # carimbo é o da tabela inteira
+    return condicional.listagem(
+        request,
+        lambda: condicional.validador(
+            _escopo_eventos(db, nome, data_evento, de, ate, local, ids),
+            "eventos",
+            params,
+            tabelas=[models.Evento.atualizado_em],
+        ),
+        lambda: _listar_eventos(
+            db, nome, data_evento, de, ate, local, ids, cursor, limite
+        ),
+        "eventos",
+        params,
+    )
 
-    eventos = query.all()
 
-    if not eventos:
-        raise HTTPException(status_code=404, detail="Nenhum evento encontrado")
+@router.get("/{id}/candidatos", response_model=List[schemas.CandidatoResponse])
+def get_candidatos_evento(
+    id: int,
+    especialidade: Optional[str] = None,
+    limite: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db),
+):
+    evento = db.get(models.Evento, id)
+    if not evento:
+        raise HTTPException(status_code=404, detail="Evento não encontrado")
 
-    return eventos
+    # Freelancers livres na data do evento, ranqueados por relevância e avaliação
+    especialidade = (especialidade or "").strip().lower() or None
+    return candidatos.ranquear(db, evento, especialidade, limite)
 
 
 @router.post(
@@ -40,12 +152,7 @@ def get_eventos(
 )
 def create_evento(evento: schemas.EventoCreate, db: Session = Depends(get_db)):
     # Verificar se organizador existe
-    organizador = (
-        db.query(models.Organizador)
-        .filter(models.Organizador.id == evento.organizador_id)
-        .first()
-    )
-    if not organizador:
+    if not consultas.existe(db, models.Organizador, evento.organizador_id):
         raise HTTPException(status_code=404, detail="Organizador não encontrado")
 
     # Criar evento
@@ -57,7 +164,37 @@ def create_evento(evento: schemas.EventoCreate, db: Session = Depends(get_db)):
         descricao=evento.descricao,
     )
     db.add(new_evento)
-    db.commit()
-    db.refresh(new_evento)
+    estatisticas.registrar_eventos(db, [(evento.organizador_id, evento.data_evento)])
+    cache.respostas.invalidar_apos_commit(db, "eventos")
+    # O id vem do flush; o commit é feito pela rota
+    db.flush()
 
     return new_evento
+
+
+@router.post("/bulk", response_model=schemas.ResultadoLote)
+def create_eventos_bulk(
+    eventos: List[schemas.EventoCreate] = Body(..., max_length=schemas.LIMITE_LOTE),
+    db: Session = Depends(get_db),
+):
+    # Verificar todos os organizadores do lote com uma única consulta
+    organizadores = lote.ids_existentes(
+        db, models.Organizador.id, (e.organizador_id for e in eventos)
+    )
+
+    erros = {}
+    validos = []
+    for indice, evento in enumerate(eventos):
+        if evento.organizador_id not in organizadores:
+            erros[indice] = "Organizador não encontrado"
+        else:
+            validos.append(indice)
+
+    ids = lote.inserir(db, models.Evento, [eventos[i].model_dump() for i in validos])
+    estatisticas.registrar_eventos(
+        db, [(eventos[i].organizador_id, eventos[i].data_evento) for i in validos]
+    )
+    cache.respostas.invalidar_apos_commit(db, "eventos")
+    lote.gravar(db)
+
+    return lote.resultado(len(eventos), dict(zip(validos, ids)), erros)
@@ -1,15 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    status,
+)
+from sqlalchemy import desc, update
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import date
 
-from .. import models, schemas
-from ..database import get_db
+from .. import (
+    busca,
+    cache,
+    condicional,
+    consultas,
+    estatisticas,
+    lote,
+    models,
+    schemas,
+    usuarios,
+)
+from ..paginacao import (
+    LIMITE_MAXIMO,
+    LIMITE_PADRAO,
+    ler_ids,
+    pagina_json,
+    paginar,
+)
+from ..database import DbRoute, get_db, get_read_db
 
 router = APIRouter(
     prefix="/freelancers",
     tags=["Freelancer"],
     responses={404: {"description": "Not found"}},
+    route_class=DbRoute,
 )
 
 
@@ -19,120 +46,193 @@ router = APIRouter(
 def create_freelancer(
     freelancer: schemas.FreelancerCreate, db: Session = Depends(get_db)
 ):
-    # Verificar se email já existe
-    db_user = (
-        db.query(models.Usuario)
-        .filter(models.Usuario.email == freelancer.email)
-        .first()
+    # Usuário e freelancer em uma única escrita; o email duplicado vem da constraint
+    id = usuarios.criar(
+        db,
+        freelancer,
+        models.Freelancer,
+        especialidade=freelancer.especialidade,
+        portfolio=freelancer.portfolio,
+        avaliacao_media=0.0,
     )
-    if db_user:
-        raise HTTPException(status_code=400, detail="Email já registrado")
+    cache.respostas.invalidar_apos_commit(db, "freelancers")
 
-    # Criar usuário
-    new_user = models.Usuario(
+    # Construir resposta
+    response = schemas.FreelancerResponse(
+        id=id,
         nome=freelancer.nome,
         email=freelancer.email,
-        senha=freelancer.senha,  # Em produção, a senha deve ser hasheada
         telefone=freelancer.telefone,
         documento=freelancer.documento,
-        tipo=freelancer.tipo,
-        data_cadastro=date.today(),
-    )
-    db.add(new_user)
-    db.flush()
-
-    # Criar freelancer
-    new_freelancer = models.Freelancer(
-        id=new_user.id,
         especialidade=freelancer.especialidade,
         portfolio=freelancer.portfolio,
         avaliacao_media=0.0,
     )
-    db.add(new_freelancer)
-    db.commit()
-    db.refresh(new_freelancer)
-
-    # Construir resposta
-    response = schemas.FreelancerResponse(
-        id=new_freelancer.id,
-        nome=new_user.nome,
-        email=new_user.email,
-        telefone=new_user.telefone,
-        documento=new_user.documento,
-        especialidade=new_freelancer.especialidade,
-        portfolio=new_freelancer.portfolio,
-        avaliacao_media=new_freelancer.avaliacao_media,
-    )
 
     return response
 
 
-@router.get("/", response_model=List[schemas.FreelancerResponse])
-def get_freelancers_by_especialidade(
-    especialidade: str = None, db: Session = Depends(get_db)
+@router.post("/bulk", response_model=schemas.ResultadoLote)
+def create_freelancers_bulk(
+    freelancers: List[schemas.FreelancerCreate] = Body(
+        ..., max_length=schemas.LIMITE_LOTE
+    ),
+    db: Session = Depends(get_db),
 ):
-    query = db.query(models.Freelancer)
+    # Verificar todos os emails do lote com uma única consulta
+    registrados = lote.ids_existentes(
+        db, models.Usuario.email, (f.email for f in freelancers)
+    )
+
+    erros = {}
+    validos = []
+    vistos = set()
+    for indice, freelancer in enumerate(freelancers):
+        if freelancer.email in registrados:
+            erros[indice] = "Email já registrado"
+        elif freelancer.email in vistos:
+            erros[indice] = "Email repetido no lote"
+        else:
+            vistos.add(freelancer.email)
+            validos.append(indice)
+
+    # Criar usuários e freelancers com um INSERT de várias linhas cada
+    hoje = date.today()
+    usuario_ids = lote.inserir(
+        db,
+        models.Usuario,
+        [
+            dict(
+                nome=freelancers[i].nome,
+                email=freelancers[i].email,
+                senha=freelancers[i].senha,  # Em produção, a senha deve ser hasheada
+                telefone=freelancers[i].telefone,
+                documento=freelancers[i].documento,
+                tipo=freelancers[i].tipo,
+                data_cadastro=hoje,
+            )
+            for i in validos
+        ],
+    )
+    lote.inserir(
+        db,
+        models.Freelancer,
+        [
+            dict(
+                id=usuario_id,
+                especialidade=freelancers[i].especialidade,
+                portfolio=freelancers[i].portfolio,
+                avaliacao_media=0.0,
+            )
+            for usuario_id, i in zip(usuario_ids, validos)
+        ],
+        retornar_ids=False,
+    )
+    cache.respostas.invalidar_apos_commit(db, "freelancers")
+    lote.gravar(db)
 
-    # Se a especialidade for fornecida, aplica a busca fuzzy
+    return lote.resultado(len(freelancers), dict(zip(validos, usuario_ids)), erros)
+
+
+def _escopo_freelancers(db: Session, especialidade, ids=None):
+    query = consultas.freelancers(db)
+    if ids:
+        query = query.filter(models.Freelancer.id.in_(ids))
     if especialidade:
-        # Usa ILIKE para busca case-insensitive com padrão de correspondência
-        query = query.filter(
-            models.Freelancer.especialidade.ilike(f"%{especialidade}%")
-        )
+        coluna = models.Freelancer.especialidade
+        query = query.filter(busca.backend(db).condicao(db, coluna, especialidade))
+    return query
 
-    freelancers = query.all()
 
-    if not freelancers:
+def _listar_freelancers(db: Session, especialidade, ids, cursor, limite):
+    query = _escopo_freelancers(db, especialidade, ids)
+    ordem = [models.Freelancer.id]
+
+    # Se a especialidade for fornecida, aplica a busca fuzzy ranqueada por similaridade
+    if especialidade:
+        coluna = models.Freelancer.especialidade
+        relevancia = busca.backend(db).relevancia(db, coluna, especialidade)
+        relevancia = relevancia.label("relevancia")
+        query = query.add_columns(relevancia)
+        ordem = [desc(relevancia), models.Freelancer.id]
+
+    freelancers, next_cursor = paginar(query, ordem, cursor, limite)
+
+    if not freelancers and not cursor:
         raise HTTPException(status_code=404, detail="Nenhum freelancer encontrado")
 
-    result = []
-    for freelancer in freelancers:
-        user = freelancer.usuario
-        result.append(
-            schemas.FreelancerResponse(
-                id=freelancer.id,
-                nome=user.nome,
-                email=user.email,
-                telefone=user.telefone,
-                documento=user.documento,
-                especialidade=freelancer.especialidade,
-                portfolio=freelancer.portfolio,
-                avaliacao_media=freelancer.avaliacao_media,
-            )
-        )
+    return pagina_json(schemas.FreelancerResponse, freelancers, next_cursor)
 
-    return result
+
+def _validar_freelancers(db: Session, especialidade, ids, params):
+    # A especialidade muda: o carimbo dos freelancers é o da tabela inteira
+    return condicional.validador(
+        _escopo_freelancers(db, especialidade, ids),
+        "freelancers",
+        params,
+        colunas=[models.Usuario.atualizado_em],
+        tabelas=[models.Freelancer.atualizado_em],
+    )
+
+
+@router.get("/", response_model=schemas.Pagina[schemas.FreelancerResponse])
+def get_freelancers_by_especialidade(
+    request: Request,
+    especialidade: str = None,
+    ids: Optional[str] = Query(None, description="Ids separados por vírgula"),
+    cursor: Optional[str] = None,
+    limite: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    db: Session = Depends(get_read_db),
+):
+    ids = ler_ids(ids)
+    # A busca não diferencia maiúsculas: o termo normalizado serve de chave do cache
+    especialidade = (especialidade or "").strip().lower() or None
+    params = {
+        "especialidade": especialidade,
+        "ids": ",".join(map(str, ids)) if ids else None,
+        "cursor": cursor,
+        "limite": limite,
+    }
+
+    # Cliente com a versão atual da página recebe 304, sem buscar as linhas; com
+    # a página em cache, sem nenhuma consulta
+    return condicional.listagem(
+        request,
+        lambda: _validar_freelancers(db, especialidade, ids, params),
+        lambda: _listar_freelancers(db, especialidade, ids, cursor, limite),
+        "freelancers",
+        params,
+    )
 
 
 @router.put("/{id}", response_model=schemas.FreelancerResponse)
 def update_freelancer(
     id: int, freelancer_update: schemas.FreelancerUpdate, db: Session = Depends(get_db)
 ):
-    db_freelancer = (
-        db.query(models.Freelancer).filter(models.Freelancer.id == id).first()
-    )
+    # Atualizar campos
+    dados = freelancer_update.model_dump(exclude_unset=True)
+    if dados:
+        db.execute(
+            update(models.Freelancer)
+            .where(models.Freelancer.id == id)
+            .values(**dados)
+            .execution_options(synchronize_session=False)
+        )
+        cache.respostas.invalidar_apos_commit(db, "freelancers")
+
+    # Na mesma transação do UPDATE, então já com os valores novos
+    db_freelancer = consultas.freelancers(db).filter(models.Freelancer.id == id).first()
 
     if not db_freelancer:
         raise HTTPException(status_code=404, detail="Freelancer não encontrado")
 
-    # Atualizar campos
-    for key, value in freelancer_update.dict(exclude_unset=True).items():
-        setattr(db_freelancer, key, value)
+    return db_freelancer
 
-    db.commit()
-    db.refresh(db_freelancer)
 
-    # Construir resposta
-    user = db_freelancer.usuario
-    response = schemas.FreelancerResponse(
-        id=db_freelancer.id,
-        nome=user.nome,
-        email=user.email,
-        telefone=user.telefone,
-        documento=user.documento,
-        especialidade=db_freelancer.especialidade,
-        portfolio=db_freelancer.portfolio,
-        avaliacao_media=db_freelancer.avaliacao_media,
-    )
+@router.get("/{id}/stats", response_model=schemas.EstatisticasResponse)
+def get_freelancer_stats(id: int, db: Session = Depends(get_read_db)):
+    if not consultas.existe(db, models.Freelancer, id):
+        raise HTTPException(status_code=404, detail="Freelancer não encontrado")
 
-    return response
+    # Lidas das tabelas de resumo mantidas pelas escritas, sem GROUP BY
+    return estatisticas.obter(db, id)
@@ -1,14 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from datetime import date
 
-from .. import models, schemas
-from ..database import get_db
+from .. import consultas, estatisticas, models, schemas, usuarios
+from ..database import DbRoute, get_db, get_read_db
 
 router = APIRouter(
     prefix="/organizadores",
     tags=["Organizador"],
     responses={404: {"description": "Not found"}},
+    route_class=DbRoute,
 )
 
 
@@ -18,45 +18,33 @@ router = APIRouter(
 def create_organizador(
     organizador: schemas.OrganizadorCreate, db: Session = Depends(get_db)
 ):
-    # Verificar se email já existe
-    db_user = (
-        db.query(models.Usuario)
-        .filter(models.Usuario.email == organizador.email)
-        .first()
+    # Usuário e organizador em uma única escrita; o email duplicado vem da constraint
+    id = usuarios.criar(
+        db,
+        organizador,
+        models.Organizador,
+        empresa_evento=organizador.empresa_evento,
+        avaliacao_media=0.0,
     )
-    if db_user:
-        raise HTTPException(status_code=400, detail="Email já registrado")
 
-    # Criar usuário
-    new_user = models.Usuario(
+    # Construir resposta
+    response = schemas.OrganizadorResponse(
+        id=id,
         nome=organizador.nome,
         email=organizador.email,
-        senha=organizador.senha,  # Em produção, a senha deve ser hasheada
         telefone=organizador.telefone,
         documento=organizador.documento,
-        tipo=organizador.tipo,
-        data_cadastro=date.today(),
+        empresa_evento=organizador.empresa_evento,
+        avaliacao_media=0.0,
     )
-    db.add(new_user)
-    db.flush()
 
-    # Criar organizador
-    new_organizador = models.Organizador(
-        id=new_user.id, empresa_evento=organizador.empresa_evento, avaliacao_media=0.0
-    )
-    db.add(new_organizador)
-    db.commit()
-    db.refresh(new_organizador)
+    return response
 
-    # Construir resposta
-    response = schemas.OrganizadorResponse(
-        id=new_organizador.id,
-        nome=new_user.nome,
-        email=new_user.email,
-        telefone=new_user.telefone,
-        documento=new_user.documento,
-        empresa_evento=new_organizador.empresa_evento,
-        avaliacao_media=new_organizador.avaliacao_media,
-    )
 
-    return response
+@router.get("/{id}/stats", response_model=schemas.EstatisticasResponse)
+def get_organizador_stats(id: int, db: Session = Depends(get_read_db)):
+    if not consultas.existe(db, models.Organizador, id):
+        raise HTTPException(status_code=404, detail="Organizador não encontrado")
+
+    # Lidas das tabelas de resumo mantidas pelas escritas, sem GROUP BY
+    return estatisticas.obter(db, id)
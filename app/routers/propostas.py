@@ -1,14 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import date
 
-from .. import models, schemas
-from ..database import get_db
+from .. import (
+    condicional,
+    consultas,
+    estatisticas,
+    exportacao,
+    lote,
+    models,
+    schemas,
+    transicoes,
+)
+from ..transicoes import STATUS_VALIDOS
+from ..paginacao import (
+    LIMITE_MAXIMO,
+    LIMITE_PADRAO,
+    colunas_schema,
+    itens_json,
+    pagina_json,
+    paginar,
+)
+from ..database import DbRoute, get_db, get_read_db
 
 router = APIRouter(
     prefix="/propostas",
     tags=["Proposta de Serviço"],
     responses={404: {"description": "Not found"}},
+    route_class=DbRoute,
 )
 
 
@@ -16,20 +46,16 @@ router = APIRouter(
 def create_proposta(
     proposta: schemas.PropostaServicoCreate, db: Session = Depends(get_db)
 ):
-    # Verificar se evento existe
-    evento = (
-        db.query(models.Evento).filter(models.Evento.id == proposta.evento_id).first()
+    # Verificar se evento existe; só as colunas usadas nas estatísticas
+    evento = estatisticas.dados_eventos(db, [proposta.evento_id]).get(
+        proposta.evento_id
     )
     if not evento:
         raise HTTPException(status_code=404, detail="Evento não encontrado")
+    data_evento, organizador_id = evento
 
     # Verificar se freelancer existe
-    freelancer = (
-        db.query(models.Freelancer)
-        .filter(models.Freelancer.id == proposta.freelancer_id)
-        .first()
-    )
-    if not freelancer:
+    if not consultas.existe(db, models.Freelancer, proposta.freelancer_id):
         raise HTTPException(status_code=404, detail="Freelancer não encontrado")
 
     # Criar proposta
@@ -40,56 +66,259 @@ def create_proposta(
         status=proposta.status,
     )
     db.add(new_proposta)
-    db.commit()
+
+    # Estatísticas do freelancer e do organizador e, se aceita, a disponibilidade
+    estatisticas.registrar_propostas(
+        db,
+        [
+            (
+                proposta.freelancer_id,
+                organizador_id,
+                data_evento,
+                None,
+                proposta.status,
+            )
+        ],
+    )
 
     return {"message": "Proposta enviada com sucesso"}
 
 
+@router.post("/bulk", response_model=schemas.ResultadoLote)
+def create_propostas_bulk(
+    propostas: List[schemas.PropostaServicoCreate] = Body(
+        ..., max_length=schemas.LIMITE_LOTE
+    ),
+    db: Session = Depends(get_db),
+):
+    # Uma consulta IN por tabela referenciada, para o lote inteiro
+    eventos = lote.ids_existentes(
+        db, models.Evento.id, (p.evento_id for p in propostas)
+    )
+    freelancers = lote.ids_existentes(
+        db, models.Freelancer.id, (p.freelancer_id for p in propostas)
+    )
+
+    erros = {}
+    validos = []
+    for indice, proposta in enumerate(propostas):
+        if proposta.evento_id not in eventos:
+            erros[indice] = "Evento não encontrado"
+        elif proposta.freelancer_id not in freelancers:
+            erros[indice] = "Freelancer não encontrado"
+        elif proposta.status not in STATUS_VALIDOS:
+            erros[indice] = "Status inválido"
+        else:
+            validos.append(indice)
+
+    ids = lote.inserir(
+        db, models.PropostaServico, [propostas[i].model_dump() for i in validos]
+    )
+
+    # Estatísticas e disponibilidade, com uma consulta para os eventos do lote
+    inseridas = [propostas[i] for i in validos]
+    dados = estatisticas.dados_eventos(db, (p.evento_id for p in inseridas))
+    estatisticas.registrar_propostas(
+        db,
+        [
+            (
+                p.freelancer_id,
+                dados[p.evento_id][1],
+                dados[p.evento_id][0],
+                None,
+                p.status,
+            )
+            for p in inseridas
+        ],
+    )
+    lote.gravar(db)
+
+    return lote.resultado(len(propostas), dict(zip(validos, ids)), erros)
+
+
 @router.patch("/{id}")
 def update_proposta_status(
     id: int,
     proposta_update: schemas.PropostaServicoUpdate,
     db: Session = Depends(get_db),
 ):
-    proposta = (
-        db.query(models.PropostaServico).filter(models.PropostaServico.id == id).first()
+    # Validar status
+    if proposta_update.status not in STATUS_VALIDOS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Status inválido. Valores permitidos: {', '.join(STATUS_VALIDOS)}",
+        )
+
+    # Verificação e escrita em um UPDATE condicional, sem ler a proposta antes
+    anterior, proposta = transicoes.transicionar(
+        db, id, proposta_update.status, proposta_update.versao
     )
 
-    if not proposta:
-        raise HTTPException(status_code=404, detail="Proposta não encontrada")
+    # Atualizar estatísticas e disponibilidade
+    estatisticas.registrar_propostas(
+        db,
+        [
+            (
+                proposta.freelancer_id,
+                proposta.organizador_id,
+                proposta.data_evento,
+                anterior,
+                proposta_update.status,
+            )
+        ],
+    )
 
-    # Validar status
-    valid_status = ["Pendente", "Aceita", "Recusada", "Cancelada"]
-    if proposta_update.status not in valid_status:
+    return {
+        "message": "Status da proposta atualizado com sucesso",
+        "versao": proposta.versao,
+    }
+
+
+# Objetos relacionados que `expand` pode embutir em cada proposta
+EXPANSOES = ("evento", "freelancer")
+
+
+def _ler_expand(texto):
+    expand = {parte.strip() for parte in (texto or "").split(",") if parte.strip()}
+    invalidos = expand - set(EXPANSOES)
+    if invalidos:
         raise HTTPException(
             status_code=400,
-            detail=f"Status inválido. Valores permitidos: {', '.join(valid_status)}",
+            detail=f"'expand' inválido. Valores permitidos: {', '.join(EXPANSOES)}",
+        )
+    return expand
+
+
+def _relacionados(db: Session, propostas, expand):
+    # Uma consulta por relação, com os ids distintos da página
+    relacionados = {}
+    if "evento" in expand:
+        ids = {proposta.evento_id for proposta in propostas}
+        eventos = consultas.eventos(db).filter(models.Evento.id.in_(ids)).all()
+        itens = itens_json(schemas.EventoResponse, eventos)
+        relacionados["evento"] = ("evento_id", {item["id"]: item for item in itens})
+    if "freelancer" in expand:
+        ids = {proposta.freelancer_id for proposta in propostas}
+        freelancers = (
+            consultas.freelancers(db).filter(models.Freelancer.id.in_(ids)).all()
+        )
+        itens = itens_json(schemas.FreelancerResponse, freelancers)
+        relacionados["freelancer"] = (
+            "freelancer_id",
+            {item["id"]: item for item in itens},
+        )
+    return relacionados
+
+
+def _validar_propostas(db: Session, query, id, expand, cursor, limite):
+    # Com expand, o ETag também muda quando um objeto embutido muda. As
+    # propostas não mudam de freelancer, então os carimbos são os do escopo
+    escopo, colunas = query, [models.PropostaServico.atualizado_em]
+    if "evento" in expand:
+        escopo = escopo.join(
+            models.Evento, models.Evento.id == models.PropostaServico.evento_id
         )
+        colunas.append(models.Evento.atualizado_em)
+    if "freelancer" in expand:
+        escopo = escopo.join(
+            models.Freelancer,
+            models.Freelancer.id == models.PropostaServico.freelancer_id,
+        ).join(models.Usuario, models.Usuario.id == models.Freelancer.id)
+        colunas += [models.Freelancer.atualizado_em, models.Usuario.atualizado_em]
 
-    # Atualizar status
-    proposta.status = proposta_update.status
-    db.commit()
+    return condicional.validador(
+        escopo,
+        f"propostas:freelancer:{id}",
+        {
+            "expand": ",".join(sorted(expand)) or None,
+            "cursor": cursor,
+            "limite": limite,
+        },
+        colunas=colunas,
+    )
 
-    return {"message": "Status da proposta atualizado com sucesso"}
 
+@router.get(
+    "/freelancer/{id}",
+    response_model=schemas.Pagina[schemas.PropostaExpandidaResponse],
+)
+def get_propostas_by_freelancer(
+    id: int,
+    request: Request,
+    expand: Optional[str] = Query(
+        None, description="Relacionados a embutir: evento, freelancer"
+    ),
+    cursor: Optional[str] = None,
+    limite: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    db: Session = Depends(get_read_db),
+):
+    expand = _ler_expand(expand)
 
-@router.get("/freelancer/{id}", response_model=List[schemas.PropostaServicoResponse])
-def get_propostas_by_freelancer(id: int, db: Session = Depends(get_db)):
     # Verificar se freelancer existe
-    freelancer = db.query(models.Freelancer).filter(models.Freelancer.id == id).first()
-    if not freelancer:
+    if not consultas.existe(db, models.Freelancer, id):
         raise HTTPException(status_code=404, detail="Freelancer não encontrado")
 
-    # Buscar propostas
-    propostas = (
-        db.query(models.PropostaServico)
-        .filter(models.PropostaServico.freelancer_id == id)
-        .all()
+    # Buscar propostas, só com as colunas da resposta
+    query = db.query(
+        *colunas_schema(models.PropostaServico, schemas.PropostaServicoResponse)
+    ).filter(models.PropostaServico.freelancer_id == id)
+
+    def listar():
+        propostas, next_cursor = paginar(
+            query, [models.PropostaServico.id], cursor, limite
+        )
+        if not propostas and not cursor:
+            raise HTTPException(
+                status_code=404,
+                detail="Nenhuma proposta encontrada para este freelancer",
+            )
+        return pagina_json(
+            schemas.PropostaServicoResponse,
+            propostas,
+            next_cursor,
+            _relacionados(db, propostas, expand),
+        )
+
+    # Cliente com a versão atual da página recebe 304, sem buscar as linhas
+    return condicional.listagem(
+        request,
+        lambda: _validar_propostas(db, query, id, expand, cursor, limite),
+        listar,
     )
 
-    if not propostas:
+
+@router.get("/exportar", response_class=StreamingResponse)
+def export_propostas(
+    formato: exportacao.Formato = exportacao.Formato.ndjson,
+    de: Optional[date] = None,
+    ate: Optional[date] = None,
+    status: Optional[str] = None,
+    organizador_id: Optional[int] = None,
+):
+    exportacao.validar_periodo(de, ate)
+    if status is not None and status not in STATUS_VALIDOS:
         raise HTTPException(
-            status_code=404, detail="Nenhuma proposta encontrada para este freelancer"
+            status_code=400,
+            detail=f"Status inválido. Valores permitidos: {', '.join(STATUS_VALIDOS)}",
+        )
+
+    proposta = models.PropostaServico
+    statement = select(
+        proposta.id,
+        proposta.evento_id,
+        proposta.freelancer_id,
+        proposta.data_proposta,
+        proposta.status,
+    ).order_by(proposta.id)
+    if de:
+        statement = statement.where(proposta.data_proposta >= de)
+    if ate:
+        statement = statement.where(proposta.data_proposta <= ate)
+    if status:
+        statement = statement.where(proposta.status == status)
+    if organizador_id is not None:
+        statement = statement.join(models.Evento).where(
+            models.Evento.organizador_id == organizador_id
         )
 
-    return propostas
+    return exportacao.exportar(statement, formato, "propostas")
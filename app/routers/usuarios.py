@@ -0,0 +1,35 @@
+from typing import List
+
+import orjson
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.orm import Session
+
+from .. import consultas, models, schemas
+from ..database import DbRoute, get_read_db
+from ..paginacao import itens_json, ler_ids
+
+router = APIRouter(
+    prefix="/usuarios",
+    tags=["Usuário"],
+    responses={404: {"description": "Not found"}},
+    route_class=DbRoute,
+)
+
+
+@router.get("/", response_model=List[schemas.UsuarioResponse])
+def get_usuarios(
+    ids: str = Query(..., description="Ids separados por vírgula"),
+    db: Session = Depends(get_read_db),
+):
+    # Uma consulta para todos os ids; os que não existem ficam fora da resposta
+    ids = ler_ids(ids)
+    usuarios = (
+        consultas.usuarios(db)
+        .filter(models.Usuario.id.in_(ids))
+        .order_by(models.Usuario.id)
+        .all()
+    )
+    return Response(
+        orjson.dumps(itens_json(schemas.UsuarioResponse, usuarios)),
+        media_type="application/json",
+    )
@@ -1,7 +1,12 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from typing import Dict, Generic, List, Optional, TypeVar
 from datetime import date
 
+T = TypeVar("T")
+
+# Quantidade máxima de itens aceita pelos endpoints de inserção em lote
+LIMITE_LOTE = 1000
+
 
 # Schemas base
 class UsuarioBase(BaseModel):
@@ -66,6 +71,13 @@ class AvaliacaoCreate(AvaliacaoBase):
 
 
 # Schemas para resposta
+class UsuarioResponse(UsuarioBase):
+    id: int
+    tipo: str
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class FreelancerResponse(FreelancerBase):
     id: int
     nome: str
@@ -74,8 +86,12 @@ class FreelancerResponse(FreelancerBase):
     documento: Optional[str]
     avaliacao_media: Optional[float]
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class CandidatoResponse(FreelancerResponse):
+    profissao: Optional[str] = None
+    pontuacao: float
 
 
 class OrganizadorResponse(OrganizadorBase):
@@ -86,30 +102,62 @@ class OrganizadorResponse(OrganizadorBase):
     documento: Optional[str]
     avaliacao_media: Optional[float]
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class EventoResponse(EventoBase):
     id: int
     organizador_id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class PropostaServicoResponse(PropostaServicoBase):
     id: int
+    versao: int
+
+    model_config = ConfigDict(from_attributes=True)
 
-    class Config:
-        orm_mode = True
+
+# Proposta com os objetos pedidos em `expand` embutidos
+class PropostaExpandidaResponse(PropostaServicoResponse):
+    evento: Optional[EventoResponse] = None
+    freelancer: Optional[FreelancerResponse] = None
 
 
 class AvaliacaoResponse(AvaliacaoBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+# Página de resultados com cursor opaco para a próxima página
+class Pagina(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
+# Estatísticas do dashboard de um organizador ou freelancer
+class EstatisticasResponse(BaseModel):
+    usuario_id: int
+    total_propostas: int
+    propostas_por_status: Dict[str, int]
+    # Fração das propostas que estão aceitas; None sem propostas
+    taxa_aceitacao: Optional[float] = None
+    eventos_por_mes: Dict[str, int]
+    distribuicao_notas: Dict[int, int]
+
+
+# Resultado de cada item de uma inserção em lote, na ordem do pedido
+class ResultadoItemLote(BaseModel):
+    indice: int
+    id: Optional[int] = None
+    erro: Optional[str] = None
+
+
+class ResultadoLote(BaseModel):
+    inseridos: int
+    resultados: List[ResultadoItemLote]
 
 
 # Schemas para atualização
@@ -117,12 +165,13 @@ class FreelancerUpdate(BaseModel):
     especialidade: Optional[str] = None
     portfolio: Optional[str] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class PropostaServicoUpdate(BaseModel):
     status: str
+    # Versão lida pelo cliente; se informada, a alteração falha com 409 quando a
+    # proposta já tiver sido alterada por outra requisição
+    versao: Optional[int] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
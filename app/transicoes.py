@@ -0,0 +1,102 @@
+"""Máquina de estados do status das propostas.
+
+Cada transição é um único UPDATE condicional (`WHERE id = :id AND status =
+:origem`, e `AND versao = :versao` quando o cliente manda a versão que leu) com
+RETURNING: a verificação e a escrita são atômicas, então dois requests
+concorrentes nunca aplicam a mesma transição duas vezes nem sobrescrevem um ao
+outro. A consulta extra que explica a recusa (404 ou 409) só roda quando o
+UPDATE não encontra a linha.
+"""
+
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from . import models
+
+PENDENTE = "Pendente"
+ACEITA = "Aceita"
+RECUSADA = "Recusada"
+CANCELADA = "Cancelada"
+
+STATUS_VALIDOS = [PENDENTE, ACEITA, RECUSADA, CANCELADA]
+
+# Status de origem -> status de destino permitidos; Recusada e Cancelada são finais
+TRANSICOES = {
+    PENDENTE: (ACEITA, RECUSADA, CANCELADA),
+    ACEITA: (CANCELADA,),
+}
+
+
+def origens(novo: str):
+    """Status a partir dos quais a proposta pode passar para `novo`."""
+    return [origem for origem, destinos in TRANSICOES.items() if novo in destinos]
+
+
+def _recusar(db: Session, id: int, novo: str, versao):
+    atual = db.execute(
+        select(models.PropostaServico.status, models.PropostaServico.versao).where(
+            models.PropostaServico.id == id
+        )
+    ).first()
+    if atual is None:
+        raise HTTPException(status_code=404, detail="Proposta não encontrada")
+    if versao is not None and atual.versao != versao:
+        raise HTTPException(
+            status_code=409,
+            detail=(
+                f"Proposta alterada por outra requisição (versão atual {atual.versao})"
+            ),
+        )
+    raise HTTPException(
+        status_code=409,
+        detail=f"Transição de status inválida: {atual.status} -> {novo}",
+    )
+
+
+def transicionar(db: Session, id: int, novo: str, versao=None):
+    """Passa a proposta `id` para o status `novo`. Não faz commit.
+
+    Devolve o status anterior e a linha alterada, com freelancer_id,
+    organizador_id e data_evento (para as estatísticas) e a nova versão.
+    """
+    proposta = models.PropostaServico
+    # Dados do evento no próprio RETURNING, como subconsultas correlacionadas
+    organizador_id = (
+        select(models.Evento.organizador_id)
+        .where(models.Evento.id == proposta.evento_id)
+        .scalar_subquery()
+    )
+    data_evento = (
+        select(models.Evento.data_evento)
+        .where(models.Evento.id == proposta.evento_id)
+        .scalar_subquery()
+    )
+
+    # Quase todo destino tem uma origem só; com mais de uma, tenta em ordem
+    for origem in origens(novo):
+        statement = (
+            update(proposta)
+            .where(proposta.id == id, proposta.status == origem)
+            .values(
+                status=novo,
+                versao=proposta.versao + 1,
+                atualizado_em=datetime.utcnow(),
+            )
+            .returning(
+                proposta.freelancer_id,
+                organizador_id.label("organizador_id"),
+                data_evento.label("data_evento"),
+                proposta.versao,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if versao is not None:
+            statement = statement.where(proposta.versao == versao)
+        linha = db.execute(statement).first()
+        if linha is not None:
+            return origem, linha
+
+    _recusar(db, id, novo, versao)
@@ -0,0 +1,68 @@
+from datetime import date, datetime
+
+from fastapi import HTTPException
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+
+# SQLSTATE de unique_violation no Postgres
+_UNIQUE_VIOLATION = "23505"
+
+
+def _email_duplicado(erro: IntegrityError) -> bool:
+    original = erro.orig
+    codigo = getattr(original, "pgcode", None) or getattr(original, "sqlstate", None)
+    if codigo is not None:
+        return codigo == _UNIQUE_VIOLATION
+    # SQLite: "UNIQUE constraint failed: usuarios.email"
+    return "UNIQUE" in str(original).upper()
+
+
+def criar(db: Session, usuario, modelo, **campos) -> int:
+    """Insere o usuário e o subtipo `modelo` (Freelancer ou Organizador) e
+    devolve o id, sem confirmar a transação.
+
+    O email duplicado é detectado pela constraint unique de `Usuario.email`, sem
+    consulta prévia, e vira o mesmo 400 de antes. No Postgres os dois INSERTs vão
+    em um único statement.
+    """
+    dados = dict(
+        nome=usuario.nome,
+        email=usuario.email,
+        senha=usuario.senha,  # Em produção, a senha deve ser hasheada
+        telefone=usuario.telefone,
+        documento=usuario.documento,
+        tipo=usuario.tipo,
+        data_cadastro=date.today(),
+    )
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            # WITH novo_usuario AS (INSERT ... RETURNING id) INSERT INTO subtipo;
+            # o carimbo vai explícito porque os defaults dos dois INSERTs usariam
+            # o mesmo nome de parâmetro
+            novo_usuario = (
+                insert(models.Usuario)
+                .values(**dados, atualizado_em=datetime.utcnow())
+                .returning(models.Usuario.id)
+                .cte("novo_usuario")
+            )
+            return db.scalar(
+                insert(modelo)
+                .values(id=select(novo_usuario.c.id).scalar_subquery(), **campos)
+                .add_cte(novo_usuario)
+                .returning(modelo.id)
+            )
+
+        id = db.scalar(
+            insert(models.Usuario).values(**dados).returning(models.Usuario.id)
+        )
+        # Pelo flush, para o índice de busca em memória ser atualizado pelos eventos
+        db.add(modelo(id=id, **campos))
+        return id
+    except IntegrityError as erro:
+        db.rollback()
+        if not _email_duplicado(erro):
+            raise
+        raise HTTPException(status_code=400, detail="Email já registrado")
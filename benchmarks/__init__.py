@@ -0,0 +1,23 @@
+import json
+import os
+import tempfile
+
+
+def preparar_banco(nome: str):
+    """Usa o DATABASE_URL do ambiente ou um SQLite temporário, com as migrações
+    aplicadas. Precisa rodar antes de importar `app.main`."""
+    if "DATABASE_URL" not in os.environ:
+        arquivo = os.path.join(tempfile.mkdtemp(), f"{nome}.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{arquivo}"
+
+    from app import database, migracoes
+
+    migracoes.aplicar(database.get_engine())
+
+
+def salvar(resultado: dict, saida=None):
+    texto = json.dumps(resultado, indent=2)
+    if saida:
+        with open(saida, "w") as arquivo:
+            arquivo.write(texto)
+    print(texto)
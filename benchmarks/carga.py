@@ -0,0 +1,546 @@
+"""Teste de carga de todos os endpoints dos routers, com latência e queries.
+
+Popula o banco (o DATABASE_URL do ambiente ou um SQLite temporário) com os
+volumes pedidos e dispara os cenários contra a aplicação em processo, por um
+cliente ASGI, com a concorrência pedida. Para cada cenário reporta p50/p95/p99,
+vazão e as queries, commits e idas ao banco por request (lidos do cabeçalho
+`Server-Timing`). Uso:
+
+    python -m benchmarks.carga --freelancers 2000 --eventos 500 \\
+        --requests 300 --concorrencia 16 --saida carga.json
+
+Rotas dos routers sem cenário aparecem em `rotas_sem_cenario` no resultado.
+"""
+
+import argparse
+import asyncio
+import math
+import random
+import re
+import time
+import uuid
+from datetime import date, timedelta
+
+from . import preparar_banco, salvar
+
+_QUERIES = re.compile(r'desc="(\d+) queries, (\d+) commits"')
+_STATUS = ["Pendente", "Aceita", "Recusada", "Cancelada"]
+# Volumes padrão da população inicial
+_VOLUMES = {
+    "freelancers": 1000,
+    "organizadores": 100,
+    "eventos": 500,
+    "propostas": 5000,
+    "avaliacoes": 5000,
+}
+_ESPECIALIDADES = [
+    "garçom",
+    "fotógrafo",
+    "DJ",
+    "segurança",
+    "recepcionista",
+    "bartender",
+]
+
+
+def _percentil(valores, p):
+    # Nearest-rank sobre os valores já ordenados
+    if not valores:
+        return None
+    return valores[max(0, math.ceil(p / 100 * len(valores)) - 1)]
+
+
+def _resumo(valores):
+    return {
+        "media": sum(valores) / len(valores) if valores else None,
+        "max": max(valores, default=None),
+    }
+
+
+def _dia(rng):
+    return date(2025, 1, 1) + timedelta(days=rng.randrange(365))
+
+
+def _mes(rng):
+    # Um mês do ano populado, como parâmetros de/ate
+    inicio = _dia(rng).replace(day=1)
+    fim = (inicio + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+    return f"de={inicio}&ate={fim}"
+
+
+def _periodo_calendario(rng):
+    # Como a visão mensal do calendário
+    return f"/eventos/?{_mes(rng)}&limite=100"
+
+
+def _exportacao(rota, rng, n):
+    # Um mês de dados, alternando os formatos
+    formato = ("ndjson", "csv")[n % 2]
+    return f"{rota}?{_mes(rng)}&formato={formato}", None
+
+
+def popular(volumes: dict, rng: random.Random, prefixo: str) -> dict:
+    """Insere os volumes pedidos direto no banco e devolve os ids criados."""
+    from app import agregados, disponibilidade, estatisticas, lote, models, outbox
+    from app.database import SessionLocal
+
+    hoje = date.today()
+
+    def usuarios(tipo, quantidade):
+        return [
+            dict(
+                nome=f"{tipo} {i}",
+                email=f"{prefixo}-{tipo.lower()}-{i}@carga.conecta",
+                senha="senha",
+                tipo=tipo,
+                data_cadastro=hoje,
+            )
+            for i in range(quantidade)
+        ]
+
+    db = SessionLocal()
+    try:
+        freelancers = lote.inserir(
+            db, models.Usuario, usuarios("Freelancer", volumes["freelancers"])
+        )
+        lote.inserir(
+            db,
+            models.Freelancer,
+            [
+                dict(
+                    id=i,
+                    especialidade=rng.choice(_ESPECIALIDADES),
+                    avaliacao_media=0.0,
+                )
+                for i in freelancers
+            ],
+            retornar_ids=False,
+        )
+        organizadores = lote.inserir(
+            db, models.Usuario, usuarios("Organizador", volumes["organizadores"])
+        )
+        lote.inserir(
+            db,
+            models.Organizador,
+            [
+                dict(id=i, empresa_evento=f"Empresa {i}", avaliacao_media=0.0)
+                for i in organizadores
+            ],
+            retornar_ids=False,
+        )
+        eventos = lote.inserir(
+            db,
+            models.Evento,
+            [
+                dict(
+                    organizador_id=rng.choice(organizadores),
+                    nome=f"Evento {i}",
+                    data_evento=_dia(rng),
+                    local="Uberlândia",
+                )
+                for i in range(volumes["eventos"])
+            ],
+        )
+        propostas = lote.inserir(
+            db,
+            models.PropostaServico,
+            [
+                dict(
+                    evento_id=rng.choice(eventos),
+                    freelancer_id=rng.choice(freelancers),
+                    data_proposta=_dia(rng),
+                    status=rng.choice(_STATUS),
+                )
+                for _ in range(volumes["propostas"])
+            ],
+        )
+        lote.inserir(
+            db,
+            models.Avaliacao,
+            [
+                dict(
+                    avaliador_id=rng.choice(organizadores),
+                    avaliado_id=rng.choice(freelancers),
+                    nota=rng.randint(1, 5),
+                    data_avaliacao=_dia(rng),
+                )
+                for _ in range(volumes["avaliacoes"])
+            ],
+            retornar_ids=False,
+        )
+        # O insert direto não passa pelas tabelas de resumo: todas são
+        # reconstruídas, com as notas ainda no outbox aplicadas antes
+        outbox.aplicar_pendentes(db)
+        agregados.reconciliar_agregados(db)
+        disponibilidade.reconciliar(db)
+        estatisticas.reconciliar(db)
+        db.commit()
+    finally:
+        db.close()
+
+    return {
+        "freelancers": freelancers,
+        "organizadores": organizadores,
+        "eventos": eventos,
+        "propostas": propostas,
+    }
+
+
+def cenarios(ids: dict, prefixo: str):
+    """Cenários por rota: (nome, método, template da rota, gerador do request).
+
+    O gerador recebe (rng, n) e devolve (url, corpo json ou None).
+    """
+    freelancers, organizadores = ids["freelancers"], ids["organizadores"]
+    eventos, propostas = ids["eventos"], ids["propostas"]
+
+    def usuario(tipo, n):
+        return {
+            "nome": f"{tipo} carga {n}",
+            "email": f"{prefixo}-carga-{tipo}-{n}@carga.conecta",
+            "senha": "senha",
+        }
+
+    def evento(rng, n):
+        return {
+            "nome": f"Evento carga {n}",
+            "data_evento": _dia(rng).isoformat(),
+            "organizador_id": rng.choice(organizadores),
+        }
+
+    def proposta(rng):
+        return {
+            "evento_id": rng.choice(eventos),
+            "freelancer_id": rng.choice(freelancers),
+            "data_proposta": _dia(rng).isoformat(),
+            "status": "Pendente",
+        }
+
+    def lote_ids(rng, ids):
+        return ",".join(map(str, rng.sample(ids, min(len(ids), 20))))
+
+    return [
+        (
+            "criar_freelancer",
+            "POST",
+            "/freelancers/",
+            lambda rng, n: (
+                "/freelancers/",
+                {**usuario("freelancer", n), "especialidade": "garçom"},
+            ),
+        ),
+        (
+            "criar_freelancers_lote",
+            "POST",
+            "/freelancers/bulk",
+            lambda rng, n: (
+                "/freelancers/bulk",
+                [
+                    {**usuario("lote", f"{n}-{i}"), "especialidade": "DJ"}
+                    for i in range(50)
+                ],
+            ),
+        ),
+        (
+            "listar_freelancers",
+            "GET",
+            "/freelancers/",
+            lambda rng, n: ("/freelancers/", None),
+        ),
+        (
+            "buscar_freelancers",
+            "GET",
+            "/freelancers/",
+            lambda rng, n: (
+                f"/freelancers/?especialidade={rng.choice(_ESPECIALIDADES)}",
+                None,
+            ),
+        ),
+        (
+            "freelancers_por_ids",
+            "GET",
+            "/freelancers/",
+            lambda rng, n: (f"/freelancers/?ids={lote_ids(rng, freelancers)}", None),
+        ),
+        (
+            "atualizar_freelancer",
+            "PUT",
+            "/freelancers/{id}",
+            lambda rng, n: (
+                f"/freelancers/{rng.choice(freelancers)}",
+                {"portfolio": f"https://portfolio.conecta/{n}"},
+            ),
+        ),
+        (
+            "estatisticas_freelancer",
+            "GET",
+            "/freelancers/{id}/stats",
+            lambda rng, n: (f"/freelancers/{rng.choice(freelancers)}/stats", None),
+        ),
+        (
+            "criar_organizador",
+            "POST",
+            "/organizadores/",
+            lambda rng, n: (
+                "/organizadores/",
+                {**usuario("organizador", n), "empresa_evento": "Carga"},
+            ),
+        ),
+        (
+            "estatisticas_organizador",
+            "GET",
+            "/organizadores/{id}/stats",
+            lambda rng, n: (f"/organizadores/{rng.choice(organizadores)}/stats", None),
+        ),
+        ("listar_eventos", "GET", "/eventos/", lambda rng, n: ("/eventos/", None)),
+        (
+            "buscar_eventos",
+            "GET",
+            "/eventos/",
+            lambda rng, n: (f"/eventos/?nome=evento {rng.randrange(100)}", None),
+        ),
+        (
+            "calendario_eventos",
+            "GET",
+            "/eventos/",
+            lambda rng, n: (_periodo_calendario(rng), None),
+        ),
+        (
+            "eventos_por_ids",
+            "GET",
+            "/eventos/",
+            lambda rng, n: (f"/eventos/?ids={lote_ids(rng, eventos)}", None),
+        ),
+        (
+            "candidatos_evento",
+            "GET",
+            "/eventos/{id}/candidatos",
+            lambda rng, n: (
+                f"/eventos/{rng.choice(eventos)}/candidatos"
+                f"?especialidade={rng.choice(_ESPECIALIDADES)}",
+                None,
+            ),
+        ),
+        (
+            "criar_evento",
+            "POST",
+            "/eventos/",
+            lambda rng, n: ("/eventos/", evento(rng, n)),
+        ),
+        (
+            "criar_eventos_lote",
+            "POST",
+            "/eventos/bulk",
+            lambda rng, n: ("/eventos/bulk", [evento(rng, n) for _ in range(50)]),
+        ),
+        (
+            "criar_proposta",
+            "POST",
+            "/propostas/",
+            lambda rng, n: ("/propostas/", proposta(rng)),
+        ),
+        (
+            "criar_propostas_lote",
+            "POST",
+            "/propostas/bulk",
+            lambda rng, n: ("/propostas/bulk", [proposta(rng) for _ in range(50)]),
+        ),
+        (
+            "atualizar_status_proposta",
+            "PATCH",
+            "/propostas/{id}",
+            lambda rng, n: (
+                f"/propostas/{rng.choice(propostas)}",
+                {"status": rng.choice(_STATUS)},
+            ),
+        ),
+        (
+            "listar_propostas_freelancer",
+            "GET",
+            "/propostas/freelancer/{id}",
+            lambda rng, n: (f"/propostas/freelancer/{rng.choice(freelancers)}", None),
+        ),
+        (
+            "exportar_propostas",
+            "GET",
+            "/propostas/exportar",
+            lambda rng, n: _exportacao("/propostas/exportar", rng, n),
+        ),
+        (
+            "propostas_freelancer_expandidas",
+            "GET",
+            "/propostas/freelancer/{id}",
+            lambda rng, n: (
+                f"/propostas/freelancer/{rng.choice(freelancers)}"
+                "?expand=evento,freelancer",
+                None,
+            ),
+        ),
+        (
+            "usuarios_por_ids",
+            "GET",
+            "/usuarios/",
+            lambda rng, n: (
+                f"/usuarios/?ids={lote_ids(rng, freelancers + organizadores)}",
+                None,
+            ),
+        ),
+        (
+            "criar_avaliacao",
+            "POST",
+            "/avaliacoes/",
+            lambda rng, n: (
+                "/avaliacoes/",
+                {
+                    "avaliador_id": rng.choice(organizadores),
+                    "avaliado_id": rng.choice(freelancers),
+                    "nota": rng.randint(1, 5),
+                    "data_avaliacao": _dia(rng).isoformat(),
+                },
+            ),
+        ),
+        (
+            "listar_avaliacoes",
+            "GET",
+            "/avaliacoes/",
+            lambda rng, n: (f"/avaliacoes/?userId={rng.choice(freelancers)}", None),
+        ),
+        (
+            "exportar_avaliacoes",
+            "GET",
+            "/avaliacoes/exportar",
+            lambda rng, n: _exportacao("/avaliacoes/exportar", rng, n),
+        ),
+    ]
+
+
+async def executar(cliente, metodo, gerar, requests, concorrencia, rng):
+    latencias, queries, commits, status = [], [], [], {}
+    proximo = iter(range(requests))
+
+    async def trabalhador():
+        for n in proximo:
+            url, corpo = gerar(rng, n)
+            inicio = time.perf_counter()
+            resposta = await cliente.request(metodo, url, json=corpo)
+            latencias.append(time.perf_counter() - inicio)
+            status[resposta.status_code] = status.get(resposta.status_code, 0) + 1
+            encontrado = _QUERIES.search(resposta.headers.get("server-timing", ""))
+            if encontrado:
+                queries.append(int(encontrado.group(1)))
+                commits.append(int(encontrado.group(2)))
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    duracao = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "requests": requests,
+        "status": {str(codigo): total for codigo, total in sorted(status.items())},
+        "vazao_rps": requests / duracao,
+        "latencia_ms": {
+            nome: _percentil(latencias, p) * 1000
+            for nome, p in (("p50", 50), ("p95", 95), ("p99", 99))
+        },
+        "queries_por_request": _resumo(queries),
+        "commits_por_request": _resumo(commits),
+        # Idas ao banco: cada statement e cada commit
+        "idas_ao_banco_por_request": _resumo([q + c for q, c in zip(queries, commits)]),
+    }
+
+
+async def _rodar(args, ids, prefixo):
+    import httpx
+
+    from app.main import app
+
+    rng = random.Random(args.semente)
+    selecionados = [
+        c for c in cenarios(ids, prefixo) if not args.cenario or c[0] in args.cenario
+    ]
+    resultado = {}
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transporte, base_url="http://carga"
+    ) as cliente:
+        for nome, metodo, _rota, gerar in selecionados:
+            resultado[nome] = await executar(
+                cliente, metodo, gerar, args.requests, args.concorrencia, rng
+            )
+    return resultado
+
+
+def rotas_sem_cenario(app, cobertas):
+    from fastapi.routing import APIRoute
+
+    from app.routers import (
+        avaliacoes,
+        eventos,
+        freelancers,
+        organizadores,
+        propostas,
+        usuarios,
+    )
+
+    prefixos = tuple(
+        modulo.router.prefix
+        for modulo in (
+            freelancers,
+            organizadores,
+            eventos,
+            propostas,
+            avaliacoes,
+            usuarios,
+        )
+    )
+    return sorted(
+        f"{metodo} {rota.path}"
+        for rota in app.routes
+        if isinstance(rota, APIRoute) and rota.path.startswith(prefixos)
+        for metodo in rota.methods
+        if (metodo, rota.path) not in cobertas
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    for tabela, padrao in _VOLUMES.items():
+        parser.add_argument(f"--{tabela}", type=int, default=padrao)
+    parser.add_argument("--requests", type=int, default=200, help="Por cenário")
+    parser.add_argument("--concorrencia", type=int, default=8)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument(
+        "--cenario", action="append", help="Roda só os cenários indicados"
+    )
+    parser.add_argument("--saida", help="Arquivo JSON com o resultado")
+    args = parser.parse_args(argv)
+
+    volumes = {tabela: getattr(args, tabela) for tabela in _VOLUMES}
+    if min(volumes.values()) < 1:
+        parser.error("os volumes precisam ser de pelo menos 1")
+
+    preparar_banco("carga")
+
+    prefixo = uuid.uuid4().hex[:8]
+    inicio = time.perf_counter()
+    ids = popular(volumes, random.Random(args.semente), prefixo)
+    carga_s = time.perf_counter() - inicio
+
+    from app import database
+    from app.main import app
+
+    resultado = {
+        "parametros": vars(args),
+        "banco": database.get_engine().dialect.name,
+        "populacao_s": carga_s,
+        "cenarios": asyncio.run(_rodar(args, ids, prefixo)),
+        "rotas_sem_cenario": rotas_sem_cenario(
+            app, {(metodo, rota) for _, metodo, rota, _ in cenarios(ids, prefixo)}
+        ),
+    }
+    salvar(resultado, args.saida)
+
+
+if __name__ == "__main__":
+    main()
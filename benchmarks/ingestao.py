@@ -0,0 +1,107 @@
+"""Compara a vazão de inserção (linhas/s) dos endpoints individuais e em lote.
+
+Roda a aplicação em processo, contra o DATABASE_URL do ambiente (por padrão um
+SQLite temporário), com as migrações aplicadas. Uso:
+
+    python -m benchmarks.ingestao --linhas 5000 --tamanho-lote 500
+"""
+
+import argparse
+import time
+import uuid
+
+from . import preparar_banco, salvar
+
+
+def _freelancer(prefixo, i):
+    return {
+        "nome": f"Freelancer {i}",
+        "email": f"{prefixo}-{i}@bench.conecta",
+        "senha": "senha",
+        "especialidade": "garçom",
+    }
+
+
+def _medir(linhas, enviar):
+    inicio = time.perf_counter()
+    enviar()
+    duracao = time.perf_counter() - inicio
+    return {
+        "linhas": linhas,
+        "segundos": duracao,
+        "linhas_por_segundo": linhas / duracao,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--linhas", type=int, default=2000)
+    parser.add_argument("--tamanho-lote", type=int, default=500)
+    parser.add_argument(
+        "--linhas-individuais",
+        type=int,
+        default=200,
+        help="Amostra inserida um registro por request, para comparação",
+    )
+    parser.add_argument("--saida", help="Arquivo JSON com o resultado")
+    args = parser.parse_args(argv)
+
+    preparar_banco("ingestao")
+
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    cliente = TestClient(app)
+    prefixo = uuid.uuid4().hex[:8]
+    resultado = {}
+
+    def individual():
+        for i in range(args.linhas_individuais):
+            resposta = cliente.post("/freelancers/", json=_freelancer(prefixo + "u", i))
+            resposta.raise_for_status()
+
+    resultado["freelancers_individual"] = _medir(args.linhas_individuais, individual)
+
+    def em_lote():
+        for inicio in range(0, args.linhas, args.tamanho_lote):
+            fim = min(inicio + args.tamanho_lote, args.linhas)
+            resposta = cliente.post(
+                "/freelancers/bulk",
+                json=[_freelancer(prefixo + "b", i) for i in range(inicio, fim)],
+            )
+            resposta.raise_for_status()
+
+    resultado["freelancers_lote"] = _medir(args.linhas, em_lote)
+
+    organizador = cliente.post(
+        "/organizadores/",
+        json={
+            "nome": "Organizador",
+            "email": f"{prefixo}-org@bench.conecta",
+            "senha": "senha",
+            "empresa_evento": "Bench",
+        },
+    ).json()
+
+    def eventos_em_lote():
+        for inicio in range(0, args.linhas, args.tamanho_lote):
+            fim = min(inicio + args.tamanho_lote, args.linhas)
+            lote = [
+                {
+                    "nome": f"Evento {i}",
+                    "data_evento": "2025-01-01",
+                    "organizador_id": organizador["id"],
+                }
+                for i in range(inicio, fim)
+            ]
+            cliente.post("/eventos/bulk", json=lote).raise_for_status()
+
+    resultado["eventos_lote"] = _medir(args.linhas, eventos_em_lote)
+    resultado["parametros"] = vars(args)
+
+    salvar(resultado, args.saida)
+
+
+if __name__ == "__main__":
+    main()
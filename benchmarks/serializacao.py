@@ -0,0 +1,101 @@
+"""Compara o custo por linha da serialização das listagens paginadas.
+
+Busca páginas de freelancers (linhas de colunas, como em `GET /freelancers/`) e
+mede, em microssegundos por linha, três caminhos: um `FreelancerResponse` por
+linha validado e codificado pelo FastAPI, a `Pagina` validada e serializada pelo
+Pydantic e o `pagina_json` atual com orjson. Uso:
+
+    python -m benchmarks.serializacao --freelancers 5000 --tamanho-pagina 200
+"""
+
+import argparse
+import random
+import time
+import uuid
+
+from . import preparar_banco, salvar
+
+
+def _medir(linhas, repeticoes, serializar):
+    serializar()  # aquecimento: monta validadores e caches fora da medição
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        serializar()
+    duracao = time.perf_counter() - inicio
+    return {
+        "microssegundos_por_linha": duracao / (repeticoes * linhas) * 1e6,
+        "paginas_por_segundo": repeticoes / duracao,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--freelancers", type=int, default=2000)
+    parser.add_argument("--tamanho-pagina", type=int, default=200)
+    parser.add_argument("--repeticoes", type=int, default=200)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", help="Arquivo JSON com o resultado")
+    args = parser.parse_args(argv)
+
+    preparar_banco("serializacao")
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+
+    from app import consultas, models, schemas
+    from app.database import SessionLocal
+    from app.paginacao import pagina_json, paginar
+
+    from .carga import popular
+
+    volumes = {
+        "freelancers": args.freelancers,
+        "organizadores": 0,
+        "eventos": 0,
+        "propostas": 0,
+        "avaliacoes": 0,
+    }
+    popular(volumes, random.Random(args.semente), uuid.uuid4().hex[:8])
+
+    schema = schemas.FreelancerResponse
+    pagina_schema = TypeAdapter(schemas.Pagina[schema])
+    with SessionLocal() as db:
+        linhas, next_cursor = paginar(
+            consultas.freelancers(db),
+            [models.Freelancer.id],
+            None,
+            args.tamanho_pagina,
+        )
+    n = len(linhas)
+
+    def por_linha():
+        # Caminho anterior: um modelo por linha e o response_model validando a
+        # página de novo antes do jsonable_encoder e do json.dumps
+        itens = [schema.model_validate(linha, from_attributes=True) for linha in linhas]
+        pagina = pagina_schema.validate_python(
+            {"items": itens, "next_cursor": next_cursor}, from_attributes=True
+        )
+        return JSONResponse(jsonable_encoder(pagina)).body
+
+    def pydantic():
+        pagina = schemas.Pagina[schema].model_validate(
+            {"items": linhas, "next_cursor": next_cursor}, from_attributes=True
+        )
+        return pagina.model_dump_json().encode()
+
+    def orjson():
+        return pagina_json(schema, linhas, next_cursor)
+
+    resultado = {
+        "linhas_por_pagina": n,
+        "repeticoes": args.repeticoes,
+        "modelo_por_linha": _medir(n, args.repeticoes, por_linha),
+        "pydantic_pagina": _medir(n, args.repeticoes, pydantic),
+        "orjson": _medir(n, args.repeticoes, orjson),
+    }
+    salvar(resultado, args.saida)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Mede o tempo até o primeiro request servido e até o pool ficar pronto.
+
+Sobe `uvicorn app.main:app` num subprocesso, com o DATABASE_URL do ambiente,
+e consulta `/` e `/health/ready` até responderem 200. Uso:
+
+    python -m benchmarks.startup --repeticoes 5 --saida startup.json
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from . import salvar
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _esperar_200(url, inicio, limite):
+    while time.perf_counter() - inicio < limite:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as resposta:
+                if resposta.status == 200:
+                    return time.perf_counter() - inicio
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.005)
+    return None
+
+
+def medir(limite: float = 30.0):
+    porta = _porta_livre()
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--port",
+            str(porta),
+            "--log-level",
+            "warning",
+        ],
+        env=os.environ.copy(),
+    )
+    try:
+        primeiro_request = _esperar_200(f"http://127.0.0.1:{porta}/", inicio, limite)
+        pronto = _esperar_200(f"http://127.0.0.1:{porta}/health/ready", inicio, limite)
+    finally:
+        processo.terminate()
+        processo.wait()
+    return {"primeiro_request_s": primeiro_request, "pool_pronto_s": pronto}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--limite", type=float, default=30.0)
+    parser.add_argument("--saida", help="Arquivo JSON com o resultado")
+    args = parser.parse_args(argv)
+
+    execucoes = [medir(args.limite) for _ in range(args.repeticoes)]
+    resultado = {"execucoes": execucoes}
+    for chave in ("primeiro_request_s", "pool_pronto_s"):
+        valores = [e[chave] for e in execucoes if e[chave] is not None]
+        if valores:
+            resultado[chave] = {
+                "mediana": statistics.median(valores),
+                "min": min(valores),
+                "max": max(valores),
+            }
+
+    salvar(resultado, args.saida)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Configuração dos testes.
+
+Os testes rodam sobre um banco SQLite temporário com as migrações aplicadas; com
+`TEST_DATABASE_URL` eles usam outro banco (ex.: um Postgres de testes, onde
+rodam também os testes específicos do Postgres). Cada teste cria os próprios
+dados com um prefixo único, então o banco não precisa ser limpo entre eles.
+"""
+
+import os
+import random
+import tempfile
+import uuid
+
+import pytest
+
+# As configurações são lidas no import do app
+_diretorio = tempfile.mkdtemp(prefix="conecta-testes-")
+os.environ["DATABASE_URL"] = os.getenv(
+    "TEST_DATABASE_URL", f"sqlite:///{_diretorio}/conecta.db"
+)
+os.environ.setdefault("OUTBOX_WORKERS", "0")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import create_engine, event, text  # noqa: E402
+
+from app import database, migracoes  # noqa: E402
+from app.main import app  # noqa: E402
+from benchmarks import carga  # noqa: E402
+
+# Volumes pequenos: o suficiente para haver mais de uma página nas listagens
+VOLUMES = {
+    "freelancers": 12,
+    "organizadores": 3,
+    "eventos": 12,
+    "propostas": 40,
+    "avaliacoes": 40,
+}
+
+
+@pytest.fixture(scope="session")
+def engine():
+    engine = database.get_engine()
+    migracoes.aplicar(engine)
+    return engine
+
+
+@pytest.fixture(scope="session")
+def postgres(engine):
+    if engine.dialect.name != "postgresql":
+        pytest.skip("só no Postgres (TEST_DATABASE_URL)")
+    return engine
+
+
+@pytest.fixture
+def criar_banco(engine, tmp_path):
+    """Cria bancos vazios: arquivos SQLite ou, no Postgres, databases novos."""
+    criados = []
+
+    def criar():
+        nome = f"conecta_migracao_{uuid.uuid4().hex[:8]}"
+        if engine.dialect.name == "postgresql":
+            with engine.connect().execution_options(
+                isolation_level="AUTOCOMMIT"
+            ) as conn:
+                conn.execute(text(f"CREATE DATABASE {nome}"))
+            novo = create_engine(engine.url.set(database=nome))
+        else:
+            novo = create_engine(f"sqlite:///{tmp_path}/{nome}.db")
+        criados.append((nome, novo))
+        return novo
+
+    yield criar
+
+    for nome, novo in criados:
+        novo.dispose()
+        if engine.dialect.name == "postgresql":
+            with engine.connect().execution_options(
+                isolation_level="AUTOCOMMIT"
+            ) as conn:
+                conn.execute(text(f"DROP DATABASE {nome}"))
+
+
+@pytest.fixture(scope="session")
+def client(engine):
+    return TestClient(app)
+
+
+@pytest.fixture
+def prefixo():
+    return uuid.uuid4().hex[:12]
+
+
+@pytest.fixture
+def dados(engine, prefixo):
+    """Usuários, eventos, propostas e avaliações novos, com os ids criados."""
+    return carga.popular(VOLUMES, random.Random(prefixo), prefixo)
+
+
+@pytest.fixture
+def statements(engine):
+    """Lista dos statements SQL executados durante o teste."""
+    executados = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        executados.append(statement)
+
+    event.listen(engine, "before_cursor_execute", registrar)
+    yield executados
+    event.remove(engine, "before_cursor_execute", registrar)
+
+
+@pytest.fixture
+def percorrer(client):
+    """Ids de todas as páginas de uma listagem, seguindo o cursor."""
+
+    def percorrer(rota, params, maximo_paginas=50):
+        ids, cursor = [], None
+        for _ in range(maximo_paginas):
+            resposta = client.get(rota, params={**params, "cursor": cursor})
+            assert resposta.status_code == 200
+            pagina = resposta.json()
+            ids += [item["id"] for item in pagina["items"]]
+            cursor = pagina["next_cursor"]
+            if cursor is None:
+                return ids
+        raise AssertionError("a paginação não terminou")
+
+    return percorrer
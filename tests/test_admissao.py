@@ -0,0 +1,62 @@
+import asyncio
+
+from app import admissao
+
+
+def test_rate_limit_recusa_acima_da_rajada():
+    rate_limit = admissao.RateLimit(admissao.LimitesMemoria(), taxa=1, rajada=2)
+
+    assert rate_limit.consumir("a") == 0
+    assert rate_limit.consumir("a") == 0
+    # Sem ficha: a espera é até a próxima reposição, e o outro cliente não é afetado
+    assert 0.9 < rate_limit.consumir("a") <= 1
+    assert rate_limit.consumir("b") == 0
+
+
+def test_limite_de_concorrencia_recusa_com_fila_cheia_ou_espera_esgotada():
+    async def cenario():
+        limite = admissao.LimiteConcorrencia(limite=1, fila_max=1, espera=0.05)
+        assert await limite.entrar() is None
+
+        # O segundo espera na fila; o terceiro já não cabe nela
+        na_fila = asyncio.ensure_future(limite.entrar())
+        await asyncio.sleep(0)
+        assert await limite.entrar() == "fila_cheia"
+        assert await na_fila == "espera_esgotada"
+
+        # Com a vaga liberada durante a espera, ela passa direto ao primeiro da fila
+        na_fila = asyncio.ensure_future(limite.entrar())
+        await asyncio.sleep(0)
+        limite.sair()
+        assert await na_fila is None
+        assert limite.em_uso == 1
+        limite.sair()
+        assert limite.em_uso == 0
+
+    asyncio.run(cenario())
+
+
+def test_middleware_responde_429_e_503(client, dados, monkeypatch):
+    monkeypatch.setattr(
+        admissao,
+        "rate_limit",
+        admissao.RateLimit(admissao.LimitesMemoria(), taxa=0.01, rajada=1),
+    )
+    assert client.get("/health/live").status_code == 200
+    assert client.get("/freelancers/", params={"limite": 1}).status_code == 200
+    resposta = client.get("/freelancers/", params={"limite": 1})
+    assert resposta.status_code == 429
+    assert int(resposta.headers["Retry-After"]) >= 1
+    # O health check não passa pelo rate limit
+    assert client.get("/health/live").status_code == 200
+
+    # Todas as vagas ocupadas e fila de tamanho zero
+    monkeypatch.setattr(
+        admissao, "rate_limit", admissao.RateLimit(admissao.LimitesMemoria(), 0, 1)
+    )
+    concorrencia = admissao.LimiteConcorrencia(limite=1, fila_max=0, espera=1)
+    concorrencia.em_uso = 1
+    monkeypatch.setattr(admissao, "concorrencia", concorrencia)
+    resposta = client.get("/freelancers/", params={"limite": 1})
+    assert resposta.status_code == 503
+    assert resposta.headers["Retry-After"] == "1"
@@ -0,0 +1,34 @@
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import text
+from starlette.requests import Request
+
+from app import database, replicas
+
+
+def test_sessao_assincrona_de_leitura_na_replica_antes_do_primario(engine, monkeypatch):
+    if engine.dialect.name == "postgresql":
+        pytest.importorskip("asyncpg")
+
+    # Processo que ainda não abriu a engine assíncrona do primário: a primeira
+    # leitura vai direto para a réplica
+    replica = replicas.Replica("replica1", os.environ["DATABASE_URL"])
+    monkeypatch.setattr(replicas, "_replicas", [replica])
+    monkeypatch.setattr(database, "_async_engine", None)
+    monkeypatch.setattr(database, "_async_sessionmaker", None)
+
+    async def ler():
+        request = Request({"type": "http", "headers": []})
+        sessoes = database.get_async_read_db(request)
+        db = await sessoes.__anext__()
+        try:
+            assert db.bind is replica.engine(assincrono=True)
+            return (await db.execute(text("SELECT 1"))).scalar()
+        finally:
+            await sessoes.aclose()
+            await replica.fechar()
+            await database._async_engine.dispose()
+
+    assert asyncio.run(ler()) == 1
@@ -0,0 +1,132 @@
+import json
+from datetime import date
+
+import pytest
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from app import cli, migracoes, models, particionamento
+from app.routers import eventos
+
+
+def test_paginacao_da_busca_com_relevancias_empatadas(
+    client, dados, prefixo, percorrer
+):
+    organizador = dados["organizadores"][0]
+    novos = [
+        {
+            "nome": f"{nome} {prefixo}",
+            "data_evento": "2025-06-01",
+            "organizador_id": organizador,
+        }
+        for nome in ["Festa junina", "Casamento no campo"] * 5
+    ]
+    resposta = client.post("/eventos/bulk", json=novos)
+    criados = [item["id"] for item in resposta.json()["resultados"]]
+
+    ids = percorrer("/eventos/", {"nome": prefixo, "limite": 3})
+
+    assert sorted(ids) == sorted(criados)
+
+
+def test_lote_de_eventos_atualiza_estatisticas_com_um_statement(
+    client, dados, statements
+):
+    organizador = dados["organizadores"][0]
+    antes = client.get(f"/organizadores/{organizador}/stats").json()
+    novos = [
+        {
+            "nome": f"Evento do lote {i}",
+            "data_evento": f"2031-{i % 12 + 1:02d}-10",
+            "organizador_id": organizador,
+        }
+        for i in range(24)
+    ]
+
+    statements.clear()
+    assert client.post("/eventos/bulk", json=novos).status_code == 200
+
+    assert len([s for s in statements if "estatisticas_usuario" in s]) == 1
+    depois = client.get(f"/organizadores/{organizador}/stats").json()
+    for mes in range(1, 13):
+        chave = f"2031-{mes:02d}"
+        assert (
+            depois["eventos_por_mes"][chave]
+            == antes["eventos_por_mes"].get(chave, 0) + 2
+        )
+
+
+def test_listagem_por_periodo_le_so_as_particoes_do_periodo(postgres, criar_banco):
+    banco = criar_banco()
+    migracoes.aplicar(banco)
+    with banco.begin() as conn:
+        organizador = conn.execute(
+            insert(models.Usuario).returning(models.Usuario.id),
+            dict(
+                nome="Organizador",
+                email="organizador@particoes.conecta",
+                senha="senha",
+                tipo="Organizador",
+                data_cadastro=date(2025, 1, 1),
+            ),
+        ).scalar_one()
+        conn.execute(insert(models.Organizador), dict(id=organizador))
+        conn.execute(
+            insert(models.Evento),
+            [
+                dict(nome=f"Evento {dia}", data_evento=dia, organizador_id=organizador)
+                for dia in (
+                    date(2025, 3, 10),
+                    date(2025, 4, 2),
+                    date(2025, 4, 20),
+                    date(2025, 4, 28),
+                    date(2025, 5, 20),
+                )
+            ],
+        )
+        particionamento.particionar(conn, meses_futuros=1)
+
+    # O EXPLAIN é o das consultas que o handler faz, inclusive a da página
+    # seguinte, com a condição do cursor
+    consultas = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        if "FROM eventos" in statement:
+            consultas.append((statement, parameters))
+
+    def particoes(de, ate):
+        consultas.clear()
+        event.listen(banco, "before_cursor_execute", registrar)
+        try:
+            with Session(banco) as db:
+                cursor = None
+                while True:
+                    conteudo = eventos._listar_eventos(
+                        db, None, None, de, ate, None, None, cursor, 1
+                    )
+                    cursor = json.loads(conteudo)["next_cursor"]
+                    if cursor is None:
+                        break
+        finally:
+            event.remove(banco, "before_cursor_execute", registrar)
+
+        lidas = set()
+        with banco.connect() as conn:
+            for statement, parameters in consultas:
+                plano = conn.exec_driver_sql(
+                    f"EXPLAIN (FORMAT JSON) {statement}", parameters
+                ).scalar()
+                lidas.update(particionamento._relacoes(plano[0]["Plan"]))
+        return sorted(n for n in lidas if n.startswith(particionamento.TABELA))
+
+    assert particoes(date(2025, 4, 1), date(2025, 4, 30)) == ["eventos_p2025_04"]
+    assert len(consultas) == 3
+    assert particoes(date(2025, 3, 15), date(2025, 4, 10)) == [
+        "eventos_p2025_03",
+        "eventos_p2025_04",
+    ]
+
+
+def test_particionar_exige_confirmar_a_remocao_das_fks(engine):
+    with pytest.raises(SystemExit, match="--sem-fk-eventos"):
+        cli.main(["particionar-eventos"])
@@ -0,0 +1,240 @@
+import time
+from collections import Counter
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app import database, lote, models, paginacao
+from app.routers import freelancers
+
+
+def _ids(ids):
+    return ",".join(map(str, ids))
+
+
+def test_listagem_sem_consulta_por_freelancer(client, dados, statements):
+    # A página inteira vem de uma consulta com o join de Usuario: o número de
+    # statements não cresce com o tamanho da página
+    contagens = []
+    for limite in (2, 10):
+        statements.clear()
+        resposta = client.get(
+            "/freelancers/",
+            params={"ids": _ids(dados["freelancers"]), "limite": limite},
+        )
+        assert resposta.status_code == 200
+        assert len(resposta.json()["items"]) == limite
+        contagens.append(len(statements))
+
+    assert contagens[0] == contagens[1]
+    assert contagens[0] <= 2
+
+
+def test_atualizacao_com_um_update_e_uma_leitura(client, dados, statements):
+    id = dados["freelancers"][0]
+    resposta = client.put(f"/freelancers/{id}", json={"portfolio": "https://x.y/1"})
+
+    assert resposta.status_code == 200
+    assert resposta.json()["portfolio"] == "https://x.y/1"
+    assert resposta.json()["nome"]
+    assert len(statements) == 2
+
+
+def test_paginacao_da_busca_com_relevancias_empatadas(client, prefixo, percorrer):
+    # Dois grupos de especialidades com a mesma relevância dentro de cada um: o
+    # cursor precisa desempatar pelo id sem repetir nem pular ninguém
+    novos = [
+        {
+            "nome": f"Empate {i}",
+            "email": f"{prefixo}-empate-{i}@testes.conecta",
+            "senha": "senha",
+            "especialidade": f"{especialidade} {prefixo}",
+        }
+        for i, especialidade in enumerate(["Fotógrafo", "DJ de casamento"] * 5)
+    ]
+    resposta = client.post("/freelancers/bulk", json=novos)
+    criados = [item["id"] for item in resposta.json()["resultados"]]
+
+    ids = percorrer("/freelancers/", {"especialidade": prefixo, "limite": 3})
+
+    assert sorted(ids) == sorted(criados)
+
+
+def test_lote_com_email_gravado_por_outra_escrita_responde_409(
+    client, engine, dados, prefixo, monkeypatch
+):
+    # Outra escrita grava o email depois da verificação do lote e antes do INSERT
+    monkeypatch.setattr(lote, "ids_existentes", lambda db, coluna, valores: set())
+    novos = [
+        {
+            "nome": nome,
+            "email": email,
+            "senha": "senha",
+            "especialidade": "DJ",
+        }
+        for nome, email in (
+            ("Novo", f"{prefixo}-novo@testes.conecta"),
+            ("Corrida", f"{prefixo}-freelancer-0@carga.conecta"),
+        )
+    ]
+
+    resposta = client.post("/freelancers/bulk", json=novos)
+
+    assert resposta.status_code == 409
+    with Session(engine) as db:
+        email = models.Usuario.email
+        assert not db.scalar(select(email).where(email == novos[0]["email"]))
+
+
+def test_get_condicional_sem_consulta_com_a_pagina_em_cache(client, dados, statements):
+    params = {"ids": _ids(dados["freelancers"]), "limite": 5}
+    resposta = client.get("/freelancers/", params=params)
+    etag = resposta.headers["ETag"]
+    assert resposta.headers["Last-Modified"]
+
+    statements.clear()
+    resposta = client.get(
+        "/freelancers/", params=params, headers={"If-None-Match": etag}
+    )
+    assert resposta.status_code == 304
+    assert statements == []
+
+    # Uma escrita na página muda o ETag
+    id = dados["freelancers"][0]
+    client.put(f"/freelancers/{id}", json={"portfolio": "https://x.y/2"})
+    resposta = client.get(
+        "/freelancers/", params=params, headers={"If-None-Match": etag}
+    )
+    assert resposta.status_code == 200
+    assert resposta.headers["ETag"] != etag
+
+
+def test_freelancer_que_sai_da_busca_muda_o_last_modified(client, prefixo):
+    novos = [
+        {
+            "nome": f"Busca {i}",
+            "email": f"{prefixo}-busca-{i}@testes.conecta",
+            "senha": "senha",
+            "especialidade": f"Fotógrafo {prefixo}",
+        }
+        for i in range(3)
+    ]
+    resposta = client.post("/freelancers/bulk", json=novos)
+    criados = [item["id"] for item in resposta.json()["resultados"]]
+    params = {"especialidade": prefixo}
+    ultima = client.get("/freelancers/", params=params).headers["Last-Modified"]
+
+    # O Last-Modified tem resolução de segundos
+    time.sleep(1.1)
+    client.put(f"/freelancers/{criados[0]}", json={"especialidade": "Buffet"})
+
+    # As linhas que ficaram na busca não mudaram, mas a página mudou
+    resposta = client.get(
+        "/freelancers/", params=params, headers={"If-Modified-Since": ultima}
+    )
+    assert resposta.status_code == 200
+    assert len(resposta.json()["items"]) == 2
+
+
+def test_estatisticas_dos_dados_semeados(client, engine, dados):
+    proposta, evento = models.PropostaServico, models.Evento
+    for id in dados["freelancers"][:4]:
+        with Session(engine) as db:
+            por_status = dict(
+                db.execute(
+                    select(proposta.status, func.count())
+                    .where(proposta.freelancer_id == id)
+                    .group_by(proposta.status)
+                ).all()
+            )
+            por_dia = db.execute(
+                select(evento.data_evento, func.count())
+                .join(proposta, proposta.evento_id == evento.id)
+                .where(proposta.freelancer_id == id, proposta.status == "Aceita")
+                .group_by(evento.data_evento)
+            ).all()
+            notas = dict(
+                db.execute(
+                    select(models.Avaliacao.nota, func.count())
+                    .where(models.Avaliacao.avaliado_id == id)
+                    .group_by(models.Avaliacao.nota)
+                ).all()
+            )
+        por_mes = Counter()
+        for dia, quantidade in por_dia:
+            por_mes[dia.strftime("%Y-%m")] += quantidade
+
+        stats = client.get(f"/freelancers/{id}/stats").json()
+
+        assert stats["propostas_por_status"] == por_status
+        assert stats["total_propostas"] == sum(por_status.values())
+        assert stats["eventos_por_mes"] == dict(por_mes)
+        assert stats["distribuicao_notas"] == {
+            str(nota): notas.get(nota, 0) for nota in range(1, 6)
+        }
+
+
+def test_cursor_forjado_responde_400(client, dados, prefixo):
+    # Um valor de outro tipo não chega ao banco: no SQLite a página viria vazia
+    # e no Postgres a comparação falharia com 500
+    ids = {"ids": _ids(dados["freelancers"])}
+    busca = {"especialidade": prefixo}
+    for params, valores in (
+        (ids, ["x"]),
+        (ids, [1.5]),
+        (ids, [True]),
+        (busca, ["x", 1]),
+        (busca, [0.5, "x"]),
+    ):
+        cursor = paginacao.codificar_cursor(valores)
+        resposta = client.get("/freelancers/", params={**params, "cursor": cursor})
+        assert resposta.status_code == 400, valores
+
+    # A relevância da busca é float, NaN incluso
+    for valores in ([0.5, 1], [1, 1], [float("nan"), 1]):
+        cursor = paginacao.codificar_cursor(valores)
+        resposta = client.get("/freelancers/", params={**busca, "cursor": cursor})
+        assert resposta.status_code == 200, valores
+
+
+def test_busca_ignora_atualizacao_desfeita(client, engine, prefixo):
+    novo = {
+        "nome": "Desfeita",
+        "email": f"{prefixo}-desfeita@testes.conecta",
+        "senha": "senha",
+        "especialidade": f"Fotógrafo {prefixo}",
+    }
+    id = client.post("/freelancers/bulk", json=[novo]).json()["resultados"][0]["id"]
+
+    # A consulta da listagem, sem o cache de respostas
+    def encontrados(termo):
+        with Session(engine) as db:
+            return [linha.id for linha in freelancers._escopo_freelancers(db, termo)]
+
+    assert encontrados(f"Fotógrafo {prefixo}") == [id]
+
+    # O flush acontece, mas a transação é desfeita: o índice da busca não muda
+    with database.SessionLocal(bind=engine) as db:
+        db.get(models.Freelancer, id).especialidade = f"Buffet {prefixo}"
+        db.flush()
+        db.rollback()
+    assert encontrados(f"Fotógrafo {prefixo}") == [id]
+
+    with database.SessionLocal(bind=engine) as db:
+        db.get(models.Freelancer, id).especialidade = f"Buffet {prefixo}"
+        db.flush()
+    assert encontrados(f"Fotógrafo {prefixo}") == [id]
+
+    client.put(f"/freelancers/{id}", json={"especialidade": f"Buffet {prefixo}"})
+    assert encontrados(f"Buffet {prefixo}") == [id]
+    assert encontrados(f"Fotógrafo {prefixo}") == []
+
+
+def test_stats_verifica_o_freelancer_com_exists(client, dados, statements):
+    id = dados["freelancers"][0]
+    statements.clear()
+    assert client.get(f"/freelancers/{id}/stats").status_code == 200
+    assert "EXISTS" in statements[0]
+    assert len(statements) == 2
+
+    assert client.get("/freelancers/999999999/stats").status_code == 404
@@ -0,0 +1,124 @@
+from datetime import date
+
+from sqlalchemy import inspect, insert, select
+from sqlalchemy.orm import Session
+
+from app import estatisticas, migracoes, models
+from app.migracoes import v0001_schema_inicial
+
+
+def _schema(engine):
+    inspetor = inspect(engine)
+    schema = {}
+    for tabela in inspetor.get_table_names():
+        if tabela == migracoes.schema_versao.name:
+            continue
+        schema[tabela] = {
+            "colunas": {c["name"] for c in inspetor.get_columns(tabela)},
+            "indices": {i["name"] for i in inspetor.get_indexes(tabela)},
+            "unicas": {
+                tuple(u["column_names"])
+                for u in inspetor.get_unique_constraints(tabela)
+            },
+            "chaves_estrangeiras": {
+                (tuple(fk["constrained_columns"]), fk["referred_table"])
+                for fk in inspetor.get_foreign_keys(tabela)
+            },
+        }
+    return schema
+
+
+def test_banco_novo_migrado_tem_o_schema_dos_modelos(criar_banco):
+    migrado = criar_banco()
+    migracoes.aplicar(migrado)
+    referencia = criar_banco()
+    models.Base.metadata.create_all(referencia)
+
+    assert _schema(migrado) == _schema(referencia)
+
+
+def _popular_schema_inicial(engine):
+    tabelas = v0001_schema_inicial._metadata.tables
+    v0001_schema_inicial._metadata.create_all(engine)
+    hoje = date(2025, 1, 1)
+    usuarios = ((1, "Freelancer"), (2, "Freelancer"), (3, "Organizador"))
+    eventos = ((1, date(2025, 3, 10)), (2, date(2025, 4, 2)))
+    propostas = ((1, 1, "Aceita"), (2, 1, "Pendente"), (2, 2, "Aceita"))
+    avaliacoes = ((3, 1, 5), (3, 1, 3), (1, 3, 4))
+    with engine.begin() as conn:
+        conn.execute(
+            insert(tabelas["usuarios"]),
+            [
+                dict(
+                    id=id,
+                    nome=f"Usuário {id}",
+                    email=f"usuario{id}@testes.conecta",
+                    senha="senha",
+                    tipo=tipo,
+                    data_cadastro=hoje,
+                )
+                for id, tipo in usuarios
+            ],
+        )
+        conn.execute(
+            insert(tabelas["freelancers"]),
+            [dict(id=1, avaliacao_media=0.0), dict(id=2, avaliacao_media=0.0)],
+        )
+        conn.execute(insert(tabelas["organizadores"]), [dict(id=3)])
+        conn.execute(
+            insert(tabelas["eventos"]),
+            [
+                dict(id=id, organizador_id=3, nome=f"Evento {id}", data_evento=data)
+                for id, data in eventos
+            ],
+        )
+        conn.execute(
+            insert(tabelas["propostas_servico"]),
+            [
+                dict(evento_id=e, freelancer_id=f, status=s, data_proposta=hoje)
+                for e, f, s in propostas
+            ],
+        )
+        conn.execute(
+            insert(tabelas["avaliacoes"]),
+            [
+                dict(avaliador_id=a, avaliado_id=b, nota=nota, data_avaliacao=hoje)
+                for a, b, nota in avaliacoes
+            ],
+        )
+
+
+def test_banco_do_schema_inicial_tem_os_resumos_preenchidos(criar_banco):
+    engine = criar_banco()
+    _popular_schema_inicial(engine)
+
+    migracoes.aplicar(engine)
+
+    with Session(engine) as db:
+        agregado = models.AvaliacaoAgregado
+        assert set(
+            db.execute(select(agregado.avaliado_id, agregado.quantidade, agregado.soma))
+        ) == {(1, 2, 8), (3, 1, 4)}
+        assert db.get(models.Freelancer, 1).avaliacao_media == 4.0
+        assert db.get(models.Organizador, 3).avaliacao_media == 4.0
+
+        ocupacao = models.OcupacaoFreelancer
+        assert set(
+            db.execute(
+                select(ocupacao.freelancer_id, ocupacao.data, ocupacao.quantidade)
+            )
+        ) == {(1, date(2025, 3, 10), 1), (2, date(2025, 4, 2), 1)}
+
+        freelancer = estatisticas.obter(db, 1)
+        assert freelancer.propostas_por_status == {"Aceita": 1, "Pendente": 1}
+        assert freelancer.eventos_por_mes == {"2025-03": 1}
+        organizador = estatisticas.obter(db, 3)
+        assert organizador.total_propostas == 3
+        assert organizador.eventos_por_mes == {"2025-03": 1, "2025-04": 1}
+        assert organizador.distribuicao_notas[4] == 1
+
+
+def test_migracoes_aplicadas_uma_vez(criar_banco):
+    engine = criar_banco()
+    assert len(migracoes.aplicar(engine)) == len(migracoes.migracoes())
+    assert migracoes.aplicar(engine) == []
@@ -0,0 +1,136 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app import models, outbox
+
+
+def _agregado(engine, avaliado):
+    tabela = models.AvaliacaoAgregado
+    with Session(engine) as db:
+        linha = db.execute(
+            select(tabela.quantidade, tabela.soma).where(tabela.avaliado_id == avaliado)
+        ).first()
+    return tuple(linha) if linha else (0, 0)
+
+
+def _avaliar(client, dados, avaliado, notas):
+    for nota in notas:
+        resposta = client.post(
+            "/avaliacoes/",
+            json={
+                "avaliador_id": dados["organizadores"][0],
+                "avaliado_id": avaliado,
+                "nota": nota,
+                "data_avaliacao": "2030-06-01",
+            },
+        )
+        assert resposta.status_code == 201
+
+
+def test_workers_concorrentes_aplicam_cada_nota_uma_vez(client, engine, dados):
+    avaliado = dados["freelancers"][0]
+    notas = [5, 4, 3, 5, 1, 2, 4, 5]
+    antes = _agregado(engine, avaliado)
+    _avaliar(client, dados, avaliado, notas)
+
+    # Workers disputando a fila ao mesmo tempo, em lotes pequenos: cada evento
+    # é reivindicado por um só
+    workers = 4
+    largada = threading.Barrier(workers)
+
+    def trabalhar(_):
+        largada.wait()
+        aplicados = 0
+        while lote := outbox.processar_lote(limite=2):
+            aplicados += lote
+        return aplicados
+
+    with ThreadPoolExecutor(workers) as executor:
+        assert sum(executor.map(trabalhar, range(workers))) >= len(notas)
+
+    assert outbox.drenar() == 0
+    assert _agregado(engine, avaliado) == (
+        antes[0] + len(notas),
+        antes[1] + sum(notas),
+    )
+
+
+def test_lote_com_falha_reaplica_os_outros_eventos_uma_vez(
+    client, engine, dados, monkeypatch
+):
+    def falhar(db, payloads):
+        raise RuntimeError("falha simulada")
+
+    monkeypatch.setitem(outbox._PROCESSADORES, "teste_falha", falhar)
+    avaliado = dados["freelancers"][1]
+    antes = _agregado(engine, avaliado)
+    _avaliar(client, dados, avaliado, [2, 3])
+    with Session(engine) as db:
+        outbox.publicar(db, "teste_falha", {})
+        db.commit()
+
+    # O lote inteiro é desfeito e cada evento tentado sozinho: as notas entram
+    # uma vez e o evento com problema volta para a fila com backoff
+    try:
+        outbox.drenar()
+        assert _agregado(engine, avaliado) == (antes[0] + 2, antes[1] + 5)
+        with Session(engine) as db:
+            falhos = db.scalars(
+                select(models.EventoOutbox).where(
+                    models.EventoOutbox.tipo == "teste_falha"
+                )
+            ).all()
+            assert [evento.tentativas for evento in falhos] == [1]
+            assert "falha simulada" in falhos[0].erro
+    finally:
+        with Session(engine) as db:
+            db.execute(
+                delete(models.EventoOutbox).where(
+                    models.EventoOutbox.tipo == "teste_falha"
+                )
+            )
+            db.commit()
+
+
+def test_lote_de_notas_soma_os_agregados_com_um_statement(
+    client, engine, dados, statements
+):
+    outbox.drenar()
+    avaliados = dados["freelancers"][2:7]
+    antes = {avaliado: _agregado(engine, avaliado) for avaliado in avaliados}
+    for avaliado in avaliados:
+        _avaliar(client, dados, avaliado, [4, 2])
+
+    # Agregados, médias e estatísticas de todos os avaliados do lote: o número
+    # de statements não cresce com o de avaliados
+    statements.clear()
+    assert outbox.processar_lote() == 2 * len(avaliados)
+    assert len([s for s in statements if "INTO avaliacoes_agregados" in s]) == 1
+    assert len(statements) <= 5
+    for avaliado in avaliados:
+        quantidade, soma = antes[avaliado]
+        assert _agregado(engine, avaliado) == (quantidade + 2, soma + 6)
+
+
+def _metrica(client, nome):
+    for linha in client.get("/metrics").text.splitlines():
+        if linha.startswith(f"{nome} "):
+            return float(linha.split()[1])
+    return None
+
+
+def test_metricas_mostram_a_fila_sem_workers(client, dados):
+    outbox.drenar()
+    assert _metrica(client, "outbox_pending_events") == 0
+    assert _metrica(client, "outbox_oldest_pending_age_seconds") == 0
+
+    # Sem nenhum evento aplicado, a fila e a idade do mais antigo já aparecem
+    _avaliar(client, dados, dados["freelancers"][0], [5, 3])
+    time.sleep(0.05)
+    assert _metrica(client, "outbox_pending_events") == 2
+    assert _metrica(client, "outbox_oldest_pending_age_seconds") > 0
+    outbox.drenar()
@@ -0,0 +1,218 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import models
+
+
+def test_expansao_sem_consulta_por_proposta(client, dados, statements):
+    freelancer = dados["freelancers"][0]
+    novas = [
+        {
+            "evento_id": evento,
+            "freelancer_id": freelancer,
+            "data_proposta": "2025-03-01",
+            "status": "Pendente",
+        }
+        for evento in dados["eventos"][:6]
+    ]
+    assert client.post("/propostas/bulk", json=novas).status_code == 200
+
+    # Eventos e freelancers vêm em uma consulta por relação, qualquer que seja
+    # o tamanho da página
+    contagens = []
+    for limite in (1, 6):
+        statements.clear()
+        resposta = client.get(
+            f"/propostas/freelancer/{freelancer}",
+            params={"expand": "evento,freelancer", "limite": limite},
+        )
+        assert resposta.status_code == 200
+        itens = resposta.json()["items"]
+        assert len(itens) == limite
+        assert all(item["evento"]["id"] == item["evento_id"] for item in itens)
+        assert all(item["freelancer"]["id"] == freelancer for item in itens)
+        contagens.append(len(statements))
+
+    assert contagens[0] == contagens[1]
+
+
+def _ocupacao(engine, freelancer):
+    tabela = models.OcupacaoFreelancer
+    with Session(engine) as db:
+        return dict(
+            db.execute(
+                select(tabela.data, tabela.quantidade).where(
+                    tabela.freelancer_id == freelancer
+                )
+            ).all()
+        )
+
+
+def test_propostas_aceitas_somam_na_ocupacao_com_um_statement(
+    client, engine, dados, statements
+):
+    freelancer = dados["freelancers"][0]
+    organizador = dados["organizadores"][0]
+    resposta = client.post(
+        "/eventos/bulk",
+        json=[
+            {"nome": "Ocupação", "data_evento": data, "organizador_id": organizador}
+            for data in ("2030-07-01", "2030-07-01", "2030-07-02")
+        ],
+    )
+    eventos = [item["id"] for item in resposta.json()["resultados"]]
+
+    def aceitar(evento_ids):
+        propostas = [
+            {
+                "evento_id": evento,
+                "freelancer_id": freelancer,
+                "data_proposta": "2030-06-01",
+                "status": "Aceita",
+            }
+            for evento in evento_ids
+        ]
+        statements.clear()
+        assert client.post("/propostas/bulk", json=propostas).status_code == 200
+        return [s for s in statements if "ocupacoes_freelancer" in s]
+
+    # Linhas novas e, depois, a soma nas que já existem
+    antes = _ocupacao(engine, freelancer)
+    assert len(aceitar(eventos)) == 1
+    assert _ocupacao(engine, freelancer) == {
+        **antes,
+        date(2030, 7, 1): 2,
+        date(2030, 7, 2): 1,
+    }
+    assert len(aceitar(eventos[:1])) == 1
+    assert _ocupacao(engine, freelancer) == {
+        **antes,
+        date(2030, 7, 1): 3,
+        date(2030, 7, 2): 1,
+    }
+
+
+def test_proposta_aceita_atualiza_estatisticas_com_um_statement(
+    client, dados, statements
+):
+    freelancer = dados["freelancers"][1]
+    proposta = {
+        "evento_id": dados["eventos"][0],
+        "freelancer_id": freelancer,
+        "data_proposta": "2030-06-01",
+        "status": "Aceita",
+    }
+    antes = client.get(f"/freelancers/{freelancer}/stats").json()
+
+    statements.clear()
+    assert client.post("/propostas/", json=proposta).status_code == 201
+
+    # Propostas por status do freelancer e do organizador e eventos do mês do
+    # freelancer: uma escrita só em estatisticas_usuario
+    assert len([s for s in statements if "estatisticas_usuario" in s]) == 1
+    assert len(statements) <= 6
+    depois = client.get(f"/freelancers/{freelancer}/stats").json()
+    assert depois["total_propostas"] == antes["total_propostas"] + 1
+    assert (
+        depois["propostas_por_status"].get("Aceita", 0)
+        == antes["propostas_por_status"].get("Aceita", 0) + 1
+    )
+
+
+def test_get_condicional_das_propostas_com_objetos_embutidos(client, dados):
+    freelancer = dados["freelancers"][2]
+    evento = dados["eventos"][0]
+    client.post(
+        "/propostas/",
+        json={
+            "evento_id": evento,
+            "freelancer_id": freelancer,
+            "data_proposta": "2030-06-01",
+            "status": "Pendente",
+        },
+    )
+    rota = f"/propostas/freelancer/{freelancer}"
+    params = {"expand": "freelancer"}
+    etag = client.get(rota, params=params).headers["ETag"]
+
+    resposta = client.get(rota, params=params, headers={"If-None-Match": etag})
+    assert resposta.status_code == 304
+
+    # Mudar só o freelancer embutido também muda o ETag
+    client.put(f"/freelancers/{freelancer}", json={"portfolio": "https://x.y/3"})
+    resposta = client.get(rota, params=params, headers={"If-None-Match": etag})
+    assert resposta.status_code == 200
+
+
+def _nova_proposta(client, dados):
+    resposta = client.post(
+        "/propostas/bulk",
+        json=[
+            {
+                "evento_id": dados["eventos"][1],
+                "freelancer_id": dados["freelancers"][3],
+                "data_proposta": "2030-06-01",
+                "status": "Pendente",
+            }
+        ],
+    )
+    return resposta.json()["resultados"][0]["id"]
+
+
+def test_transicoes_concorrentes_aplicam_uma_vez(client, dados):
+    proposta = _nova_proposta(client, dados)
+    antes = client.get(f"/freelancers/{dados['freelancers'][3]}/stats").json()
+
+    # Vários requests aceitam a mesma proposta ao mesmo tempo: o UPDATE
+    # condicional deixa passar um só, e os outros recebem 409
+    concorrentes = 6
+    largada = threading.Barrier(concorrentes)
+
+    def aceitar(_):
+        largada.wait()
+        return client.patch(
+            f"/propostas/{proposta}", json={"status": "Aceita"}
+        ).status_code
+
+    with ThreadPoolExecutor(concorrentes) as executor:
+        resultados = sorted(executor.map(aceitar, range(concorrentes)))
+
+    assert resultados == [200] + [409] * (concorrentes - 1)
+    depois = client.get(f"/freelancers/{dados['freelancers'][3]}/stats").json()
+    assert (
+        depois["propostas_por_status"].get("Aceita", 0)
+        == antes["propostas_por_status"].get("Aceita", 0) + 1
+    )
+
+
+def test_transicao_com_versao_desatualizada_recebe_409(client, dados):
+    proposta = _nova_proposta(client, dados)
+    rota = f"/propostas/{proposta}"
+
+    # Quem leu a versão 1 depois de outra requisição já tê-la mudado
+    resposta = client.patch(rota, json={"status": "Aceita", "versao": 1})
+    assert resposta.status_code == 200
+    assert resposta.json()["versao"] == 2
+
+    resposta = client.patch(rota, json={"status": "Cancelada", "versao": 1})
+    assert resposta.status_code == 409
+    assert "versão atual 2" in resposta.json()["detail"]
+
+
+def test_get_condicional_responde_304_sem_buscar_a_pagina(client, dados, statements):
+    freelancer = dados["freelancers"][4]
+    rota = f"/propostas/freelancer/{freelancer}"
+    params = {"expand": "evento,freelancer", "limite": 2}
+    etag = client.get(rota, params=params).headers["ETag"]
+
+    # Só a verificação do freelancer e o agregado do validador: nem a página
+    # nem os objetos embutidos são buscados
+    statements.clear()
+    resposta = client.get(rota, params=params, headers={"If-None-Match": etag})
+    assert resposta.status_code == 304
+    assert len(statements) == 2
+    assert not any("LIMIT" in statement for statement in statements)
@@ -0,0 +1,84 @@
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import database, replicas
+from app.main import app
+
+
+@pytest.fixture
+def usar_replicas(monkeypatch):
+    """Troca as réplicas configuradas pelas dadas, com as URLs passadas."""
+    criadas = []
+
+    def usar(*urls):
+        lista = [replicas.Replica(f"replica{i}", url) for i, url in enumerate(urls, 1)]
+        criadas.extend(lista)
+        monkeypatch.setattr(replicas, "_replicas", lista)
+        return lista
+
+    yield usar
+    for replica in criadas:
+        replica.engine().dispose()
+
+
+def test_leituras_em_rodizio_entre_as_replicas(engine, tmp_path, usar_replicas):
+    primeira, segunda = usar_replicas(
+        f"sqlite:///{tmp_path}/r1.db", f"sqlite:///{tmp_path}/r2.db"
+    )
+
+    lidas = [replicas.engine_leitura() for _ in range(4)]
+
+    assert {lidas[0], lidas[1]} == {primeira.engine(), segunda.engine()}
+    assert lidas[2:] == lidas[:2]
+
+
+def test_replica_que_falha_na_verificacao_sai_do_rodizio(
+    engine, tmp_path, usar_replicas
+):
+    saudavel, quebrada = usar_replicas(
+        f"sqlite:///{tmp_path}/r1.db", f"sqlite:///{tmp_path}/nao/existe.db"
+    )
+
+    quebrada.verificar()
+    assert not quebrada.saudavel
+    assert {replicas.engine_leitura() for _ in range(4)} == {saudavel.engine()}
+
+    # Sem nenhuma réplica saudável, a leitura vai ao primário
+    (sozinha,) = usar_replicas(quebrada.url)
+    sozinha.verificar()
+    assert replicas.engine_leitura() is database.get_engine()
+
+
+def test_cliente_que_escreveu_le_do_primario_e_nao_do_cache(
+    engine, dados, tmp_path, usar_replicas
+):
+    if engine.dialect.name != "sqlite":
+        pytest.skip("a réplica atrasada é uma cópia do arquivo SQLite")
+
+    # Réplica parada no estado de agora
+    caminho = tmp_path / "atrasada.db"
+    with (
+        sqlite3.connect(engine.url.database) as origem,
+        sqlite3.connect(caminho) as destino,
+    ):
+        origem.backup(destino)
+    usar_replicas(f"sqlite:///{caminho}")
+
+    id = dados["freelancers"][0]
+    params = {"ids": str(id)}
+    escritor, leitor = TestClient(app), TestClient(app)
+
+    resposta = escritor.put(f"/freelancers/{id}", json={"portfolio": "https://novo"})
+    assert replicas.COOKIE_ESCRITA in resposta.cookies
+
+    # Outro cliente lê da réplica e põe a página antiga no cache
+    pagina = leitor.get("/freelancers/", params=params).json()
+    assert pagina["items"][0]["portfolio"] != "https://novo"
+
+    # Quem escreveu lê do primário, sem a página em cache, e a substitui
+    pagina = escritor.get("/freelancers/", params=params).json()
+    assert pagina["items"][0]["portfolio"] == "https://novo"
+    pagina = leitor.get("/freelancers/", params=params).json()
+    assert pagina["items"][0]["portfolio"] == "https://novo"